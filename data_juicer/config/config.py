@@ -5,7 +5,7 @@ import shutil
 import tempfile
 import time
 from argparse import ArgumentError, Namespace
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
 import yaml
 from jsonargparse import (ActionConfigFile, ArgumentParser, dict_to_namespace,
@@ -99,7 +99,19 @@ def init_configs(args=None):
         default='./outputs/hello_world.jsonl',
         help='Path to export and save the output processed dataset. The '
         'directory to store the processed dataset will be the work '
-        'directory of this process.')
+        'directory of this process. Jsonl files can be compressed on the '
+        'fly by adding a ".gz" or ".zst" suffix, e.g. "result.jsonl.zst".')
+    parser.add_argument(
+        '--load_columns',
+        type=Optional[Union[str, List[str]]],
+        default=None,
+        help='Columns to load from the dataset. Internal fields of '
+        'Data-Juicer are always loaded. If it\'s "auto", only the columns '
+        'referenced by the ops are loaded, i.e. the text, image, audio and '
+        'video keys and the "*_key" args of ops. For parquet datasets, the '
+        'other columns are never read from the files. Notice that the '
+        'columns that are not loaded are not exported either. In default, '
+        'it\'s None, which loads all columns.')
     parser.add_argument(
         '--export_shard_size',
         type=NonNegativeInt,
@@ -229,6 +241,28 @@ def init_configs(args=None):
         help='The compression method of the cache file, which can be'
         'specified in ["gzip", "zstd", "lz4"]. If this parameter is'
         'None, the cache file will not be compressed.')
+    parser.add_argument(
+        '--cache_compress_batches',
+        type=bool,
+        default=False,
+        help='Whether to compress the record batches in the cache files in '
+        'place instead of compressing the whole files. Such caches are still '
+        'valid Arrow files that are loaded directly by the following OPs, so '
+        'they are never decompressed to disk, but their batches are '
+        'decompressed into memory when they are loaded. Only "zstd" and '
+        '"lz4" of cache_compress are supported.')
+    parser.add_argument(
+        '--stats_cache_path',
+        type=str,
+        default=None,
+        help='Path to a persistent SQLite file to cache the stats computed by '
+        'Filters across runs. The stats are stored by the sample content and '
+        'the op params that affect the stats, so re-running a recipe with '
+        'tweaked thresholds or on overlapping data only computes stats for '
+        'the missing samples. Media files are identified by their paths, '
+        'sizes and modification times. Filters whose stats depend on other '
+        'fields, e.g. specified_field_filter, are not cached. In default, '
+        'it\'s None, which disables the stats cache.')
     parser.add_argument(
         '--use_checkpoint',
         type=bool,
@@ -239,6 +273,34 @@ def init_configs(args=None):
         'will be disabled when it is true . If args of ops before the '
         'checkpoint are changed, all ops will be rerun from the '
         'beginning.')
+    parser.add_argument(
+        '--checkpoint_shard_size',
+        type=Optional[PositiveInt],
+        default=None,
+        help='Number of samples in each shard for the intra-op checkpoints. '
+        'When it\'s set with use_checkpoint, the checkpoint is updated after '
+        'each op, and Mappers and Filters process the dataset shard by '
+        'shard, saving each finished shard to the checkpoint dir right '
+        'away. Rerunning after a crash resumes the interrupted op from its '
+        'unfinished shards. In default, it\'s None, which only saves the '
+        'checkpoint when the processing ends or fails.')
+    parser.add_argument(
+        '--use_streaming',
+        type=bool,
+        default=False,
+        help='Whether to process the dataset in the streaming mode, which '
+        'pushes each batch of samples through the whole chain of ops and '
+        'exports the kept samples on the fly, instead of running each op as '
+        'a full pass over the dataset with its own cache files. Only '
+        'available when all ops are CPU Mappers or Filters and the export '
+        'format is jsonl or parquet. Otherwise, it will fall back to the '
+        'default mode.')
+    parser.add_argument(
+        '--streaming_batch_size',
+        type=PositiveInt,
+        default=1000,
+        help='Number of samples pushed through the op chain at a time in '
+        'the streaming mode. Only available when use_streaming is true.')
     parser.add_argument(
         '--temp_dir',
         type=str,
@@ -275,6 +337,66 @@ def init_configs(args=None):
         help='Whether to fuse operators that share the same intermediate '
         'variables automatically. Op fusion might reduce the memory '
         'requirements slightly but speed up the whole process.')
+    parser.add_argument(
+        '--general_fusion',
+        type=bool,
+        default=False,
+        help='Whether to fuse each run of consecutive Mappers and Filters '
+        'into one op automatically, so that these ops process the dataset in '
+        'a single pass instead of one pass for each op. Rejected samples are '
+        'dropped from the batch right away, so the following ops in the run '
+        'won\'t process them. Filters with stats_export_path are not fused, '
+        'so that their stats are still exported.')
+    parser.add_argument(
+        '--reorder_filters',
+        type=bool,
+        default=False,
+        help='Whether to reorder each run of consecutive Filters according '
+        'to their per-sample cost and pass ratio probed on a small batch of '
+        'the dataset, so that cheap Filters that drop lots of samples are '
+        'applied first. The kept samples are the same since the order of '
+        'Filters in a run doesn\'t change the result.')
+    parser.add_argument(
+        '--adaptive_workloads',
+        type=bool,
+        default=False,
+        help='Whether to tune the batch size and the number of processes of '
+        'Mappers and Filters while they are running. The dataset is '
+        'processed chunk by chunk, and after each chunk the throughput and '
+        'the peak memory utilization are observed to search for a faster '
+        'batch size, and to back off the batch size and the number of '
+        'processes on memory pressure.')
+    parser.add_argument(
+        '--adaptive_chunk_size',
+        type=PositiveInt,
+        default=100000,
+        help='Number of samples in each chunk when adaptive_workloads is '
+        'True. The batch size and the number of processes are adjusted '
+        'between chunks.')
+    parser.add_argument(
+        '--adaptive_mem_util_threshold',
+        type=ClosedUnitInterval,
+        default=0.85,
+        help='The memory utilization above which the batch size and the '
+        'number of processes are backed off when adaptive_workloads is '
+        'True.')
+    parser.add_argument(
+        '--share_models',
+        type=bool,
+        default=False,
+        help='Whether to load the read-only CPU models (fasttext, '
+        'sentencepiece, kenlm and nltk) once in the main process, so that '
+        'the forked worker processes share one copy of them instead of '
+        'loading their own ones. The memory of these models is not counted '
+        'in the mem_required of each process when deciding the number of '
+        'processes. Only works with the fork start method.')
+    parser.add_argument(
+        '--words_cache_size',
+        type=NonNegativeInt,
+        default=2**16,
+        help='Max number of words in the cache of the words split from '
+        'documents, which is shared by the ops in the same process that '
+        'tokenize texts in the same way. 0 means disabling the cache.')
     parser.add_argument(
         '--process',
         type=List[Dict],
@@ -433,10 +555,25 @@ def init_setup_from_cfg(cfg):
             os.makedirs(cfg.temp_dir, exist_ok=True)
         tempfile.tempdir = cfg.temp_dir
 
-    # The checkpoint mode is not compatible with op fusion for now.
-    if cfg.op_fusion:
+    if cfg.cache_compress_batches and cfg.cache_compress not in [
+            None, 'zstd', 'lz4'
+    ]:
+        raise ValueError(f'Compressing the record batches in cache files '
+                         f'only supports "zstd" and "lz4", but got '
+                         f'[{cfg.cache_compress}].')
+
+    # The checkpoint mode is not compatible with op fusion and filter
+    # reordering for now.
+    if cfg.op_fusion or cfg.general_fusion or cfg.reorder_filters:
         cfg.use_checkpoint = False
 
+    # The streaming mode doesn't materialize the dataset, so there is no
+    # dataset checkpoint to save.
+    if cfg.use_streaming and cfg.use_checkpoint:
+        logger.warning('The streaming mode is not compatible with the '
+                       'checkpoint mode. Disable the streaming mode.')
+        cfg.use_streaming = False
+
     # update huggingface datasets cache directory only when ds_cache_dir is set
     from datasets import config
     if cfg.ds_cache_dir:
@@ -492,6 +629,9 @@ def init_setup_from_cfg(cfg):
                     args['num_proc'] = cfg.np
                 if 'turbo' not in args or args['turbo'] is None:
                     args['turbo'] = cfg.turbo
+            if cfg.stats_cache_path is not None and args.get(
+                    'stats_cache_path') is None:
+                args['stats_cache_path'] = cfg.stats_cache_path
             op[op_name] = args
 
     return cfg
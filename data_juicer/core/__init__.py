@@ -3,7 +3,8 @@ from .analyzer import Analyzer
 from .data import NestedDataset
 from .executor import Executor
 from .exporter import Exporter
-from .monitor import Monitor
+from .monitor import Monitor, ResourceSampler
+from .streaming import StreamingProcessor
 from .tracer import Tracer
 
 __all__ = [
@@ -13,5 +14,7 @@ __all__ = [
     'Executor',
     'Exporter',
     'Monitor',
+    'ResourceSampler',
+    'StreamingProcessor',
     'Tracer',
 ]
@@ -1,6 +1,95 @@
+import copy
+from time import time
+
+import psutil
 from datasets.config import DEFAULT_MAX_BATCH_SIZE
+from loguru import logger
 
 from data_juicer.core.monitor import Monitor
+from data_juicer.ops import Filter, Mapper
+
+
+class WorkloadTuner:
+    """
+    A closed-loop tuner of the batch size and the number of processes of an
+    op, which is updated with the throughput and the peak memory utilization
+    observed on each processed chunk.
+
+    The batch size is searched by doubling it from the initial one while the
+    throughput keeps improving, or by halving it if doubling doesn't help at
+    all, and it's fixed to the best one found afterward. On memory pressure,
+    the batch size and the number of processes are halved, and the number of
+    processes is increased back one by one when the memory is enough again.
+    """
+
+    # min relative improvement of throughput to keep searching
+    MIN_IMPROVEMENT = 0.05
+
+    def __init__(self,
+                 batch_size,
+                 num_proc,
+                 tune_batch_size=True,
+                 mem_util_threshold=0.85,
+                 max_batch_size=10000):
+        """
+        Initialization method.
+
+        :param batch_size: the initial batch size.
+        :param num_proc: the initial and max number of processes.
+        :param tune_batch_size: whether to tune the batch size. It only
+            matters for batched ops.
+        :param mem_util_threshold: the memory utilization to back off at.
+        :param max_batch_size: the max batch size to search.
+        """
+        self.batch_size = batch_size
+        self.initial_batch_size = batch_size
+        self.num_proc = num_proc
+        self.max_num_proc = num_proc
+        self.tune_batch_size = tune_batch_size
+        self.mem_util_threshold = mem_util_threshold
+        self.max_batch_size = max_batch_size
+        self.num_updates = 0
+        self.best = None  # (throughput, batch_size)
+        self.factor = 2
+        self.converged = not tune_batch_size
+
+    def update(self, throughput, mem_util):
+        """
+        Update the batch size and the number of processes for the next chunk.
+
+        :param throughput: samples per second of the last chunk.
+        :param mem_util: peak memory utilization during the last chunk.
+        """
+        self.num_updates += 1
+        if mem_util > self.mem_util_threshold:
+            # back off multiplicatively and never grow the batch size again
+            if self.tune_batch_size:
+                self.batch_size = max(1, self.batch_size // 2)
+                self.max_batch_size = self.batch_size
+                self.converged = True
+            self.num_proc = max(1, self.num_proc // 2)
+            return
+        if self.num_proc < self.max_num_proc \
+                and mem_util < self.mem_util_threshold * 0.8:
+            self.num_proc += 1
+        # the first chunk is a warm-up, e.g. models are loaded lazily in it
+        if self.converged or self.num_updates == 1:
+            return
+
+        if self.best is None or \
+                throughput > self.best[0] * (1 + self.MIN_IMPROVEMENT):
+            self.best = (throughput, self.batch_size)
+        elif self.factor > 1 and self.best[1] == self.initial_batch_size:
+            # doubling doesn't help at all, so try halving instead
+            self.factor = 0.5
+        else:
+            self.batch_size = self.best[1]
+            self.converged = True
+            return
+        self.batch_size = min(max(int(self.best[1] * self.factor), 1),
+                              self.max_batch_size)
+        if self.batch_size == self.best[1]:
+            self.converged = True
 
 
 class Adapter:
@@ -73,6 +162,182 @@ class Adapter:
         else:
             return dataset.take(batch_size)
 
+    @staticmethod
+    def probe_filters(samples, filters):
+        """
+        Probe the per-sample cost and the pass ratio of each Filter on the same
+        batch of samples.
+
+        :param samples: a batch of samples in "dict of lists" format.
+        :param filters: the Filters to probe.
+        :return: a list of probe results for each Filter. Each result is a
+            dict with "cost", the average processing time per sample in
+            seconds, and "pass_ratio", the ratio of samples kept by the
+            Filter.
+        """
+        num_samples = len(next(iter(samples.values()), []))
+        probe_res = []
+        for op in filters:
+            # warm up with a single sample first, so that the lazy loading of
+            # models is not counted in the cost
+            op.run_batch({
+                key: copy.deepcopy(value[:1])
+                for key, value in samples.items()
+            })
+            batch = copy.deepcopy(samples)
+            tstart = time()
+            kept = op.run_batch(batch)
+            tend = time()
+            num_kept = len(next(iter(kept.values()), []))
+            probe_res.append({
+                'cost': (tend - tstart) / num_samples,
+                'pass_ratio': num_kept / num_samples,
+            })
+        return probe_res
+
+    def reorder_filters(self, dataset, operators):
+        """
+        Reorder each run of consecutive Filters according to their probed
+        cost and pass ratio.
+
+        Filters in a run are commutative, so the kept samples won't change
+        with their order. Each run is sorted by the expected cost to drop a
+        sample, i.e. cost / (1 - pass_ratio), in ascending order, so that
+        cheap Filters that drop lots of samples are applied first and the
+        expensive ones only process the samples left.
+
+        :param dataset: the dataset to take a probe batch from.
+        :param operators: the op list to reorder.
+        :return: the reordered op list.
+        """
+        if operators is None or len(operators) == 0:
+            return operators
+
+        samples = self.take_batch(dataset, self.cfg).to_dict()
+        new_operators = []
+        filter_run = []
+
+        def flush_filter_run():
+            nonlocal samples
+            num_samples = len(next(iter(samples.values()), []))
+            if len(filter_run) > 1 and num_samples > 0:
+                probe_res = self.probe_filters(samples, filter_run)
+                ranks = [
+                    res['cost'] / max(1.0 - res['pass_ratio'], 1e-6)
+                    for res in probe_res
+                ]
+                order = sorted(range(len(filter_run)), key=lambda i: ranks[i])
+                logger.info('Reorder filters according to the probe results '
+                            '(cost per sample, pass ratio): ' + ', '.join([
+                                f'{filter_run[i]._name} '
+                                f'({probe_res[i]["cost"] * 1000:.3f}ms, '
+                                f'{probe_res[i]["pass_ratio"]:.2%})'
+                                for i in order
+                            ]))
+                filter_run[:] = [filter_run[i] for i in order]
+            for op in filter_run:
+                new_operators.append(op)
+                if num_samples > 0:
+                    # push the probe batch forward for the following ops
+                    samples = op.run_batch(samples)
+                    num_samples = len(next(iter(samples.values()), []))
+            filter_run.clear()
+
+        for op in operators:
+            if isinstance(op, Filter):
+                filter_run.append(op)
+                continue
+            flush_filter_run()
+            new_operators.append(op)
+            if isinstance(op, Mapper) and \
+                    len(next(iter(samples.values()), [])) > 0:
+                samples = op.run_batch(samples)
+        flush_filter_run()
+
+        return new_operators
+
+    @staticmethod
+    def can_run_adaptively(op):
+        """
+        Check whether an op can be run chunk by chunk with adaptive workloads.
+        Only Mappers and Filters are supported, which process each sample
+        independently. Stats exporting of the op is done on the whole
+        dataset, so it's not supported either.
+        """
+        return isinstance(op, (Mapper, Filter)) \
+            and getattr(op, 'stats_export_path', None) is None
+
+    def run_op_adaptively(self,
+                          op,
+                          dataset,
+                          *,
+                          tracer=None,
+                          sampler=None,
+                          **kwargs):
+        """
+        Run an op on the dataset chunk by chunk, and tune its batch size and
+        number of processes between chunks according to the throughput and
+        the peak memory utilization of the last chunk.
+
+        :param op: the op to run.
+        :param dataset: the input dataset.
+        :param tracer: tracer to trace the changes of the whole dataset.
+        :param sampler: the running `ResourceSampler` to get the peak memory
+            utilization from. If it's None, the memory utilization is only
+            checked after each chunk.
+        :param kwargs: other args for the `run` method of the op.
+        :return: the processed dataset.
+        """
+        from data_juicer.core.data import concatenate_shards
+
+        chunk_size = self.cfg.get('adaptive_chunk_size', 100000)
+        if len(dataset) <= chunk_size:
+            return op.run(dataset, tracer=tracer, **kwargs)
+
+        old_batch_size, old_num_proc = op.batch_size, op.num_proc
+        tuner = WorkloadTuner(
+            op.batch_size,
+            op.runtime_np(),
+            tune_batch_size=op.is_batched_op(),
+            mem_util_threshold=self.cfg.get('adaptive_mem_util_threshold',
+                                            0.85),
+            max_batch_size=self.MAX_BATCH_SIZE)
+        chunks = []
+        try:
+            for start in range(0, len(dataset), chunk_size):
+                end = min(start + chunk_size, len(dataset))
+                op.batch_size, op.num_proc = tuner.batch_size, tuner.num_proc
+                tstart = time()
+                chunks.append(op.run(dataset.select(range(start, end)),
+                                     **kwargs))
+                tend = time()
+                mem_utils = [psutil.virtual_memory().percent / 100.0]
+                if sampler is not None:
+                    mem_utils.extend(record['Mem. util.']
+                                     for record in sampler.get_records(tstart))
+                batch_size, num_proc = tuner.batch_size, tuner.num_proc
+                tuner.update((end - start) / max(tend - tstart, 1e-6),
+                             max(mem_utils))
+                if (batch_size, num_proc) != (tuner.batch_size,
+                                              tuner.num_proc):
+                    logger.info(f'Adjust op [{op._name}] after processing '
+                                f'{end} samples: batch_size {batch_size} -> '
+                                f'{tuner.batch_size}, num_proc {num_proc} -> '
+                                f'{tuner.num_proc}.')
+        finally:
+            op.batch_size, op.num_proc = old_batch_size, old_num_proc
+        # the features of the chunks can be inferred differently, so they
+        # are unified when concatenated
+        new_dataset = concatenate_shards(chunks)
+        # trace the changes of the whole dataset instead of each chunk
+        if tracer:
+            if isinstance(op, Mapper):
+                tracer.trace_mapper(op._name, dataset, new_dataset,
+                                    op.text_key)
+            else:
+                tracer.trace_filter(op._name, dataset, new_dataset)
+        return new_dataset
+
     def adapt_workloads(self, dataset, operators):
         """
         Manage the scheduling and load balancing for the dataset processing.
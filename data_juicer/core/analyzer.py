@@ -6,7 +6,8 @@ from data_juicer.analysis import ColumnWiseAnalysis, OverallAnalysis
 from data_juicer.config import init_configs
 from data_juicer.format import load_formatter
 from data_juicer.ops import Filter, load_ops
-from data_juicer.utils import cache_utils
+from data_juicer.ops.common import WORDS_CACHE
+from data_juicer.utils import cache_utils, model_utils
 
 from .exporter import Exporter
 
@@ -36,6 +37,13 @@ class Analyzer:
             logger.info(f'Using cache compression method: '
                         f'[{self.cfg.cache_compress}]')
             cache_utils.CACHE_COMPRESS = self.cfg.cache_compress
+            cache_utils.CACHE_COMPRESS_BATCHES = \
+                self.cfg.cache_compress_batches
+
+        # share the read-only CPU models loaded by ops with the workers
+        model_utils.SHARE_MODELS = self.cfg.share_models
+        # bound the words split from documents that are cached for the ops
+        WORDS_CACHE.resize(self.cfg.words_cache_size)
 
         # setup formatter
         logger.info('Setting up data formatter...')
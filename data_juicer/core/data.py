@@ -14,7 +14,7 @@ from datasets import Dataset, DatasetDict, is_caching_enabled
 from datasets.formatting.formatting import LazyBatch
 from loguru import logger
 
-from data_juicer.core.monitor import Monitor
+from data_juicer.core.monitor import ResourceSampler
 from data_juicer.ops import UNFORKABLE
 from data_juicer.utils import cache_utils
 from data_juicer.utils.compress import (CompressionOff,
@@ -74,6 +74,21 @@ def wrap_func_with_nested_access(f):
     return wrapped_f
 
 
+def is_columnar_method(func):
+    """Check whether the function is a bound method of a columnar op."""
+    return inspect.ismethod(func) and hasattr(
+        func.__self__, 'is_columnar_op') and func.__self__.is_columnar_op()
+
+
+def replace_function(args, kargs, function):
+    """Replace the function in the args or kargs of map/filter."""
+    if args:
+        args[0] = function
+    else:
+        kargs['function'] = function
+    return args, kargs
+
+
 def nested_obj_factory(obj):
     """
     Use nested classes to wrap the input object.
@@ -170,7 +185,8 @@ class NestedDataset(Dataset, DJDataset):
                 work_dir=None,
                 exporter=None,
                 checkpointer=None,
-                tracer=None):
+                tracer=None,
+                adapter=None):
         if operators is None:
             return self
 
@@ -178,8 +194,11 @@ class NestedDataset(Dataset, DJDataset):
             operators = [operators]
         unforkable_operators = set(UNFORKABLE.modules.keys())
 
-        # resource utilization monitor
+        # resource utilization monitor, which samples in the background and
+        # streams the timeline to the work dir during the whole processing
         resource_util_list = []
+        sampler = ResourceSampler(work_dir)
+        sampler.start()
 
         dataset = self
         try:
@@ -196,12 +215,30 @@ class NestedDataset(Dataset, DJDataset):
                     'exporter': exporter,
                     'tracer': tracer,
                 }
-                dataset, resource_util_per_op = Monitor.monitor_func(
-                    op.run, args=run_args)
+                run_func = op.run
+                if checkpointer is not None \
+                        and checkpointer.can_run_in_shards(op):
+                    run_args['op'] = op
+                    run_func = checkpointer.run_op_in_shards
+                elif adapter is not None and adapter.can_run_adaptively(op):
+                    # tune the workloads of the op between chunks
+                    run_args['op'] = op
+                    run_args['sampler'] = sampler
+                    run_func = adapter.run_op_adaptively
+                sampler.begin_op(op._name)
+                dataset = run_func(**run_args)
                 # record processed ops
                 if checkpointer is not None:
                     checkpointer.record(op._op_cfg)
-                resource_util_list.append(resource_util_per_op)
+                    if checkpointer.shard_size is not None:
+                        # checkpoint after each op, and continue with the
+                        # saved dataset, so the finished shards can be
+                        # cleaned up
+                        checkpointer.save_ckpt(dataset)
+                        dataset = checkpointer.load_ckpt()
+                        checkpointer.cleanup_progress()
+                resource_util_list.append(
+                    sampler.end_op(op._name, len(dataset)))
                 end = time()
                 logger.info(f'OP [{op._name}] Done in {end - start:.3f}s. '
                             f'Left {len(dataset)} samples.')
@@ -210,7 +247,10 @@ class NestedDataset(Dataset, DJDataset):
             traceback.print_exc()
             exit(1)
         finally:
-            if checkpointer and dataset is not self:
+            sampler.stop()
+            if checkpointer and dataset is not self \
+                    and checkpointer.num_saved_ops != len(
+                        checkpointer.op_record):
                 logger.info('Writing checkpoint of dataset processed by '
                             'last op...')
                 dataset.cleanup_cache_files()
@@ -223,6 +263,7 @@ class NestedDataset(Dataset, DJDataset):
     def map(self, *args, **kargs):
         """Override the map func, which is called by most common operations,
         such that the processed samples can be accessed by nested manner."""
+        raw_function = args[0] if args else kargs.get('function', None)
         if args:
             args = list(args)
             # the first positional para is function
@@ -244,7 +285,14 @@ class NestedDataset(Dataset, DJDataset):
                 called_func, '__wrapped__'):
             called_func = called_func.__wrapped__
 
-        if inspect.ismethod(called_func):
+        is_columnar = is_columnar_method(called_func)
+        if is_columnar:
+            # columnar ops process Arrow tables directly, so they are
+            # neither wrapped for nested access nor converted to dicts
+            args, kargs = replace_function(args, kargs, raw_function)
+            kargs['batched'] = True
+            kargs['batch_size'] = kargs.pop('batch_size', 1)
+        elif inspect.ismethod(called_func):
             # batched is required for fault-tolerant or batched OP
             if not called_func.__self__.turbo or hasattr(
                     called_func.__self__,
@@ -264,7 +312,12 @@ class NestedDataset(Dataset, DJDataset):
             decompress(self, kargs['new_fingerprint'],
                        kargs['num_proc'] if 'num_proc' in kargs else 1)
 
-        new_ds = NestedDataset(super().map(*args, **kargs))
+        if is_columnar:
+            new_ds = NestedDataset(
+                Dataset.map(self.with_format('arrow'), *args,
+                            **kargs).with_format(self.format['type']))
+        else:
+            new_ds = NestedDataset(super().map(*args, **kargs))
 
         if cache_utils.CACHE_COMPRESS:
             compress(self, new_ds,
@@ -278,6 +331,7 @@ class NestedDataset(Dataset, DJDataset):
     def filter(self, *args, **kargs):
         """Override the filter func, which is called by most common operations,
         such that the processed samples can be accessed by nested manner."""
+        raw_function = args[0] if args else kargs.get('function', None)
         if args:
             args = list(args)
             # the first positional para is function
@@ -299,6 +353,10 @@ class NestedDataset(Dataset, DJDataset):
                 called_func, '__wrapped__'):
             called_func = called_func.__wrapped__
 
+        is_columnar = is_columnar_method(called_func)
+        if is_columnar:
+            args, kargs = replace_function(args, kargs, raw_function)
+
         # Batched is always required for fault tolerance
         if inspect.ismethod(
                 called_func) and called_func.__self__.is_batched_op():
@@ -325,7 +383,14 @@ class NestedDataset(Dataset, DJDataset):
         with CompressionOff():
             prev_state = self.need_to_cleanup_caches
             self.need_to_cleanup_caches = False
-            new_ds = NestedDataset(super().filter(*args, **kargs))
+            if is_columnar:
+                arrow_ds = self.with_format('arrow')
+                arrow_ds.need_to_cleanup_caches = False
+                new_ds = NestedDataset(
+                    Dataset.filter(arrow_ds, *args,
+                                   **kargs).with_format(self.format['type']))
+            else:
+                new_ds = NestedDataset(super().filter(*args, **kargs))
             self.need_to_cleanup_caches = prev_state
 
         if cache_utils.CACHE_COMPRESS:
@@ -435,3 +500,53 @@ def add_same_content_to_new_column(sample,
     """
     sample[new_column_name] = initial_value
     return sample
+
+
+def unify_features(first, other):
+    """
+    Unify two features of the same column. A feature that is inferred as
+    null, e.g. the element of a list that is always empty, takes the type of
+    the other one.
+
+    :param first: the first feature.
+    :param other: the other feature.
+    :return: the unified feature.
+    """
+    from datasets import Sequence, Value
+    if isinstance(first, Value) and first.dtype == 'null':
+        return other
+    if isinstance(other, Value) and other.dtype == 'null':
+        return first
+    if isinstance(first, Sequence) and isinstance(other, Sequence):
+        return Sequence(unify_features(first.feature, other.feature),
+                        length=first.length)
+    if isinstance(first, list) and isinstance(other, list) \
+            and len(first) == len(other) == 1:
+        return [unify_features(first[0], other[0])]
+    if isinstance(first, dict) and isinstance(other, dict):
+        return type(first)({
+            key: unify_features(value, other[key]) if key in other else value
+            for key, value in first.items()
+        })
+    return first
+
+
+def concatenate_shards(shards):
+    """
+    Concatenate the shards of a dataset that are processed separately. The
+    features of the shards can be inferred differently, e.g. a new list
+    column that is empty in some shards, so all shards are cast to the
+    unified features of them first.
+
+    :param shards: the list of shards in order.
+    :return: the concatenated dataset.
+    """
+    from datasets import concatenate_datasets
+    features = shards[0].features
+    for shard in shards[1:]:
+        features = unify_features(features, shard.features)
+    shards = [
+        shard if shard.features == features else shard.cast(features)
+        for shard in shards
+    ]
+    return NestedDataset(concatenate_datasets(shards))
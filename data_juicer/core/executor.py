@@ -5,17 +5,22 @@ from loguru import logger
 
 from data_juicer.config import init_configs
 from data_juicer.core.data import Dataset
-from data_juicer.format.load import load_formatter
+from data_juicer.format.load import (get_pushdown_suffixes,
+                                     get_referenced_columns, load_formatter)
 from data_juicer.format.mixture_formatter import MixtureFormatter
-from data_juicer.ops import OPERATORS, load_ops
-from data_juicer.utils import cache_utils
+from data_juicer.ops import OPERATORS, Deduplicator, load_ops
+from data_juicer.ops.common import WORDS_CACHE
+from data_juicer.ops.load import fuse_ops
+from data_juicer.utils import cache_utils, model_utils
 from data_juicer.utils.ckpt_utils import CheckpointManager
 
 from ..ops.selector.frequency_specified_field_selector import \
     FrequencySpecifiedFieldSelector
 from ..ops.selector.topk_specified_field_selector import \
     TopkSpecifiedFieldSelector
+from .adapter import Adapter
 from .exporter import Exporter
+from .streaming import StreamingProcessor
 from .tracer import Tracer
 
 
@@ -45,15 +50,36 @@ class Executor:
             logger.info(f'Using cache compression method: '
                         f'[{self.cfg.cache_compress}]')
             cache_utils.CACHE_COMPRESS = self.cfg.cache_compress
+            cache_utils.CACHE_COMPRESS_BATCHES = \
+                self.cfg.cache_compress_batches
+
+        # share the read-only CPU models loaded by ops with the workers
+        model_utils.SHARE_MODELS = self.cfg.share_models
+        # bound the words split from documents that are cached for the ops
+        WORDS_CACHE.resize(self.cfg.words_cache_size)
 
         # setup formatter
         logger.info('Setting up data formatter...')
+        # push the column projection and the suffix_filter down to the
+        # formatter, so unneeded columns and files are never loaded
+        load_args = {}
+        if self.cfg.load_columns == 'auto':
+            load_args['columns'] = get_referenced_columns(
+                self.cfg.text_keys, self.cfg.image_key, self.cfg.audio_key,
+                self.cfg.video_key, self.cfg.process)
+            logger.info(f'Only load the columns referenced by ops: '
+                        f'{load_args["columns"]}')
+        elif self.cfg.load_columns is not None:
+            load_args['columns'] = self.cfg.load_columns
         self.formatter = load_formatter(
             dataset_path=self.cfg.dataset_path,
             generated_dataset_config=self.cfg.generated_dataset_config,
             text_keys=self.cfg.text_keys,
-            suffixes=self.cfg.suffixes,
-            add_suffix=self.cfg.add_suffix)
+            suffixes=get_pushdown_suffixes(self.cfg.suffixes,
+                                           self.cfg.add_suffix,
+                                           self.cfg.process),
+            add_suffix=self.cfg.add_suffix,
+            **load_args)
 
         # whether to use checkpoint mechanism. If it's true, Executor will
         # check if there are existing checkpoints first and try to load the
@@ -62,9 +88,11 @@ class Executor:
         if self.cfg.use_checkpoint:
             logger.info('Preparing checkpoint manager...')
             self.ckpt_dir = os.path.join(self.work_dir, 'ckpt')
-            self.ckpt_manager = CheckpointManager(self.ckpt_dir,
-                                                  self.cfg.process,
-                                                  self.cfg.np)
+            self.ckpt_manager = CheckpointManager(
+                self.ckpt_dir,
+                self.cfg.process,
+                self.cfg.np,
+                shard_size=self.cfg.checkpoint_shard_size)
             if self.ckpt_manager.ckpt_available:
                 logger.info('Found existed dataset checkpoint.')
                 self.cfg.process = self.ckpt_manager.get_left_process_list()
@@ -140,7 +168,9 @@ class Executor:
         Running the dataset process pipeline.
 
         :param load_data_np: number of workers when loading the dataset.
-        :return: processed dataset.
+        :return: processed dataset. In the streaming mode, the processed
+            samples are written to the export path on the fly and None is
+            returned.
         """
         # 1. format data
         if self.cfg.use_checkpoint and self.ckpt_manager.ckpt_available:
@@ -154,24 +184,72 @@ class Executor:
 
         # 2. extract processes
         logger.info('Preparing process operators...')
-        ops = load_ops(self.cfg.process, self.cfg.op_fusion)
+        if self.cfg.reorder_filters:
+            # probe the unfused filters and reorder them before fusion. The
+            # probed ops are reused, so their models are loaded only once
+            logger.info('Probing filters to reorder them...')
+            ops = Adapter(self.cfg).reorder_filters(dataset,
+                                                    load_ops(self.cfg.process))
+            ops = fuse_ops([op._op_cfg for op in ops], ops,
+                           self.cfg.op_fusion, self.cfg.general_fusion)
+        else:
+            ops = load_ops(self.cfg.process, self.cfg.op_fusion,
+                           self.cfg.general_fusion)
+
+        # 3. data process in streaming mode, which exports the processed
+        # samples on the fly without materializing the dataset of each op
+        if self.cfg.use_streaming:
+            if self.open_tracer:
+                logger.warning('Tracer is not supported in the streaming '
+                               'mode. Fall back to the default mode.')
+            elif self.exporter.suffix not in Exporter.STREAM_SUFFIXES:
+                logger.warning(f'Only {list(Exporter.STREAM_SUFFIXES)} '
+                               f'export formats are supported in the '
+                               f'streaming mode, but got '
+                               f'[{self.exporter.suffix}]. Fall back to the '
+                               f'default mode.')
+            elif StreamingProcessor.is_streamable(ops):
+                logger.info('Processing data in streaming mode...')
+                num_proc = min([self.cfg.np] +
+                               [op.runtime_np() for op in ops])
+                processor = StreamingProcessor(
+                    ops,
+                    batch_size=self.cfg.streaming_batch_size,
+                    num_proc=num_proc)
+                tstart = time()
+                processor.run(dataset, self.exporter)
+                tend = time()
+                logger.info(f'All OPs are done and the processed dataset is '
+                            f'exported in {tend - tstart:.3f}s.')
+                return None
+            else:
+                logger.warning('Fall back to the default mode.')
 
         # 3. data process
         # - If tracer is open, trace each op after it's processed
         # - If checkpoint is open, clean the cache files after each process
+        # - If adaptive workloads is on, tune the batch size and num_proc of
+        #   each op while it's running
         logger.info('Processing data...')
+        adapter = Adapter(self.cfg) if self.cfg.adaptive_workloads else None
         tstart = time()
         dataset = dataset.process(ops,
                                   work_dir=self.work_dir,
                                   exporter=self.exporter,
                                   checkpointer=self.ckpt_manager,
-                                  tracer=self.tracer)
+                                  tracer=self.tracer,
+                                  adapter=adapter)
         tend = time()
         logger.info(f'All OPs are done in {tend - tstart:.3f}s.')
 
         # 4. data export
         logger.info('Exporting dataset to disk...')
         self.exporter.export(dataset)
+        # commit the states of ops that should only be persisted once the
+        # result is exported, e.g. the hash indexes of deduplicators
+        for op in ops:
+            if isinstance(op, Deduplicator):
+                op.commit()
         # compress the last dataset after exporting
         if self.cfg.use_cache and self.cfg.cache_compress:
             from data_juicer.utils.compress import compress
@@ -1,6 +1,12 @@
+import gzip
+import json
 import os
+import threading
 from multiprocessing import Pool
+from queue import Queue
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 from loguru import logger
 
 from data_juicer.utils.constant import Fields, HashKeys
@@ -15,6 +21,18 @@ class Exporter:
     GiB = 2**30  # 1024*1024*1024
     TiB = 2**40  # 1024*1024*1024*1024
 
+    # suffixes of compressed jsonl files to the compression methods
+    COMPRESSIONS = {'gz': 'gzip', 'zst': 'zstd'}
+    # formats that can be written batch by batch
+    STREAM_SUFFIXES = ('jsonl', 'parquet')
+    # number of samples of each batch when exporting a dataset batch by batch
+    STREAM_BATCH_SIZE = 1000
+    # max number of batches waiting to be written, which bounds the memory
+    # when the writing is slower than the processing
+    STREAM_QUEUE_SIZE = 8
+    # max bytes of the buffered samples of each row group in parquet files
+    PARQUET_ROW_GROUP_NBYTES = 128 * MiB
+
     def __init__(self,
                  export_path,
                  export_shard_size=0,
@@ -46,6 +64,7 @@ class Exporter:
         self.keep_stats_in_res_ds = keep_stats_in_res_ds
         self.keep_hashes_in_res_ds = keep_hashes_in_res_ds
         self.export_stats = export_stats
+        self.compression = self._get_compression(export_path)
         self.suffix = self._get_suffix(export_path)
         self.num_proc = num_proc
         self.max_shard_size_str = ''
@@ -78,15 +97,34 @@ class Exporter:
                            f'single shard file and make loading and exporting '
                            f'slower.')
 
+    def _get_compression(self, export_path):
+        """
+        Get the compression method from the export path, e.g. "zstd" for
+        "*.jsonl.zst". Only jsonl files can be compressed for now.
+
+        :param export_path: the path to export datasets.
+        :return: the compression method, or None for uncompressed files.
+        """
+        parts = export_path.split('.')
+        compression = self.COMPRESSIONS.get(parts[-1].lower())
+        if compression is not None and parts[-2].lower() != 'jsonl':
+            raise NotImplementedError(f'Compression of export path ['
+                                      f'{export_path}] is only supported '
+                                      f'for jsonl format for now.')
+        return compression
+
     def _get_suffix(self, export_path):
         """
         Get the suffix of export path and check if it's supported.
 
-        We only support ["jsonl", "json", "parquet"] for now.
+        We only support ["jsonl", "json", "parquet"] for now, and jsonl files
+        can be compressed with the extra suffixes ["gz", "zst"].
 
         :param export_path: the path to export datasets.
         :return: the suffix of export_path.
         """
+        if self.compression is not None:
+            export_path = export_path.rsplit('.', 1)[0]
         suffix = export_path.split('.')[-1].lower()
         support_dict = self._router()
         if suffix not in support_dict:
@@ -96,6 +134,43 @@ class Exporter:
                                       f'{list(support_dict.keys())}.')
         return suffix
 
+    def _get_shard_filenames(self, num_shards):
+        """
+        Get the file names of shards, which regard the export path as a
+        directory.
+
+        :param num_shards: number of shards.
+        :return: list of file names.
+        """
+        len_num = len(str(num_shards)) + 1
+        num_fmt = f'%0{len_num}d'
+        dirname = os.path.dirname(os.path.abspath(self.export_path))
+        basename = os.path.basename(self.export_path).split('.')[0]
+        if self.compression is not None:
+            extension = '.'.join(self.export_path.split('.')[-2:])
+        else:
+            extension = self.suffix
+        return [
+            os.path.join(
+                dirname, f'{basename}-{num_fmt % index}-of-'
+                f'{num_fmt % num_shards}'
+                f'.{extension}') for index in range(num_shards)
+        ]
+
+    def _get_removed_fields(self):
+        removed_fields = set()
+        if not self.keep_stats_in_res_ds:
+            removed_fields.add(Fields.stats)
+        if not self.keep_hashes_in_res_ds:
+            removed_fields.update({
+                HashKeys.hash,
+                HashKeys.minhash,
+                HashKeys.simhash,
+                HashKeys.imagehash,
+                HashKeys.videohash,
+            })
+        return removed_fields
+
     def _export_impl(self, dataset, export_path, suffix, export_stats=True):
         """
         Export a dataset to specific path.
@@ -118,22 +193,10 @@ class Exporter:
 
         if self.export_ds:
             # fetch the corresponding export method according to the suffix
-            if not self.keep_stats_in_res_ds:
-                extra_fields = {Fields.stats}
-                feature_fields = set(dataset.features.keys())
-                removed_fields = extra_fields.intersection(feature_fields)
-                dataset = dataset.remove_columns(removed_fields)
-            if not self.keep_hashes_in_res_ds:
-                extra_fields = {
-                    HashKeys.hash,
-                    HashKeys.minhash,
-                    HashKeys.simhash,
-                    HashKeys.imagehash,
-                    HashKeys.videohash,
-                }
-                feature_fields = set(dataset.features.keys())
-                removed_fields = extra_fields.intersection(feature_fields)
-                dataset = dataset.remove_columns(removed_fields)
+            removed_fields = self._get_removed_fields().intersection(
+                set(dataset.features.keys()))
+            if removed_fields:
+                dataset = dataset.remove_columns(list(removed_fields))
             export_method = Exporter._router()[suffix]
             if self.export_shard_size <= 0:
                 # export the whole dataset into one single file.
@@ -161,20 +224,10 @@ class Exporter:
                                   index=i,
                                   contiguous=True) for i in range(num_shards)
                 ]
-                len_num = len(str(num_shards)) + 1
-                num_fmt = f'%0{len_num}d'
-
                 # regard the export path as a directory and set file names for
                 # each shard
-                dirname = os.path.dirname(os.path.abspath(self.export_path))
-                basename = os.path.basename(self.export_path).split('.')[0]
-                os.makedirs(dirname, exist_ok=True)
-                filenames = [
-                    os.path.join(
-                        dirname, f'{basename}-{num_fmt % index}-of-'
-                        f'{num_fmt % num_shards}'
-                        f'.{self.suffix}') for index in range(num_shards)
-                ]
+                filenames = self._get_shard_filenames(num_shards)
+                os.makedirs(os.path.dirname(filenames[0]), exist_ok=True)
 
                 # export dataset into multiple shards using multiprocessing
                 logger.info(f'Start to exporting to {num_shards} shards.')
@@ -195,9 +248,146 @@ class Exporter:
         :param dataset: the dataset to export.
         :return:
         """
+        if self.compression is not None:
+            # HF datasets can't write all the compression methods, so the
+            # dataset is written batch by batch with the compressed writers
+            self.export_stream(
+                dataset.iter(batch_size=Exporter.STREAM_BATCH_SIZE))
+            return
         self._export_impl(dataset, self.export_path, self.suffix,
                           self.export_stats)
 
+    def export_stream(self, batches):
+        """
+        Export method for an iterator of processed batches, which writes each
+        batch to the export path as soon as it's produced. It's used by the
+        streaming mode and supports jsonl (optionally compressed) and parquet
+        formats.
+
+        Batches are written by a background thread, so the serialization,
+        compression and writing overlap with the processing of the following
+        batches. When export_shard_size is set, the writer rolls over to a
+        new shard file once the bytes written to the current shard reach it,
+        and the stats are written to a single stats file in the same pass.
+
+        :param batches: an iterator of batches in "dict of lists" format.
+        :return: number of exported samples.
+        """
+        if self.suffix not in Exporter.STREAM_SUFFIXES:
+            raise NotImplementedError(f'Streaming export only supports '
+                                      f'{list(Exporter.STREAM_SUFFIXES)} '
+                                      f'formats for now, but got '
+                                      f'[{self.suffix}].')
+        os.makedirs(os.path.dirname(os.path.abspath(self.export_path)),
+                    exist_ok=True)
+        queue = Queue(maxsize=Exporter.STREAM_QUEUE_SIZE)
+        result = {'num_samples': 0, 'error': None}
+        writer_thread = threading.Thread(target=self._write_batches,
+                                         args=(queue, result),
+                                         daemon=True)
+        writer_thread.start()
+        try:
+            for batch in batches:
+                if result['error'] is not None:
+                    break
+                queue.put(batch)
+        finally:
+            queue.put(None)
+            writer_thread.join()
+        if result['error'] is not None:
+            raise result['error']
+        return result['num_samples']
+
+    def _open_writer(self, path):
+        if self.suffix == 'parquet':
+            row_group_nbytes = Exporter.PARQUET_ROW_GROUP_NBYTES
+            if self.export_shard_size > 0:
+                row_group_nbytes = min(row_group_nbytes,
+                                       self.export_shard_size)
+            return ParquetShardWriter(path, row_group_nbytes)
+        return JsonlShardWriter(path, self.compression)
+
+    def _write_batches(self, queue, result):
+        """
+        Write the batches from the queue until a None is received. Errors
+        are recorded in the result, and the following batches are drained
+        without writing, so the producer is never blocked.
+        """
+        removed_fields = self._get_removed_fields()
+        stats_file = self.export_path.replace('.' + self.suffix,
+                                              '_stats.jsonl')
+        stats_compression = None
+        if self.suffix == 'jsonl':
+            stats_compression = self.compression
+        shard_paths = []
+        writer, stats_writer = None, None
+        if self.export_ds and self.export_shard_size <= 0:
+            shard_paths.append(self.export_path)
+            writer = self._open_writer(self.export_path)
+        try:
+            while True:
+                batch = queue.get()
+                if batch is None:
+                    break
+                if result['error'] is not None:
+                    continue
+                try:
+                    num_samples = len(next(iter(batch.values()), []))
+                    if num_samples == 0:
+                        continue
+                    if self.export_stats and Fields.stats in batch:
+                        # export stats of datasets into a single file in the
+                        # same pass
+                        if stats_writer is None:
+                            stats_writer = JsonlShardWriter(
+                                stats_file, stats_compression)
+                        stats_writer.write(
+                            {Fields.stats: batch[Fields.stats]})
+                    if self.export_ds:
+                        if writer is None or (
+                                self.export_shard_size > 0 and
+                                writer.tell() >= self.export_shard_size):
+                            # roll over to a new shard
+                            if writer is not None:
+                                writer.close()
+                            path = f'{self.export_path}.' \
+                                   f'{len(shard_paths)}.tmp'
+                            shard_paths.append(path)
+                            writer = self._open_writer(path)
+                        writer.write({
+                            k: v
+                            for k, v in batch.items()
+                            if k not in removed_fields
+                        })
+                    result['num_samples'] += num_samples
+                except Exception as e:
+                    result['error'] = e
+        finally:
+            if writer is not None:
+                writer.close()
+            if stats_writer is not None:
+                stats_writer.close()
+        if self.export_shard_size > 0 and result['error'] is None:
+            # the number of shards is known now, so rename them to the same
+            # names as the ones in the default mode
+            for path, filename in zip(
+                    shard_paths, self._get_shard_filenames(len(shard_paths))):
+                os.replace(path, filename)
+
+    @staticmethod
+    def _iter_rows(batch):
+        """
+        Iterate over rows of a batch in "dict of lists" format.
+
+        :param batch: the batch to iterate.
+        :return: an iterator of samples.
+        """
+        keys = list(batch.keys())
+        if not keys:
+            return
+        for i in range(len(batch[keys[0]])):
+            yield {key: batch[key][i] for key in keys}
+
     def export_compute_stats(self, dataset, export_path):
         """
         Export method for saving compute status in filters
@@ -264,3 +454,265 @@ class Exporter:
             'json': Exporter.to_json,
             'parquet': Exporter.to_parquet,
         }
+
+
+class JsonlShardWriter:
+    """
+    Writer of a jsonl file, which writes batches of samples as they come
+    and compresses them on the fly.
+    """
+
+    def __init__(self, path, compression=None):
+        """
+        Initialization method.
+
+        :param path: path of the file to write.
+        :param compression: the compression method, which can be "gzip",
+            "zstd" or None.
+        """
+        self.raw = open(path, 'wb')
+        if compression == 'gzip':
+            self.fout = gzip.GzipFile(fileobj=self.raw, mode='wb')
+        elif compression == 'zstd':
+            import zstandard as zstd
+            self.fout = zstd.ZstdCompressor().stream_writer(self.raw,
+                                                            closefd=False)
+        elif compression is None:
+            self.fout = self.raw
+        else:
+            raise NotImplementedError(f'Compression method [{compression}] '
+                                      f'is not supported for now.')
+
+    def write(self, batch):
+        """
+        Write a batch of samples.
+
+        :param batch: the batch in "dict of lists" format.
+        """
+        lines = [
+            json.dumps(sample, ensure_ascii=False) + '\n'
+            for sample in Exporter._iter_rows(batch)
+        ]
+        self.fout.write(''.join(lines).encode('utf-8'))
+        if self.fout is not self.raw:
+            # end the compressed block, so the size of the file is up to date
+            # for the rollover
+            self.fout.flush()
+
+    def tell(self):
+        """Number of bytes written to the file."""
+        return self.raw.tell()
+
+    def close(self):
+        if self.fout is not self.raw:
+            self.fout.close()
+        self.raw.close()
+
+
+class ParquetShardWriter:
+    """
+    Writer of a parquet file, which buffers batches of samples and writes
+    them as a row group once the buffered bytes reach the row group size.
+
+    Types inferred from different batches might be different, e.g. a field
+    that is None in the first batches, or a struct field that gains new
+    sub-fields later, so the schema is unified across batches. The schema of
+    a parquet file is fixed once its first row group is written, so the
+    first row group is held back until no fields are of the null type, or
+    until the buffered bytes reach MAX_PENDING_ROW_GROUPS row groups. A
+    batch that doesn't fit into the written schema raises an error instead
+    of dropping its data.
+    """
+
+    MAX_PENDING_ROW_GROUPS = 4
+
+    def __init__(self, path, row_group_nbytes):
+        """
+        Initialization method.
+
+        :param path: path of the file to write.
+        :param row_group_nbytes: max bytes of the buffered samples of each
+            row group.
+        """
+        self.raw = open(path, 'wb')
+        self.row_group_nbytes = row_group_nbytes
+        self.writer = None
+        self.schema = None
+        self.buffer = []
+        self.buffer_nbytes = 0
+
+    def write(self, batch):
+        """
+        Write a batch of samples.
+
+        :param batch: the batch in "dict of lists" format.
+        """
+        table = pa.Table.from_pydict(batch)
+        if self.schema is None:
+            self.schema = table.schema
+        else:
+            schema = unify_arrow_schemas(self.schema, table.schema)
+            if self.writer is not None and not schema.equals(self.schema):
+                raise ValueError(
+                    f'The schema of the batch does not fit into the schema '
+                    f'of the parquet file written already: {table.schema} '
+                    f'vs. {self.schema}')
+            self.schema = schema
+        self.buffer.append(table)
+        self.buffer_nbytes += table.nbytes
+        if self.buffer_nbytes < self.row_group_nbytes:
+            return
+        if self.writer is None and has_null_type(self.schema) \
+                and self.buffer_nbytes < self.row_group_nbytes * \
+                self.MAX_PENDING_ROW_GROUPS:
+            # wait for the types of the null fields
+            return
+        self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.raw, self.schema)
+        table = pa.concat_tables(
+            [cast_arrow_table(table, self.schema) for table in self.buffer])
+        self.writer.write_table(table, row_group_size=len(table))
+        self.buffer = []
+        self.buffer_nbytes = 0
+
+    def tell(self):
+        """Number of bytes written to the file."""
+        return self.raw.tell()
+
+    def close(self):
+        self.flush()
+        if self.writer is None:
+            # write a valid parquet file without any samples
+            pq.write_table(pa.table({}), self.raw)
+        else:
+            self.writer.close()
+        self.raw.close()
+
+
+def has_null_type(schema):
+    """Check whether any field or nested field of a schema is null-typed."""
+
+    def _has_null_type(data_type):
+        if pa.types.is_null(data_type):
+            return True
+        return any(
+            _has_null_type(data_type.field(i).type)
+            for i in range(data_type.num_fields))
+
+    return any(_has_null_type(field.type) for field in schema)
+
+
+def unify_arrow_types(first, other):
+    """
+    Unify two Arrow types inferred for the same field. Null types take the
+    other types, structs take the union of their fields, lists unify their
+    value types, and integers are promoted to floats.
+
+    :param first: the first type.
+    :param other: the other type.
+    :return: the unified type.
+    """
+    if first.equals(other) or pa.types.is_null(other):
+        return first
+    if pa.types.is_null(first):
+        return other
+    if pa.types.is_struct(first) and pa.types.is_struct(other):
+        return pa.struct(unify_arrow_fields(list(first), list(other)))
+    if pa.types.is_list(first) and pa.types.is_list(other):
+        return pa.list_(unify_arrow_types(first.value_type, other.value_type))
+    if pa.types.is_large_list(first) and pa.types.is_large_list(other):
+        return pa.large_list(
+            unify_arrow_types(first.value_type, other.value_type))
+    numeric = (pa.types.is_integer, pa.types.is_floating)
+    if any(is_type(first) for is_type in numeric) \
+            and any(is_type(other) for is_type in numeric):
+        return pa.float64()
+    raise TypeError(f'Conflict types: {first} vs. {other}')
+
+
+def unify_arrow_fields(first, other):
+    """
+    Unify two lists of fields with `unify_arrow_types`. Fields are ordered by
+    their first appearance.
+
+    :param first: the first list of fields.
+    :param other: the other list of fields.
+    :return: the unified list of fields.
+    """
+    types = {field.name: field.type for field in first}
+    for field in other:
+        if field.name in types:
+            try:
+                types[field.name] = unify_arrow_types(types[field.name],
+                                                      field.type)
+            except TypeError as e:
+                raise TypeError(
+                    f'Conflict types of field [{field.name}]: {e}') from e
+        else:
+            types[field.name] = field.type
+    return [pa.field(name, data_type) for name, data_type in types.items()]
+
+
+def unify_arrow_schemas(first, other):
+    """Unify two schemas with `unify_arrow_fields`."""
+    return pa.schema(unify_arrow_fields(list(first), list(other)))
+
+
+def cast_arrow_array(array, data_type):
+    """
+    Cast an array to a type unified from its type by `unify_arrow_types`.
+    Sub-fields that are missing in structs are filled with nulls.
+
+    :param array: the array to cast.
+    :param data_type: the target type.
+    :return: the cast array.
+    """
+    if array.type.equals(data_type):
+        return array
+    if pa.types.is_null(array.type):
+        return pa.nulls(len(array), data_type)
+    mask = array.is_null() if array.null_count > 0 else None
+    if pa.types.is_struct(data_type):
+        children = dict(
+            zip([field.name for field in array.type], array.flatten()))
+        arrays = [
+            cast_arrow_array(children[field.name], field.type)
+            if field.name in children else pa.nulls(len(array), field.type)
+            for field in data_type
+        ]
+        return pa.StructArray.from_arrays(arrays,
+                                          fields=list(data_type),
+                                          mask=mask)
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        values = cast_arrow_array(array.values, data_type.value_type)
+        return type(array).from_arrays(array.offsets, values, mask=mask)
+    return array.cast(data_type)
+
+
+def cast_arrow_table(table, schema):
+    """
+    Cast a table to a schema unified from its schema by
+    `unify_arrow_schemas`. Missing columns are filled with nulls.
+
+    :param table: the table to cast.
+    :param schema: the target schema.
+    :return: the cast table.
+    """
+    if table.schema.equals(schema):
+        return table
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            chunks = [
+                cast_arrow_array(chunk, field.type)
+                for chunk in table.column(field.name).chunks
+            ]
+            columns.append(pa.chunked_array(chunks, type=field.type))
+        else:
+            columns.append(pa.nulls(len(table), field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
@@ -1,7 +1,15 @@
+import json
+import os
+import threading
 import time
+from collections import deque
 from functools import partial
 from multiprocessing import get_context
 
+import psutil
+from loguru import logger
+from tqdm import tqdm
+
 from data_juicer.utils.resource_utils import (get_cpu_count,
                                               get_cpu_utilization,
                                               query_cuda_info, query_mem_info)
@@ -73,6 +81,8 @@ class Monitor:
         'GPU free mem.',
         'GPU used mem.',
         'GPU util.',
+        'Disk read speed',
+        'Disk write speed',
     }
 
     def __init__(self):
@@ -213,3 +223,286 @@ class Monitor:
             resource_util_dict['time'] = end - start
 
         return ret, resource_util_dict
+
+
+class ResourceSampler:
+    """
+    A long-lived sampler that records the resource utilization and the
+    progress of the running OP in a background thread during the whole data
+    processing, instead of starting a monitor process for each OP.
+
+    Each record contains the fields of `Monitor.monitor_current_resources`,
+    the disk I/O speed in MB/s, the running OP, and the progress of the
+    active progress bars in rows/s. Records are kept in a ring buffer, and
+    they are streamed to a JSONL timeline and a Chrome trace file (which can
+    be opened by chrome://tracing or Perfetto) in the work dir at once, so a
+    long-running job can be inspected while it's still running. The
+    max/min/avg of the resource utilization of the running OP are
+    aggregated from all its records, so they cover the whole OP even when
+    the early records are dropped from the ring buffer.
+    """
+
+    TIMELINE_FILENAME = 'monitor_timeline.jsonl'
+    TRACE_FILENAME = 'monitor_trace.json'
+    # resource fields to draw as counters in the trace
+    TRACE_COUNTERS = [
+        'CPU util.',
+        'Used mem.',
+        'Disk read speed',
+        'Disk write speed',
+        'GPU used mem.',
+        'GPU util.',
+    ]
+
+    def __init__(self, work_dir=None, interval=0.5, buffer_size=7200):
+        """
+        Initialization method.
+
+        :param work_dir: directory to store the timeline and trace files. If
+            it's None, the records are only kept in the ring buffer.
+        :param interval: sampling interval in seconds.
+        :param buffer_size: max number of records kept in the ring buffer.
+        """
+        self.work_dir = work_dir
+        self.interval = interval
+        self.records = deque(maxlen=buffer_size)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.timeline = None
+        self.trace = None
+        self.num_trace_events = 0
+        self.start_time = None
+        self.op_name = None
+        self.op_start = None
+        # field -> [max, min, sum, count] of the records of the running OP
+        self.op_aggregates = {}
+        self.op_num_records = 0
+        self.last_disk_io = None
+        # id of progress bar -> (timestamp, number of finished rows)
+        self.last_progress = {}
+
+    def start(self):
+        """Start sampling in a daemon thread."""
+        self.start_time = time.time()
+        if self.work_dir:
+            os.makedirs(self.work_dir, exist_ok=True)
+            self.timeline = open(
+                os.path.join(self.work_dir, self.TIMELINE_FILENAME), 'w')
+            self.trace = open(
+                os.path.join(self.work_dir, self.TRACE_FILENAME), 'w')
+            self.trace.write('[\n')
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run,
+                                       name='dj-resource-sampler',
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop sampling and close the timeline and trace files."""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        with self.lock:
+            if self.timeline is not None:
+                self.timeline.close()
+                self.timeline = None
+            if self.trace is not None:
+                self.trace.write('\n]\n')
+                self.trace.close()
+                self.trace = None
+
+    def begin_op(self, op_name):
+        """Record the beginning of an OP."""
+        now = time.time()
+        with self.lock:
+            self.op_name = op_name
+            self.op_start = now
+            self.op_aggregates = {}
+            self.op_num_records = 0
+            self._write({'timestamp': now, 'event': 'op_begin', 'op': op_name},
+                        [self._trace_event(op_name, 'B', now)])
+
+    def end_op(self, op_name, num_rows=None):
+        """
+        Record the end of an OP.
+
+        :param op_name: name of the OP.
+        :param num_rows: number of rows left after the OP.
+        :return: the resource utilization dict of the OP in the format of
+            `Monitor.analyze_single_resource_util`. Its resource list only
+            contains the records still in the ring buffer, while the
+            resource analysis and the number of records cover all the
+            records of the OP.
+        """
+        now = time.time()
+        with self.lock:
+            resource = [
+                record for record in self.records
+                if record['timestamp'] >= self.op_start
+            ]
+            op_time = now - self.op_start
+            resource_analysis = {
+                key: {
+                    'max': max_value,
+                    'min': min_value,
+                    'avg': sum_value / count,
+                }
+                for key, (max_value, min_value, sum_value,
+                          count) in self.op_aggregates.items()
+            }
+            num_records = self.op_num_records
+            self._write(
+                {
+                    'timestamp': now,
+                    'event': 'op_end',
+                    'op': op_name,
+                    'time': op_time,
+                    'num_rows': num_rows,
+                }, [self._trace_event(op_name, 'E', now)])
+            self.op_name = None
+            self.op_start = None
+        return {
+            'resource': resource,
+            'time': op_time,
+            'resource_analysis': resource_analysis,
+            'num_records': num_records,
+        }
+
+    def get_records(self, since=0):
+        """Get the records in the ring buffer taken since a timestamp."""
+        with self.lock:
+            return [
+                record for record in self.records
+                if record['timestamp'] >= since
+            ]
+
+    def sample(self):
+        """Take a record of the current resource utilization and progress."""
+        record = Monitor.monitor_current_resources()
+        now = record['timestamp']
+        disk_io = psutil.disk_io_counters()
+        if disk_io is not None:
+            if self.last_disk_io is not None:
+                last_time, last_io = self.last_disk_io
+                duration = max(now - last_time, 1e-6)
+                record['Disk read speed'] = (disk_io.read_bytes - last_io.
+                                             read_bytes) / 2**20 / duration
+                record['Disk write speed'] = (disk_io.write_bytes - last_io.
+                                              write_bytes) / 2**20 / duration
+            self.last_disk_io = (now, disk_io)
+        record['progress'] = self._sample_progress(now)
+
+        trace_events = []
+        for key in self.TRACE_COUNTERS:
+            value = record.get(key)
+            if isinstance(value, list):
+                value = {str(i): v for i, v in enumerate(value)}
+            elif value is not None:
+                value = {'value': value}
+            if value:
+                trace_events.append(self._trace_event(key, 'C', now, value))
+        speeds = {
+            progress['desc']: progress['rows/s']
+            for progress in record['progress']
+            if progress['rows/s'] is not None
+        }
+        if speeds:
+            trace_events.append(self._trace_event('rows/s', 'C', now, speeds))
+
+        with self.lock:
+            record['op'] = self.op_name
+            self.records.append(record)
+            if self.op_name is not None:
+                self._aggregate(record)
+            self._write(record, trace_events)
+        return record
+
+    def _run(self):
+        # the first call of cpu_percent always returns 0.0
+        psutil.cpu_percent()
+        while not self.stop_event.wait(self.interval):
+            # a failed sample, e.g. failing to query the GPUs, is skipped
+            # instead of stopping the sampler
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f'Failed to sample the resource utilization: '
+                               f'{e}')
+
+    def _aggregate(self, record):
+        # called with the lock held
+        self.op_num_records += 1
+        for key in Monitor.DYNAMIC_FIELDS:
+            values = record.get(key)
+            if values is None:
+                continue
+            if not isinstance(values, list):
+                values = [values]
+            for value in values:
+                aggregate = self.op_aggregates.get(key)
+                if aggregate is None:
+                    self.op_aggregates[key] = [value, value, value, 1]
+                else:
+                    aggregate[0] = max(aggregate[0], value)
+                    aggregate[1] = min(aggregate[1], value)
+                    aggregate[2] += value
+                    aggregate[3] += 1
+
+    def _sample_progress(self, now):
+        """
+        Get the progress of the active progress bars, e.g. the ones of the
+        map and filter of HF datasets, which are updated by the main process
+        even when running with multiple processes.
+        """
+        progress = []
+        active = set()
+        # the instances are added and removed with the lock held by the
+        # threads that create and close the bars
+        with tqdm.get_lock():
+            bars = list(getattr(tqdm, '_instances', []))
+        for bar in bars:
+            if getattr(bar, 'disable', True):
+                continue
+            active.add(id(bar))
+            speed = None
+            if id(bar) in self.last_progress:
+                last_time, last_n = self.last_progress[id(bar)]
+                speed = (bar.n - last_n) / max(now - last_time, 1e-6)
+            self.last_progress[id(bar)] = (now, bar.n)
+            progress.append({
+                'desc': bar.desc,
+                'n': bar.n,
+                'total': bar.total,
+                'rows/s': speed,
+            })
+        for key in set(self.last_progress) - active:
+            del self.last_progress[key]
+        return progress
+
+    def _trace_event(self, name, phase, timestamp, args=None):
+        event = {
+            'name': name,
+            'ph': phase,
+            'ts': int((timestamp - self.start_time) * 1e6),
+            'pid': os.getpid(),
+            'tid': 0,
+        }
+        if args is not None:
+            event['args'] = args
+        return event
+
+    def _write(self, record, trace_events):
+        # called with the lock held
+        if self.timeline is not None:
+            self.timeline.write(json.dumps(record) + '\n')
+            self.timeline.flush()
+        if self.trace is not None and trace_events:
+            for event in trace_events:
+                if self.num_trace_events > 0:
+                    self.trace.write(',\n')
+                self.trace.write(json.dumps(event))
+                self.num_trace_events += 1
+            self.trace.flush()
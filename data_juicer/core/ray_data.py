@@ -5,7 +5,8 @@ from loguru import logger
 
 from data_juicer import cuda_device_count
 from data_juicer.core.data import DJDataset
-from data_juicer.ops import Filter, Mapper
+from data_juicer.ops import Deduplicator, Filter, Mapper
+from data_juicer.ops.common.columnar import empty_stats_column
 from data_juicer.utils.constant import Fields
 from data_juicer.utils.lazy_loader import LazyLoader
 from data_juicer.utils.process_utils import calculate_np
@@ -61,9 +62,8 @@ def preprocess_dataset(dataset: rd.Dataset, dataset_path, cfg) -> rd.Dataset:
         logger.info(f'columns {columns}')
 
         def process_batch_arrow(table: pa.Table) -> pa.Table:
-            new_column_data = [{} for _ in range(len(table))]
-            new_talbe = table.append_column(Fields.stats, [new_column_data])
-            return new_talbe
+            return table.append_column(Fields.stats,
+                                       empty_stats_column(len(table)))
 
         dataset = dataset.map_batches(process_batch_arrow,
                                       batch_format='pyarrow')
@@ -123,9 +123,13 @@ class RayDataset(DJDataset):
                     self.data.write_json(op.stats_export_path,
                                          force_ascii=False)
                 self.data = self.data.filter(op.process)
+            elif isinstance(op, Deduplicator):
+                # deduplicators for Ray process the whole ray dataset in
+                # their run method
+                self.data = op.run(self.data)
             else:
-                logger.error(
-                    'Ray executor only support Filter and Mapper OPs for now')
+                logger.error('Ray executor only support Filter, Mapper and '
+                             'Deduplicator OPs for now')
                 raise NotImplementedError
         except:  # noqa: E722
             logger.error(f'An error occurred during Op [{op._name}].')
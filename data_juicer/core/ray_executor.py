@@ -17,7 +17,8 @@ class RayExecutor:
 
     Run Data-Juicer data processing in a distributed cluster.
 
-        1. Support Filter, Mapper and Exact Deduplicator operators for now.
+        1. Support Filter, Mapper, Exact Deduplicator and MinHash Deduplicator
+           operators for now.
         2. Only support loading `.json` files.
         3. Advanced functions such as checkpoint, tracer are not supported.
 
@@ -0,0 +1,132 @@
+import multiprocess as mp
+from loguru import logger
+from tqdm import tqdm
+
+from data_juicer.ops import UNFORKABLE, Filter, Mapper
+
+# worker-level state, set by the initializer of each streaming worker
+_WORKER_STATE = {}
+
+
+def _init_streaming_worker(processor, dataset):
+    _WORKER_STATE['processor'] = processor
+    _WORKER_STATE['dataset'] = dataset
+
+
+def _process_range_in_worker(index_range):
+    start, end = index_range
+    processor = _WORKER_STATE['processor']
+    dataset = _WORKER_STATE['dataset']
+    return end - start, processor.process_batch(dataset[start:end])
+
+
+class StreamingProcessor:
+    """
+    Process a dataset in the streaming mode.
+
+    Instead of running each op as a full `map`/`filter` pass over the whole
+    dataset, which writes a new cache file for each op, the streaming
+    processor reads the dataset batch by batch, pushes each batch through the
+    whole chain of ops in one worker, and hands the kept samples to the
+    exporter directly. So no intermediate dataset is materialized on disk.
+
+    Only Mappers and Filters (including fused ones) that run on CPU are
+    supported for now, since Deduplicators and Selectors need to see the
+    whole dataset.
+    """
+
+    def __init__(self, operators, batch_size=1000, num_proc=1):
+        """
+        Initialization method.
+
+        :param operators: the list of ops to apply.
+        :param batch_size: number of samples read from the dataset and pushed
+            through the op chain at a time.
+        :param num_proc: number of worker processes.
+        """
+        self.operators = operators
+        self.batch_size = batch_size
+        self.num_proc = num_proc
+
+    @staticmethod
+    def is_streamable(operators):
+        """
+        Check whether the given op list can be processed in the streaming
+        mode.
+
+        :param operators: the list of ops to check.
+        :return: True if all ops are supported, otherwise False.
+        """
+        unforkable_operators = set(UNFORKABLE.modules.keys())
+        for op in operators:
+            if not isinstance(op, (Mapper, Filter)):
+                logger.warning(f'Op [{op._name}] is neither a Mapper nor a '
+                               f'Filter, which is not supported in the '
+                               f'streaming mode.')
+                return False
+            if op.use_cuda() or op._name in unforkable_operators:
+                logger.warning(f'Op [{op._name}] requires cuda or a non-fork '
+                               f'start method, which is not supported in '
+                               f'the streaming mode.')
+                return False
+        return True
+
+    def process_batch(self, samples):
+        """
+        Push a batch of samples through the whole op chain.
+
+        :param samples: a batch of samples in "dict of lists" format.
+        :return: the processed samples that are kept by all ops.
+        """
+        for op in self.operators:
+            samples = op.run_batch(samples)
+            if len(next(iter(samples.values()), [])) == 0:
+                # all samples are filtered out, no need to run the others
+                break
+        return dict(samples)
+
+    def iter_batches(self, dataset):
+        """
+        Process the dataset batch by batch and yield the processed batches in
+        the original order.
+
+        :param dataset: the dataset to process.
+        :return: an iterator of processed batches.
+        """
+        num_samples = len(dataset)
+        index_ranges = [(start, min(start + self.batch_size, num_samples))
+                        for start in range(0, num_samples, self.batch_size)]
+        with tqdm(total=num_samples, desc='Streaming process') as pbar:
+            if self.num_proc <= 1 or len(index_ranges) <= 1:
+                _init_streaming_worker(self, dataset)
+                for index_range in index_ranges:
+                    num_read, batch = _process_range_in_worker(index_range)
+                    pbar.update(num_read)
+                    yield batch
+            else:
+                # workers read their own ranges from the memory-mapped
+                # dataset, so only processed batches are sent back
+                with mp.get_context('fork').Pool(
+                        self.num_proc,
+                        initializer=_init_streaming_worker,
+                        initargs=(self, dataset)) as pool:
+                    for num_read, batch in pool.imap(_process_range_in_worker,
+                                                     index_ranges):
+                        pbar.update(num_read)
+                        yield batch
+
+    def run(self, dataset, exporter):
+        """
+        Process the dataset in the streaming mode and export the kept samples
+        on the fly.
+
+        :param dataset: the dataset to process.
+        :param exporter: the exporter to write the processed samples.
+        :return: number of samples that are kept.
+        """
+        logger.info(f'Streaming {len(dataset)} samples through '
+                    f'{len(self.operators)} ops with batch size '
+                    f'[{self.batch_size}] and [{self.num_proc}] workers...')
+        num_kept = exporter.export_stream(self.iter_batches(dataset))
+        logger.info(f'Left {num_kept} samples after streaming process.')
+        return num_kept
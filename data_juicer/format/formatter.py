@@ -4,7 +4,7 @@ from typing import List, Union
 from datasets import Dataset, DatasetDict, concatenate_datasets, load_dataset
 from loguru import logger
 
-from data_juicer.utils.constant import Fields
+from data_juicer.utils.constant import DEFAULT_PREFIX, Fields
 from data_juicer.utils.file_utils import (find_files_with_suffix,
                                           is_absolute_path)
 from data_juicer.utils.registry import Registry
@@ -30,6 +30,7 @@ class LocalFormatter(BaseFormatter):
         suffixes: Union[str, List[str], None] = None,
         text_keys: List[str] = None,
         add_suffix=False,
+        columns: List[str] = None,
         **kwargs,
     ):
         """
@@ -43,6 +44,8 @@ class LocalFormatter(BaseFormatter):
             text.
         :param add_suffix: whether to add the file suffix to dataset
             meta info
+        :param columns: columns to load. Internal fields of Data-Juicer are
+            always loaded. None means loading all columns.
         :param kwargs: extra args
         """
         self.type = type
@@ -50,6 +53,7 @@ class LocalFormatter(BaseFormatter):
         self.text_keys = text_keys
         self.data_files = find_files_with_suffix(dataset_path, suffixes)
         self.add_suffix = add_suffix
+        self.columns = columns
 
     def load_dataset(self, num_proc: int = 1, global_cfg=None) -> Dataset:
         """
@@ -60,13 +64,13 @@ class LocalFormatter(BaseFormatter):
         :param global_cfg: global cfg used in consequent processes,
         :return: formatted dataset
         """
-        datasets = load_dataset(self.type,
-                                data_files={
-                                    key.strip('.'): self.data_files[key]
-                                    for key in self.data_files
-                                },
-                                num_proc=num_proc,
-                                **self.kwargs)
+        datasets = self.load_files(self.data_files, num_proc)
+        if self.columns is not None:
+            datasets = DatasetDict({
+                key: ds.select_columns(
+                    select_columns(ds.column_names, self.columns))
+                for key, ds in datasets.items()
+            })
         if self.add_suffix:
             logger.info('Add suffix info into dataset...')
             datasets = add_suffixes(datasets, num_proc)
@@ -80,6 +84,22 @@ class LocalFormatter(BaseFormatter):
                           global_cfg=global_cfg)
         return ds
 
+    def load_files(self, data_files, num_proc: int = 1) -> DatasetDict:
+        """
+        Load the data files into datasets without unifying their format.
+
+        :param data_files: a dict from suffixes to lists of files.
+        :param num_proc: number of processes when loading the dataset
+        :return: a DatasetDict from the suffixes without "." to datasets.
+        """
+        return load_dataset(self.type,
+                            data_files={
+                                key.strip('.'): data_files[key]
+                                for key in data_files
+                            },
+                            num_proc=num_proc,
+                            **self.kwargs)
+
 
 class RemoteFormatter(BaseFormatter):
     """The class is used to load a dataset from repository of huggingface
@@ -88,6 +108,7 @@ class RemoteFormatter(BaseFormatter):
     def __init__(self,
                  dataset_path: str,
                  text_keys: List[str] = None,
+                 columns: List[str] = None,
                  **kwargs):
         """
         Initialization method.
@@ -95,10 +116,13 @@ class RemoteFormatter(BaseFormatter):
         :param dataset_path: a dataset file or a dataset directory
         :param text_keys: key names of field that stores sample
             text.
+        :param columns: columns to load. Internal fields of Data-Juicer are
+            always loaded. None means loading all columns.
         :param kwargs: extra args
         """
         self.path = dataset_path
         self.text_keys = text_keys
+        self.columns = columns
         self.kwargs = kwargs
 
     def load_dataset(self, num_proc: int = 1, global_cfg=None) -> Dataset:
@@ -113,6 +137,9 @@ class RemoteFormatter(BaseFormatter):
                           split='train',
                           num_proc=num_proc,
                           **self.kwargs)
+        if self.columns is not None:
+            ds = ds.select_columns(select_columns(ds.column_names,
+                                                  self.columns))
         ds = unify_format(ds,
                           text_keys=self.text_keys,
                           num_proc=num_proc,
@@ -120,6 +147,21 @@ class RemoteFormatter(BaseFormatter):
         return ds
 
 
+def select_columns(column_names: List[str], columns: List[str]):
+    """
+    Select the columns to load from the columns of a dataset. Internal
+    fields of Data-Juicer, e.g. the computed stats, are always selected.
+
+    :param column_names: all columns of the dataset.
+    :param columns: columns to load.
+    :return: the selected columns in their original order.
+    """
+    return [
+        name for name in column_names
+        if name in columns or name.startswith(DEFAULT_PREFIX)
+    ]
+
+
 def add_suffixes(datasets: DatasetDict, num_proc: int = 1) -> Dataset:
     """
     Add suffix filed to datasets.
@@ -199,6 +241,12 @@ def unify_format(
     # TODO: optimize the filtering operation for better efficiency
     logger.info(f'There are {len(dataset)} sample(s) in the original dataset.')
 
+    def has_null_text(dataset, target_keys):
+        if dataset._indices is not None:
+            return True
+        return any(dataset.data.column(key).null_count > 0
+                   for key in target_keys)
+
     def non_empty_text(sample, target_keys):
         for target_key in target_keys:
             # TODO: case for CFT, in which the len(sample[target_key]) == 0
@@ -208,9 +256,12 @@ def unify_format(
                 return False
         return True
 
-    dataset = dataset.filter(non_empty_text,
-                             num_proc=num_proc,
-                             fn_kwargs={'target_keys': text_keys})
+    # the null counts are stored in the Arrow arrays already, so the
+    # filtering pass is skipped if there is no None text at all
+    if has_null_text(dataset, text_keys):
+        dataset = dataset.filter(non_empty_text,
+                                 num_proc=num_proc,
+                                 fn_kwargs={'target_keys': text_keys})
     logger.info(f'{len(dataset)} samples left after filtering empty text.')
 
     # 3. convert relative paths to absolute paths
@@ -1,3 +1,15 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.json as paj
+from datasets import (Dataset, DatasetDict, concatenate_datasets,
+                      is_caching_enabled)
+from datasets.fingerprint import get_temporary_cache_files_directory
+from loguru import logger
+
 from .formatter import FORMATTERS, LocalFormatter
 
 
@@ -7,9 +19,16 @@ class JsonFormatter(LocalFormatter):
     The class is used to load and format json-type files.
 
     Default suffixes is `['.json', '.jsonl', '.jsonl.zst']`
+
+    HF datasets parses each file in a single process, so large jsonl files
+    are split into chunks aligned to line boundaries instead, which are
+    parsed in parallel by the JSON parser of PyArrow.
     """
     SUFFIXES = ['.json', '.jsonl', '.jsonl.zst']
 
+    # jsonl files larger than this size are loaded in chunks of this size
+    CHUNK_SIZE = 64 * 2**20
+
     def __init__(self, dataset_path, suffixes=None, **kwargs):
         """
         Initialization method.
@@ -24,3 +43,182 @@ class JsonFormatter(LocalFormatter):
             type='json',
             **kwargs,
         )
+
+    def load_files(self, data_files, num_proc: int = 1) -> DatasetDict:
+        """
+        Load the data files, where large jsonl files are loaded in chunks
+        in parallel.
+
+        :param data_files: a dict from suffixes to lists of files.
+        :param num_proc: number of processes when loading the dataset
+        :return: a DatasetDict from the suffixes without "." to datasets.
+        """
+        chunked_files, other_files = {}, {}
+        for suffix, files in data_files.items():
+            # extra args of HF json builder are not supported in chunks
+            if suffix == '.jsonl' and num_proc > 1 and not self.kwargs \
+                    and any(os.path.getsize(file) > self.CHUNK_SIZE
+                            for file in files):
+                chunked_files[suffix] = files
+            else:
+                other_files[suffix] = files
+
+        datasets = {}
+        if other_files:
+            datasets.update(super().load_files(other_files, num_proc))
+        for suffix, files in chunked_files.items():
+            try:
+                datasets[suffix.strip('.')] = load_jsonl_in_chunks(
+                    files, self.CHUNK_SIZE, num_proc)
+            except (pa.ArrowInvalid, TypeError) as e:
+                logger.warning(f'Failed to load {suffix} files in chunks: '
+                               f'{e}. Fall back to loading them with HF '
+                               f'datasets.')
+                datasets.update(
+                    super().load_files({suffix: files}, num_proc))
+        return DatasetDict(
+            {key.strip('.'): datasets[key.strip('.')]
+             for key in data_files})
+
+
+def split_lines(path, chunk_size):
+    """
+    Split a file into byte ranges of about chunk_size, whose boundaries are
+    aligned to the start of lines.
+
+    :param path: path to the file.
+    :param chunk_size: the expected size of each range.
+    :return: list of (start, end) byte ranges.
+    """
+    file_size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as fin:
+        while boundaries[-1] + chunk_size < file_size:
+            fin.seek(boundaries[-1] + chunk_size)
+            # move to the start of the next line
+            fin.readline()
+            if fin.tell() >= file_size:
+                break
+            boundaries.append(fin.tell())
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def parse_jsonl_chunk(path, start, end, chunk_file):
+    """
+    Parse a byte range of a jsonl file and write it to an Arrow file. The
+    chunk files that exist already are reused.
+
+    :return: schema of the parsed chunk.
+    """
+    if os.path.exists(chunk_file):
+        with pa.memory_map(chunk_file) as source:
+            return pa.ipc.open_stream(source).schema
+    with open(path, 'rb') as fin:
+        fin.seek(start)
+        data = fin.read(end - start)
+    if data.strip():
+        block_size = 16 * 2**20
+        while True:
+            try:
+                table = paj.read_json(
+                    pa.BufferReader(data),
+                    read_options=paj.ReadOptions(block_size=block_size))
+                break
+            except pa.ArrowInvalid as e:
+                # increase the block size for very long lines
+                if 'straddling' not in str(e) or block_size > len(data):
+                    raise
+                block_size *= 2
+    else:
+        table = pa.table({})
+    write_arrow_file(table, chunk_file)
+    return table.schema
+
+
+def write_arrow_file(table, path):
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def unify_chunk_schemas(schemas):
+    """
+    Unify the schemas inferred from different chunks. Fields are ordered by
+    their first appearance, and null-typed fields take the types from the
+    other chunks.
+
+    :param schemas: list of schemas.
+    :return: the unified schema.
+    """
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            if field.name not in types or pa.types.is_null(types[field.name]):
+                types[field.name] = field.type
+            elif not pa.types.is_null(field.type) \
+                    and field.type != types[field.name]:
+                raise TypeError(f'Conflict types of field [{field.name}]: '
+                                f'{types[field.name]} vs. {field.type}')
+    return pa.schema(list(types.items()))
+
+
+def load_jsonl_in_chunks(files, chunk_size, num_proc):
+    """
+    Load jsonl files by parsing their chunks in parallel. Parsed chunks are
+    stored as Arrow files in the dataset cache directory, i.e. `ds_cache_dir`,
+    and they are memory-mapped and concatenated as the dataset. If caching
+    is disabled, they are stored in a temp directory that is removed at exit
+    instead, and they are not reused across runs.
+
+    :param files: list of jsonl files.
+    :param chunk_size: the expected size of each chunk.
+    :param num_proc: number of chunks to parse at the same time.
+    :return: the loaded dataset.
+    """
+    files = [os.path.abspath(str(file)) for file in files]
+    content = json.dumps({
+        'files': [(file, os.path.getsize(file), os.path.getmtime(file))
+                  for file in files],
+        'chunk_size': chunk_size,
+    })
+    if is_caching_enabled():
+        from datasets import config
+        cache_root = os.path.join(config.HF_DATASETS_CACHE, 'jsonl_chunks')
+    else:
+        cache_root = get_temporary_cache_files_directory()
+    cache_dir = os.path.join(cache_root,
+                             hashlib.md5(content.encode('utf-8')).hexdigest())
+    os.makedirs(cache_dir, exist_ok=True)
+
+    chunks = [(file, start, end) for file in files
+              for start, end in split_lines(file, chunk_size)]
+    chunk_files = [
+        os.path.join(cache_dir, f'chunk-{i:06d}.arrow')
+        for i in range(len(chunks))
+    ]
+    logger.info(f'Loading {len(files)} jsonl files in {len(chunks)} '
+                f'chunks with {num_proc} workers...')
+    # the parser of PyArrow releases the GIL, so threads are enough
+    with ThreadPoolExecutor(num_proc) as pool:
+        schemas = list(
+            pool.map(lambda args: parse_jsonl_chunk(*args[0], args[1]),
+                     zip(chunks, chunk_files)))
+
+    schema = unify_chunk_schemas(schemas)
+    for chunk_schema, chunk_file in zip(schemas, chunk_files):
+        if chunk_schema.equals(schema):
+            continue
+        with pa.memory_map(chunk_file) as source:
+            table = pa.ipc.open_stream(source).read_all()
+        arrays = [
+            table.column(field.name).cast(field.type) if field.name
+            in table.column_names else pa.nulls(len(table), field.type)
+            for field in schema
+        ]
+        write_arrow_file(pa.Table.from_arrays(arrays, schema=schema),
+                         chunk_file)
+    return concatenate_datasets(
+        [Dataset.from_file(chunk_file) for chunk_file in chunk_files])
@@ -1,3 +1,5 @@
+from loguru import logger
+
 from .formatter import BaseFormatter
 from .mixture_formatter import MixtureFormatter
 
@@ -39,3 +41,90 @@ def load_formatter(dataset_path,
                                  add_suffix=add_suffix,
                                  **kwargs)
     return formatter
+
+
+def get_referenced_columns(text_keys, image_key, audio_key, video_key,
+                           process_list):
+    """
+    Get the columns referenced by the ops in the process list, so the other
+    columns don't need to be loaded. They are the text, image, audio and
+    video keys, and the values of the op args named "*_key" or "*_keys",
+    e.g. "field_key" of specified_field_filter. For nested fields like
+    "meta.date", the top-level column "meta" is referenced.
+
+    :param text_keys: key name(s) of field that stores sample text.
+    :param image_key: key name of field that stores sample image list.
+    :param audio_key: key name of field that stores sample audio list.
+    :param video_key: key name of field that stores sample video list.
+    :param process_list: the process list of ops in the config.
+    :return: list of the referenced top-level columns.
+    """
+    keys = list(text_keys) if isinstance(text_keys, list) else [text_keys]
+    keys += [image_key, audio_key, video_key]
+    for op_cfg in process_list:
+        op_args = list(op_cfg.values())[0] or {}
+        for name, value in op_args.items():
+            if not (name.endswith('_key') or name.endswith('_keys')):
+                continue
+            values = value if isinstance(value, list) else [value]
+            keys.extend(values)
+    columns = []
+    for key in keys:
+        if not isinstance(key, str) or not key:
+            continue
+        column = key.split('.')[0]
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def get_pushdown_suffixes(suffixes, add_suffix, process_list):
+    """
+    Push the `suffix_filter` in the process list down to the file selection
+    of formatters, so the files that would be filtered out are never loaded.
+    It's only pushed down when it comes before any op that is neither a
+    Mapper nor a Filter, e.g. a Deduplicator, whose results might depend on
+    the samples that are filtered out.
+
+    :param suffixes: the suffixes of files to load in the config.
+    :param add_suffix: whether the file suffix is added to samples.
+    :param process_list: the process list of ops in the config.
+    :return: the suffixes of files to load.
+    """
+    from data_juicer.ops import OPERATORS, Filter, Mapper
+    if not add_suffix:
+        return suffixes
+    for op_cfg in process_list:
+        op_name, op_args = list(op_cfg.items())[0]
+        op_cls = OPERATORS.modules.get(op_name)
+        if op_cls is None or not issubclass(op_cls, (Mapper, Filter)):
+            return suffixes
+        if op_name != 'suffix_filter':
+            continue
+        op_suffixes = (op_args or {}).get('suffixes')
+        if not op_suffixes:
+            continue
+        if isinstance(op_suffixes, str):
+            op_suffixes = [op_suffixes]
+        # the suffixes of samples are lowercase and start with "."
+        op_suffixes = [
+            suffix for suffix in op_suffixes
+            if suffix.startswith('.') and suffix == suffix.lower()
+        ]
+        if suffixes:
+            if isinstance(suffixes, str):
+                suffixes = [suffixes]
+            normalized = [
+                suffix.lower() if suffix.startswith('.') else '.' +
+                suffix.lower() for suffix in suffixes
+            ]
+            op_suffixes = [
+                suffix for suffix in op_suffixes if suffix in normalized
+            ]
+        if not op_suffixes:
+            # nothing would be left, which is left to the op to handle
+            return suffixes
+        logger.info(f'Push down the suffix_filter to only load files with '
+                    f'suffixes {op_suffixes}.')
+        return op_suffixes
+    return suffixes
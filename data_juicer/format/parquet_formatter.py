@@ -1,4 +1,16 @@
-from .formatter import FORMATTERS, LocalFormatter
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pds
+from datasets import (Dataset, DatasetDict, DatasetInfo, Features,
+                      is_caching_enabled)
+from datasets.fingerprint import get_temporary_cache_files_directory
+from loguru import logger
+
+from .formatter import FORMATTERS, LocalFormatter, select_columns
 
 
 @FORMATTERS.register_module()
@@ -7,6 +19,14 @@ class ParquetFormatter(LocalFormatter):
     The class is used to load and format parquet-type files.
 
     Default suffixes is `['.parquet']`
+
+    Instead of converting the whole files with HF datasets, parquet files
+    are scanned with PyArrow, which only reads the columns to load and skips
+    the samples with None text during the scan. The result is written to an
+    Arrow file in the dataset cache directory, i.e. `ds_cache_dir`, which is
+    memory-mapped as the dataset and reused by later runs on the same files.
+    If caching is disabled, it's written to a temp directory that is removed
+    at exit instead.
     """
     SUFFIXES = ['.parquet']
 
@@ -24,3 +44,81 @@ class ParquetFormatter(LocalFormatter):
             type='parquet',
             **kwargs,
         )
+
+    def load_files(self, data_files, num_proc: int = 1) -> DatasetDict:
+        """
+        Load the data files by scanning them with the projection and
+        predicate pushed down.
+
+        :param data_files: a dict from suffixes to lists of files.
+        :param num_proc: number of processes when loading the dataset
+        :return: a DatasetDict from the suffixes without "." to datasets.
+        """
+        return DatasetDict({
+            key.strip('.'): self.scan_files(files)
+            for key, files in data_files.items()
+        })
+
+    def scan_files(self, files) -> Dataset:
+        """
+        Scan parquet files with the column projection and the non-null text
+        predicate pushed down.
+
+        :param files: list of parquet files.
+        :return: a memory-mapped dataset.
+        """
+        source = pds.dataset([str(file) for file in files], format='parquet')
+        # features of HF datasets are stored in the schema metadata
+        features = Features.from_arrow_schema(source.schema)
+        columns = source.schema.names
+        if self.columns is not None:
+            columns = select_columns(columns, self.columns)
+        text_keys = self.text_keys or []
+        if isinstance(text_keys, str):
+            text_keys = [text_keys]
+        # missing text keys are reported when unifying the format
+        text_keys = [key for key in text_keys if key in columns]
+        predicate = None
+        for key in text_keys:
+            expr = pc.field(key).is_valid()
+            predicate = expr if predicate is None else predicate & expr
+
+        cache_file = self.get_cache_file(files, columns, text_keys)
+        if not os.path.exists(cache_file):
+            logger.info(f'Scanning {len(files)} parquet files with columns '
+                        f'{columns}...')
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            scanner = source.scanner(columns=columns, filter=predicate)
+            schema = scanner.projected_schema.remove_metadata()
+            tmp_file = cache_file + '.tmp'
+            with pa.OSFile(tmp_file, 'wb') as sink:
+                with pa.ipc.new_stream(sink, schema) as writer:
+                    for batch in scanner.to_batches():
+                        writer.write_table(
+                            pa.Table.from_batches([batch]).cast(schema))
+            os.replace(tmp_file, cache_file)
+        features = Features({key: features[key] for key in columns})
+        return Dataset.from_file(cache_file,
+                                 info=DatasetInfo(features=features))
+
+    @staticmethod
+    def get_cache_file(files, columns, text_keys):
+        """
+        Get the path of the cached Arrow file of a scan, which depends on
+        the files and the pushed down projection and predicate.
+        """
+        # the order of files is the order of samples
+        files = [os.path.abspath(str(file)) for file in files]
+        content = json.dumps({
+            'files': [(file, os.path.getsize(file), os.path.getmtime(file))
+                      for file in files],
+            'columns': columns,
+            'text_keys': text_keys,
+        })
+        fingerprint = hashlib.md5(content.encode('utf-8')).hexdigest()
+        if is_caching_enabled():
+            from datasets import config
+            cache_root = os.path.join(config.HF_DATASETS_CACHE, 'parquet')
+        else:
+            cache_root = get_temporary_cache_files_directory()
+        return os.path.join(cache_root, f'{fingerprint}.arrow')
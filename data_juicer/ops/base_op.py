@@ -1,15 +1,18 @@
 import copy
 import traceback
-from functools import wraps
+from functools import partial, wraps
 
+import numpy as np
 import pyarrow as pa
 from loguru import logger
 
 from data_juicer import is_cuda_available
 from data_juicer.utils.constant import Fields
 from data_juicer.utils.mm_utils import size_to_bytes
+from data_juicer.utils.model_utils import get_shared_models_mem
 from data_juicer.utils.process_utils import calculate_np
 from data_juicer.utils.registry import Registry
+from data_juicer.utils.stats_cache import StatsCache, get_op_stats_key
 
 OPERATORS = Registry('Operators')
 UNFORKABLE = Registry('Unforkable')
@@ -34,6 +37,90 @@ def convert_dict_list_to_list_dict(samples):
     return reconstructed_samples
 
 
+def run_per_sample(method, samples, *args, **kwargs):
+    """
+    Call a single-sample runtime method (e.g. a Mapper's `process`) on each
+    sample of a batch one by one, each wrapped as a batch of size 1, and
+    concatenate the results. This is the same calling convention of the
+    non-batched ops in `NestedDataset.map`, so sample-level fault tolerance is
+    kept.
+
+    :param method: the runtime method to call.
+    :param samples: a batch of samples in "dict of lists" format.
+    :return: the resulting batch in "dict of lists" format.
+    """
+    res_samples = []
+    for sample in convert_dict_list_to_list_dict(samples):
+        res = method(convert_list_dict_to_dict_list([sample]), *args,
+                     **kwargs)
+        res_samples.extend(convert_dict_list_to_list_dict(res))
+    if len(res_samples) == 0:
+        return {key: [] for key in samples}
+    return convert_list_dict_to_dict_list(res_samples)
+
+
+def compute_stats_with_cache(samples, *args, op, op_key, stats_cache):
+    """
+    Compute stats for a batch of samples with a persistent stats cache. The
+    cached stats of the whole batch are fetched at once, and the filter only
+    computes stats for the samples that miss the cache, whose new stats are
+    then stored into the cache.
+
+    :param samples: a batch of samples in "dict of lists" format.
+    :param op: the filter to compute stats.
+    :param op_key: the key of the filter in the stats cache.
+    :param stats_cache: the `StatsCache` instance.
+    :return: the batch of samples with stats.
+    """
+    from data_juicer.core.data import wrap_func_with_nested_access
+    keys = stats_cache.get_sample_keys(op, op_key, samples)
+    cached = stats_cache.get_many(keys)
+    rows = convert_dict_list_to_list_dict(samples)
+    for row, key in zip(rows, keys):
+        if key in cached:
+            row[Fields.stats] = {**row[Fields.stats], **cached[key]}
+
+    miss_ids = [i for i, key in enumerate(keys) if key not in cached]
+    if len(miss_ids) > 0:
+        old_stats = {i: dict(rows[i][Fields.stats]) for i in miss_ids}
+        compute_stats = wrap_func_with_nested_access(op.compute_stats)
+        if op.is_batched_op():
+            res = convert_dict_list_to_list_dict(
+                compute_stats(
+                    convert_list_dict_to_dict_list(
+                        [rows[i] for i in miss_ids]), *args))
+            if len(res) != len(miss_ids):
+                # the batch fails and is dropped by the fault tolerance
+                res = [None] * len(miss_ids)
+        else:
+            res = []
+            for i in miss_ids:
+                res_sample = convert_dict_list_to_list_dict(
+                    compute_stats(convert_list_dict_to_dict_list([rows[i]]),
+                                  *args))
+                res.append(res_sample[0] if len(res_sample) > 0 else None)
+
+        new_items = {}
+        for i, res_row in zip(miss_ids, res):
+            rows[i] = res_row
+            if res_row is None:
+                continue
+            # only cache the stats produced by this op
+            new_stats = {
+                name: value
+                for name, value in res_row[Fields.stats].items()
+                if name not in old_stats[i] or old_stats[i][name] != value
+            }
+            if new_stats:
+                new_items[keys[i]] = new_stats
+        stats_cache.put_many(new_items)
+
+    rows = [row for row in rows if row is not None]
+    if len(rows) == 0:
+        return {key: [] for key in samples}
+    return convert_list_dict_to_dict_list(rows)
+
+
 def convert_arrow_to_python(method):
 
     @wraps(method)
@@ -45,6 +132,97 @@ def convert_arrow_to_python(method):
     return wrapper
 
 
+def convert_python_to_arrow(method):
+    """
+    For columnar ops, whose batched methods process Arrow tables directly.
+    Batches in other formats, e.g. "dict of lists" in the streaming mode or
+    a single row in ray filter, are converted to tables before calling the
+    method, and the results are converted back to the same formats, so
+    columnar ops work in all execution paths.
+    """
+
+    def is_batched(samples):
+        return all(isinstance(val, list) for val in samples.values())
+
+    @wraps(method)
+    def wrapper(samples, *args, **kwargs):
+        is_table = isinstance(samples, pa.Table)
+        is_single = not is_table and not is_batched(samples)
+        if not is_table:
+            if is_single:
+                samples = {key: [val] for key, val in samples.items()}
+            samples = pa.Table.from_pydict(dict(samples))
+        res = method(samples, *args, **kwargs)
+        if isinstance(res, pa.Table):
+            if is_table:
+                return res
+            res = res.to_pydict()
+            if is_single:
+                return {key: val[0] for key, val in res.items()}
+            return res
+        # flags of filters, which are iterated as Python bools
+        if isinstance(res, pa.ChunkedArray):
+            res = res.combine_chunks()
+        if isinstance(res, pa.Array):
+            res = res.to_numpy(zero_copy_only=False)
+        return bool(res[0]) if is_single else res
+
+    return wrapper
+
+
+def catch_columnar_exception(method, return_flags=False):
+    """
+    For columnar sample-level fault tolerance. If a batch fails as a whole,
+    its samples are processed one by one, and the ones that fail are
+    skipped, i.e. dropped by mappers and compute_stats, and filtered out by
+    filters.
+
+    :param method: the batched method of a columnar op.
+    :param return_flags: whether the method returns the flags of a filter
+        instead of a table.
+    """
+
+    def to_flags(res):
+        if isinstance(res, pa.ChunkedArray):
+            res = res.combine_chunks()
+        if isinstance(res, pa.Array):
+            res = res.to_numpy(zero_copy_only=False)
+        return np.asarray(list(res), dtype=bool)
+
+    @wraps(method)
+    def wrapper(table, *args, **kwargs):
+        try:
+            return method(table, *args, **kwargs)
+        except Exception as e:
+            logger.error(f'An error occurred in columnar operation when '
+                         f'processing a batch of {len(table)} samples, '
+                         f'{type(e)}: {e}. Process them one by one.')
+        results = []
+        for i in range(len(table)):
+            sample = table.slice(i, 1)
+            try:
+                results.append(method(sample, *args, **kwargs))
+            except Exception as e:
+                logger.error(f'An error occurred in columnar operation when '
+                             f'processing sample {sample.to_pylist()[0]}, '
+                             f'{type(e)}: {e}')
+                traceback.print_exc()
+                results.append(None)
+        if return_flags:
+            return np.concatenate([
+                to_flags(res) if res is not None else np.zeros(1, dtype=bool)
+                for res in results
+            ])
+        tables = [res for res in results if res is not None]
+        if len(tables) == 0:
+            # an empty batch without a schema, which is skipped when writing,
+            # like the ones of the other fault-tolerant wrappers
+            return {key: [] for key in table.column_names}
+        return pa.concat_tables(tables, promote=True)
+
+    return wrapper
+
+
 def catch_map_batches_exception(method):
     """
     For batched-map sample-level fault tolerance.
@@ -114,6 +292,8 @@ class OP:
 
     _accelerator = 'cpu'
     _batched_op = False
+    # columnar ops process batches as Arrow tables instead of nested dicts
+    _columnar_op = False
 
     def __init__(self, *args, **kwargs):
         """
@@ -164,6 +344,10 @@ class OP:
     def is_batched_op(cls):
         return cls._batched_op
 
+    @classmethod
+    def is_columnar_op(cls):
+        return cls._batched_op and cls._columnar_op
+
     def process(self, *args, **kwargs):
         raise NotImplementedError
 
@@ -171,13 +355,30 @@ class OP:
         return self.accelerator == 'cuda' and is_cuda_available()
 
     def runtime_np(self):
-        op_proc = calculate_np(self._name, self.mem_required,
-                               self.cpu_required, self.num_proc,
-                               self.use_cuda())
+        mem_required = self.mem_required
+        if not self.use_cuda():
+            # the shared models are loaded once in the main process instead
+            # of in each worker
+            shared_mem = get_shared_models_mem(vars(self).values()) / 1024**3
+            mem_required = max(mem_required - shared_mem, 0)
+        op_proc = calculate_np(self._name, mem_required, self.cpu_required,
+                               self.num_proc, self.use_cuda())
         logger.debug(
             f'Op [{self._name}] running with number of procs:{op_proc}')
         return op_proc
 
+    def fingerprint_state(self):
+        """
+        Extra state that affects the results of the op but is not in its
+        config, e.g. the content of external resources it loads. It's hashed
+        into the fingerprints of the datasets processed by this op together
+        with its config and code version, so ops can override it to
+        invalidate the caches when the state changes.
+
+        :return: a JSON-serializable object, or None.
+        """
+        return None
+
     def remove_extra_parameters(self, param_dict, keys=None):
         """
             at the begining of the init of the mapper op, call
@@ -229,7 +430,10 @@ class Mapper(OP):
         super(Mapper, self).__init__(*args, **kwargs)
 
         # runtime wrappers
-        if self.is_batched_op():
+        if self.is_columnar_op():
+            self.process = convert_python_to_arrow(
+                catch_columnar_exception(self.process_batched))
+        elif self.is_batched_op():
             self.process = catch_map_batches_exception(self.process_batched)
         else:
             self.process = catch_map_single_exception(self.process_single)
@@ -265,6 +469,23 @@ class Mapper(OP):
         """
         raise NotImplementedError
 
+    def run_batch(self, samples, rank=None):
+        """
+        Apply this op to a single batch of samples in memory, without going
+        through `datasets.map`. It's used by the streaming mode to push a
+        batch through a chain of ops.
+
+        :param samples: a batch of samples in "dict of lists" format.
+        :param rank: the rank of the worker, only used by cuda ops.
+        :return: the processed batch.
+        """
+        from data_juicer.core.data import wrap_func_with_nested_access
+        args = (rank, ) if self.use_cuda() else ()
+        process = wrap_func_with_nested_access(self.process)
+        if self.is_batched_op():
+            return process(samples, *args)
+        return run_per_sample(process, samples, *args)
+
     def run(self, dataset, *, exporter=None, tracer=None):
         dataset = super(Mapper, self).run(dataset)
         new_dataset = dataset.map(
@@ -282,6 +503,16 @@ class Mapper(OP):
 
 class Filter(OP):
 
+    # names of the key attrs of the fields that the stats are computed from,
+    # e.g. ('text_key', ). Only the filters that declare them can cache
+    # their stats in the stats cache
+    _stats_input_keys = None
+
+    # names of the params that are only used to filter samples by their
+    # stats, e.g. {'min_len', 'max_len'}. They are left out of the key of the
+    # op in the stats cache, so tweaking them reuses the cached stats
+    _threshold_params = ()
+
     def __init__(self, *args, **kwargs):
         """
         Base class that removes specific info.
@@ -297,9 +528,16 @@ class Filter(OP):
         """
         super(Filter, self).__init__(*args, **kwargs)
         self.stats_export_path = kwargs.get('stats_export_path', None)
+        self.stats_cache_path = kwargs.get('stats_cache_path', None)
 
         # runtime wrappers
-        if self.is_batched_op():
+        if self.is_columnar_op():
+            self.compute_stats = convert_python_to_arrow(
+                catch_columnar_exception(self.compute_stats_batched))
+            self.process = convert_python_to_arrow(
+                catch_columnar_exception(self.process_batched,
+                                         return_flags=True))
+        elif self.is_batched_op():
             self.compute_stats = catch_map_batches_exception(
                 self.compute_stats_batched)
             self.process = catch_map_batches_exception(self.process_batched)
@@ -356,23 +594,78 @@ class Filter(OP):
         """
         raise NotImplementedError
 
+    def run_batch(self, samples, rank=None):
+        """
+        Compute stats for a single batch of samples in memory and return the
+        kept samples, without going through `datasets.map` and
+        `datasets.filter`. It's used by the streaming mode to push a batch
+        through a chain of ops.
+
+        :param samples: a batch of samples in "dict of lists" format.
+        :param rank: the rank of the worker, only used by cuda ops.
+        :return: the batch of samples that are kept by this op.
+        """
+        from data_juicer.core.data import (nested_obj_factory,
+                                           wrap_func_with_nested_access)
+        keys = list(samples.keys())
+        num_samples = len(samples[keys[0]]) if keys else 0
+        if num_samples == 0:
+            return samples
+        if Fields.stats not in samples:
+            samples[Fields.stats] = [{} for _ in range(num_samples)]
+
+        args = (rank, ) if self.use_cuda() else ()
+        compute_stats = wrap_func_with_nested_access(self.compute_stats)
+        if self.is_batched_op():
+            samples = compute_stats(samples, *args)
+            keep = list(wrap_func_with_nested_access(self.process)(samples))
+        else:
+            samples = run_per_sample(compute_stats, samples, *args)
+            keep = [
+                self.process(nested_obj_factory(sample))
+                for sample in convert_dict_list_to_list_dict(samples)
+            ]
+        return {
+            key: [val for val, kept in zip(vals, keep) if kept]
+            for key, vals in samples.items()
+        }
+
     def run(self, dataset, *, exporter=None, tracer=None):
         dataset = super(Filter, self).run(dataset)
         if Fields.stats not in dataset.features:
-            from data_juicer.core.data import add_same_content_to_new_column
-            dataset = dataset.map(add_same_content_to_new_column,
-                                  fn_kwargs={
-                                      'new_column_name': Fields.stats,
-                                      'initial_value': {}
-                                  },
+            # an empty struct column costs no per-sample work, and the stats
+            # are added to it as typed fields by the ops later
+            from .common.columnar import empty_stats_column
+            dataset = dataset.add_column(name=Fields.stats,
+                                         column=empty_stats_column(
+                                             len(dataset)))
+        op_key = None
+        if self.stats_cache_path:
+            op_key = get_op_stats_key(self)
+            if self._stats_input_keys is None:
+                logger.warning(f'Op [{self._name}] does not declare the '
+                               f'fields its stats are computed from, so its '
+                               f'stats are not cached.')
+        if op_key is not None:
+            # not a bound method of the op, so the stats cache is queried
+            # with batches of batch_size no matter the op is batched or not
+            compute_stats = partial(compute_stats_with_cache,
+                                    op=self,
+                                    op_key=op_key,
+                                    stats_cache=StatsCache(
+                                        self.stats_cache_path))
+            dataset = dataset.map(compute_stats,
                                   num_proc=self.runtime_np(),
+                                  with_rank=self.use_cuda(),
+                                  batched=True,
                                   batch_size=self.batch_size,
-                                  desc='Adding new column for stats')
-        dataset = dataset.map(self.compute_stats,
-                              num_proc=self.runtime_np(),
-                              with_rank=self.use_cuda(),
-                              batch_size=self.batch_size,
-                              desc=self._name + '_compute_stats')
+                                  desc=self._name + '_compute_stats')
+        else:
+            dataset = dataset.map(self.compute_stats,
+                                  num_proc=self.runtime_np(),
+                                  with_rank=self.use_cuda(),
+                                  batch_size=self.batch_size,
+                                  desc=self._name + '_compute_stats')
         if exporter and self.stats_export_path is not None:
             exporter.export_compute_stats(dataset, self.stats_export_path)
         new_dataset = dataset.filter(self.process,
@@ -427,11 +720,20 @@ class Deduplicator(OP):
         """
         raise NotImplementedError
 
+    def commit(self):
+        """
+        Commit the states of this run that should only be persisted after
+        the processed dataset is exported, e.g. the hashes staged into a
+        persistent hash index. Nothing to commit by default.
+        """
+        pass
+
     def run(self, dataset, *, exporter=None, tracer=None):
         dataset = super(Deduplicator, self).run(dataset)
         dataset = dataset.map(self.compute_hash,
                               num_proc=self.runtime_np(),
                               with_rank=self.use_cuda(),
+                              batch_size=self.batch_size,
                               desc=self._name + '_compute_hash')
         show_num = tracer.show_num if tracer else 0
         new_dataset, dup_pairs = self.process(dataset, show_num)
@@ -3,14 +3,23 @@ from .helper_func import (get_sentences_from_document, get_words_from_document,
                           split_on_newline_tab_whitespace, split_on_whitespace,
                           strip, words_augmentation, words_refinement)
 from .special_characters import SPECIAL_CHARACTERS
+from .text_cleaning import TextCleaningEngine, strip_raw_prefix
+from .words_cache import WORDS_CACHE, get_cached_words
+from .words_matcher import WordsMatcher, get_words_matcher
 
 __all__ = [
+    'get_cached_words',
     'get_sentences_from_document',
+    'get_words_matcher',
     'get_words_from_document',
     'merge_on_whitespace_tab_newline',
     'split_on_newline_tab_whitespace',
     'split_on_whitespace',
     'strip',
+    'strip_raw_prefix',
+    'TextCleaningEngine',
     'words_augmentation',
     'words_refinement',
+    'WordsMatcher',
+    'WORDS_CACHE',
 ]
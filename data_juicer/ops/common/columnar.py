@@ -0,0 +1,111 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from data_juicer.utils.constant import Fields
+
+
+def get_column(table: pa.Table, key: str):
+    """
+    Get a column from an Arrow table. Nested fields can be queried with dots,
+    e.g. "meta.date", the same as the nested access of samples.
+
+    :param table: the Arrow table.
+    :param key: the key of the column.
+    :return: the column as a ChunkedArray.
+    """
+    if key in table.column_names:
+        return table.column(key)
+    subkeys = key.split('.')
+    for i in range(len(subkeys) - 1, 0, -1):
+        head = '.'.join(subkeys[:i])
+        if head in table.column_names:
+            column = table.column(head)
+            for subkey in subkeys[i:]:
+                column = pc.struct_field(column, subkey)
+            return column
+    raise KeyError(f'Cannot find column [{key}] in the table.')
+
+
+def get_stats_names(table: pa.Table):
+    """Get the names of the stats that are computed already."""
+    return [field.name for field in table.schema.field(Fields.stats).type]
+
+
+def get_stats_field(table: pa.Table, name: str):
+    """Get a stats field of all samples in the table."""
+    return pc.struct_field(table.column(Fields.stats), name)
+
+
+def set_stats_field(table: pa.Table, name: str, values):
+    """
+    Set a stats field of all samples in the table, without converting the
+    other stats into Python objects.
+
+    :param table: the Arrow table with the stats column.
+    :param name: name of the stats field.
+    :param values: Arrow array of the stats values.
+    :return: the new table.
+    """
+    stats = table.column(Fields.stats).combine_chunks()
+    names = [field.name for field in stats.type]
+    # flatten accounts for the offset of the sliced batches
+    arrays = stats.flatten()
+    if name in names:
+        arrays[names.index(name)] = values
+    else:
+        names.append(name)
+        arrays.append(values)
+    return table.set_column(table.column_names.index(Fields.stats),
+                            Fields.stats,
+                            pa.StructArray.from_arrays(arrays, names))
+
+
+def fill_stats_field(table: pa.Table, name: str, key: str, func, type=None):
+    """
+    Compute a stats field for the samples that don't have it yet. The stats
+    are computed from the Python values of a column one by one, but they are
+    stored as a typed Arrow array instead of Python dicts.
+
+    :param table: the Arrow table with the stats column.
+    :param name: name of the stats field.
+    :param key: the key of the column to compute the stats from.
+    :param func: function to compute the stats of a single value.
+    :param type: Arrow type of the stats. It's inferred if it's None.
+    :return: the new table.
+    """
+    values = get_column(table, key).to_pylist()
+    if name in get_stats_names(table):
+        existing = get_stats_field(table, name)
+        if existing.null_count == 0:
+            return table
+        stats = [
+            func(value) if stat is None else stat
+            for value, stat in zip(values, existing.to_pylist())
+        ]
+    else:
+        stats = [func(value) for value in values]
+    return set_stats_field(table, name, pa.array(stats, type=type))
+
+
+def stats_in_range(table: pa.Table, name: str, min_value, max_value):
+    """
+    Vectorized check whether a stats field of all samples in the table is
+    within the closed range [min_value, max_value].
+
+    :return: boolean Arrow array.
+    """
+    stats = get_stats_field(table, name)
+    if pa.types.is_floating(stats.type):
+        # int bounds like sys.maxsize can't be safely cast to float by Arrow
+        min_value, max_value = float(min_value), float(max_value)
+    return pc.and_(pc.greater_equal(stats, min_value),
+                   pc.less_equal(stats, max_value))
+
+
+def empty_stats_column(num_rows: int):
+    """
+    Create a stats column of empty structs for a table with num_rows rows.
+    No buffer is allocated for it, so it's much cheaper than filling the
+    column with empty dicts.
+    """
+    return pa.Array.from_buffers(pa.struct([]), num_rows, [None], children=[])
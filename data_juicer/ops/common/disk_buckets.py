@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+
+# multiplier to spread the keys before taking their prefixes as bucket ids
+KEY_MIX_PRIME = np.uint64(0x9E3779B97F4A7C15)
+
+
+class DiskBuckets:
+    """
+    Spill records into bucket files on disk according to the hash prefix of
+    their keys, so that all records with the same (table, key) pair land in
+    the same bucket and can be processed one bucket at a time, without
+    holding all records in memory.
+
+    Each bucket is an Arrow IPC file under a temporary directory in the spill
+    directory, which is removed after use.
+    """
+
+    def __init__(self, spill_dir, num_buckets=256):
+        """
+        Initialization method.
+
+        :param spill_dir: directory to store the bucket files.
+        :param num_buckets: number of buckets to partition records into.
+        """
+        os.makedirs(spill_dir, exist_ok=True)
+        self.bucket_dir = tempfile.mkdtemp(prefix='dj_buckets_',
+                                           dir=spill_dir)
+        self.num_buckets = num_buckets
+        self.writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
+
+    def bucket_path(self, bucket_id):
+        return os.path.join(self.bucket_dir, f'bucket-{bucket_id:05d}.arrow')
+
+    def route(self, keys, tables):
+        """
+        Compute the bucket id of each record from the prefix of its mixed
+        (table, key) pair.
+
+        :param keys: uint64 array of keys.
+        :param tables: int array of table ids.
+        :return: int array of bucket ids.
+        """
+        mixed = (keys ^ tables.astype(np.uint64)) * KEY_MIX_PRIME
+        return (mixed >> np.uint64(32)) % np.uint64(self.num_buckets)
+
+    def add(self, keys, tables, **columns):
+        """
+        Add a batch of records and spill them to their buckets.
+
+        :param keys: uint64 array of keys.
+        :param tables: int array of table ids. Records with the same key but
+            different table ids are not regarded as matched.
+        :param columns: other numpy columns of the records.
+        """
+        if len(keys) == 0:
+            return
+        columns = dict(key=keys, table=tables, **columns)
+        bucket_ids = self.route(keys, tables)
+        order = np.argsort(bucket_ids, kind='stable')
+        bucket_ids = bucket_ids[order]
+        bounds = np.flatnonzero(bucket_ids[1:] != bucket_ids[:-1]) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(order)]])
+        for start, end in zip(starts, ends):
+            bucket_id = int(bucket_ids[start])
+            indices = order[start:end]
+            batch = pa.RecordBatch.from_pydict(
+                {name: col[indices]
+                 for name, col in columns.items()})
+            if bucket_id not in self.writers:
+                self.writers[bucket_id] = pa.ipc.new_file(
+                    self.bucket_path(bucket_id), batch.schema)
+            self.writers[bucket_id].write_batch(batch)
+
+    def __len__(self):
+        return len(self.writers)
+
+    def __iter__(self):
+        """
+        Close the writers and yield the records of each non-empty bucket
+        one by one. Each bucket file is removed after it's loaded.
+
+        :return: an iterator of dicts of numpy columns.
+        """
+        for writer in self.writers.values():
+            writer.close()
+        bucket_ids = sorted(self.writers.keys())
+        self.writers = {}
+        for bucket_id in bucket_ids:
+            path = self.bucket_path(bucket_id)
+            with pa.OSFile(path, 'rb') as source:
+                table = pa.ipc.open_file(source).read_all()
+            records = {
+                name: table.column(name).to_numpy()
+                for name in table.column_names
+            }
+            del table
+            os.remove(path)
+            yield records
+
+    def cleanup(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        shutil.rmtree(self.bucket_dir, ignore_errors=True)
@@ -0,0 +1,206 @@
+import json
+import os
+import re
+import uuid
+
+import numpy as np
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d+)\.npy$')
+PENDING_PATTERN = re.compile(r'^pending-[0-9a-f]+-\d+\.npy$')
+META_FILE = 'meta.json'
+
+
+class HashIndex:
+    """
+    A persistent index of hash keys seen in previous runs, which lets the
+    deduplicators check new data against the history without reprocessing
+    it.
+
+    The index is a directory of append-only segments. Each segment is a
+    sorted array of unique keys stored in a `.npy` file, which is
+    memory-mapped when it's queried, so the history doesn't need to fit in
+    memory. Keys can be of any sortable NumPy dtype, e.g. uint64 or
+    fixed-size bytes, as long as the same dtype is used for one index. The
+    segments are disjoint, since keys that already exist are never added
+    again.
+
+    Keys of the current run are staged as pending segments first, which are
+    not queried, and they are only added into the index when `commit` is
+    called, e.g. after the processed dataset is exported. So a run that
+    crashes leaves the index unchanged, and the same data can be re-run.
+    The index is not meant to be shared by concurrent runs.
+    """
+
+    def __init__(self, index_dir, meta=None, max_segments=32):
+        """
+        Initialization method.
+
+        :param index_dir: directory to store the segment files.
+        :param meta: a json-serializable dict of the params the keys are
+            computed with. It's stored with the index when the index is
+            created, and an index that is built with different params is
+            refused.
+        :param max_segments: when there are more segments than this number
+            after an append, all segments are merged into one to keep the
+            lookups fast.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        self.index_dir = index_dir
+        self.max_segments = max_segments
+        self.stage_id = uuid.uuid4().hex
+        self.staged = []
+        if meta is not None:
+            self._check_meta(meta)
+        # pending segments left by runs that crashed before committing
+        for fn in os.listdir(self.index_dir):
+            if PENDING_PATTERN.match(fn):
+                os.remove(os.path.join(self.index_dir, fn))
+
+    def _check_meta(self, meta):
+        # normalize the meta by a round trip, e.g. tuples to lists
+        meta = json.loads(json.dumps(meta))
+        meta_path = os.path.join(self.index_dir, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as fin:
+                index_meta = json.load(fin)
+            if index_meta != meta:
+                raise ValueError(f'The index in [{self.index_dir}] is built '
+                                 f'with {index_meta}, which mismatches the '
+                                 f'current params {meta}. Please use another '
+                                 f'index dir for these params.')
+        else:
+            tmp_path = meta_path + '.tmp'
+            with open(tmp_path, 'w') as fout:
+                json.dump(meta, fout)
+            os.replace(tmp_path, meta_path)
+
+    def segment_ids(self):
+        ids = []
+        for fn in os.listdir(self.index_dir):
+            matched = SEGMENT_PATTERN.match(fn)
+            if matched:
+                ids.append(int(matched.group(1)))
+        return sorted(ids)
+
+    def segment_path(self, segment_id):
+        return os.path.join(self.index_dir, f'segment-{segment_id:06d}.npy')
+
+    def load_segments(self):
+        return [
+            np.load(self.segment_path(segment_id), mmap_mode='r')
+            for segment_id in self.segment_ids()
+        ]
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.load_segments())
+
+    def contains(self, keys):
+        """
+        Check whether each key exists in the index. Staged keys are not
+        included.
+
+        :param keys: array of keys to check.
+        :return: bool array of the same shape as keys.
+        """
+        keys = np.asarray(keys)
+        flat_keys = keys.ravel()
+        found = np.zeros(len(flat_keys), dtype=bool)
+        for segment in self.load_segments():
+            if len(segment) == 0:
+                continue
+            positions = np.searchsorted(segment, flat_keys)
+            in_range = positions < len(segment)
+            found[in_range] |= \
+                segment[positions[in_range]] == flat_keys[in_range]
+        return found.reshape(keys.shape)
+
+    def stage(self, keys):
+        """
+        Stage keys as a pending segment, which is added into the index when
+        `commit` is called.
+
+        :param keys: array of keys to add.
+        """
+        keys = np.unique(np.asarray(keys).ravel())
+        keys = keys[~self.contains(keys)]
+        if len(keys) == 0:
+            return
+        path = os.path.join(self.index_dir,
+                            f'pending-{self.stage_id}-{len(self.staged)}.npy')
+        self._write_array(path, keys)
+        self.staged.append(path)
+
+    def commit(self):
+        """Add the staged keys into the index."""
+        for path in self.staged:
+            # appending is idempotent, so a commit that is interrupted here
+            # can be done again
+            self.append(np.load(path))
+            os.remove(path)
+        self.staged = []
+
+    def append(self, keys):
+        """
+        Add keys into the index as a new segment directly. Keys that already
+        exist are skipped.
+
+        :param keys: array of keys to add.
+        """
+        keys = np.unique(np.asarray(keys).ravel())
+        keys = keys[~self.contains(keys)]
+        if len(keys) == 0:
+            return
+        segment_ids = self.segment_ids()
+        next_id = segment_ids[-1] + 1 if segment_ids else 0
+        self._write_array(self.segment_path(next_id), keys)
+        if len(segment_ids) + 1 > self.max_segments:
+            self.compact()
+
+    def compact(self, chunk_size=1 << 20):
+        """
+        Merge all segments into one. The sorted segments are merged in a
+        streaming way, which only reads a chunk of each segment at a time.
+
+        :param chunk_size: number of keys to read from each segment at a
+            time.
+        """
+        segment_ids = self.segment_ids()
+        if len(segment_ids) <= 1:
+            return
+        segments = self.load_segments()
+        # the segments are disjoint, so the size of the merged one is known
+        num_keys = sum(len(segment) for segment in segments)
+        path = self.segment_path(segment_ids[-1] + 1)
+        tmp_path = path + '.tmp'
+        merged = np.lib.format.open_memmap(tmp_path,
+                                           mode='w+',
+                                           dtype=segments[0].dtype,
+                                           shape=(num_keys, ))
+        cursors = [0] * len(segments)
+        num_merged = 0
+        while num_merged < num_keys:
+            chunks = [(i, segment[cursors[i]:cursors[i] + chunk_size])
+                      for i, segment in enumerate(segments)
+                      if cursors[i] < len(segment)]
+            # keys up to the smallest chunk tail are the smallest ones left
+            bound = min(chunk[-1] for _, chunk in chunks)
+            parts = []
+            for i, chunk in chunks:
+                num = np.searchsorted(chunk, bound, side='right')
+                parts.append(chunk[:num])
+                cursors[i] += num
+            part = np.sort(np.concatenate(parts))
+            merged[num_merged:num_merged + len(part)] = part
+            num_merged += len(part)
+        merged.flush()
+        del merged
+        os.replace(tmp_path, path)
+        for segment_id in segment_ids:
+            os.remove(self.segment_path(segment_id))
+
+    def _write_array(self, path, keys):
+        # write to a temp file first, so readers never see partial segments
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as fout:
+            np.save(fout, keys)
+        os.replace(tmp_path, path)
@@ -3,6 +3,7 @@
 # --------------------------------------------------------
 from typing import Dict
 
+import numpy as np
 import regex as re
 
 
@@ -25,6 +26,62 @@ class UnionFind:
         self.parent[px] = self.parent[py] = min(px, py)
 
 
+class ArrayUnionFind:
+    """
+    Union-find over an int array of parents, which unions batches of pairs
+    in a vectorized way. Same as `UnionFind`, the root of each set is always
+    its min element.
+    """
+
+    def __init__(self, size):
+        """
+        Initialization method.
+
+        :param size: number of elements, which are indexed from 0 to size-1.
+        """
+        self.parent = np.arange(size, dtype=np.int64)
+
+    def find(self, x):
+        """
+        Find the roots of the input elements, and point them to their roots
+        directly to compress the paths.
+
+        :param x: int array of elements.
+        :return: int array of their roots.
+        """
+        roots = self.parent[x]
+        while True:
+            grand_parents = self.parent[roots]
+            if np.array_equal(grand_parents, roots):
+                break
+            roots = grand_parents
+        self.parent[x] = roots
+        return roots
+
+    def union(self, xs, ys):
+        """
+        Union each pair of elements in the two input arrays.
+
+        :param xs: int array of elements.
+        :param ys: int array of elements, with the same length as xs.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        while len(xs) > 0:
+            pxs = self.find(xs)
+            pys = self.find(ys)
+            not_joined = pxs != pys
+            if not not_joined.any():
+                break
+            xs, ys = xs[not_joined], ys[not_joined]
+            pxs, pys = pxs[not_joined], pys[not_joined]
+            # hook the larger root to the smaller one. If a root is hooked by
+            # several pairs, the smallest one wins and the others will be
+            # joined in the next round
+            np.minimum.at(self.parent, np.maximum(pxs, pys),
+                          np.minimum(pxs, pys))
+
+
 def strip(document, strip_characters):
     """
     Way faster than document.strip(strip_characters) since strip_characters is
@@ -0,0 +1,120 @@
+import regex as re
+
+
+def strip_raw_prefix(pattern):
+    """
+    Strip the r'' or r"" wrapper of a pattern given in the config file.
+
+    :param pattern: the pattern to strip.
+    :return: the stripped pattern.
+    """
+    if ((pattern is not None and len(pattern) > 2)
+            and (pattern.startswith("r'") and pattern.endswith("'")
+                 or pattern.startswith('r"') and pattern.endswith('"'))):
+        pattern = pattern[2:-1]
+    return pattern
+
+
+class RegexStep:
+    """
+    Substitute the matches of one or more regex rules in one left-to-right
+    pass over the text. Each pattern is searched on its own, so that it keeps
+    the optimizations of its compiled form, e.g. the fast search of required
+    literals, which are lost if the patterns are joined into one alternation.
+    The next matches of all rules are merged by their positions: the leftmost
+    match wins, a non-empty match wins over an empty one at the same
+    position, and then the first rule wins. The replaced content is not
+    scanned again by the other rules.
+    """
+
+    def __init__(self, rules):
+        """
+        Initialization method.
+
+        :param rules: a list of (pattern, repl, flags) tuples.
+        """
+        self.patterns = [
+            re.compile(pattern, flags=flags) for pattern, _, flags in rules
+        ]
+        self.repls = [repl for _, repl, _ in rules]
+        # templates with group references or escapes need to be expanded
+        self.is_templates = ['\\' in repl for repl in self.repls]
+
+    def __call__(self, text):
+        if len(self.patterns) == 1:
+            return self.patterns[0].sub(self.repls[0], text)
+
+        matches = [pattern.search(text) for pattern in self.patterns]
+        pieces = []
+        pos = 0
+        while pos <= len(text):
+            idx = None
+            for i, match in enumerate(matches):
+                if match is not None and (idx is None or self._precedes(
+                        match, matches[idx])):
+                    idx = i
+            if idx is None:
+                break
+            match = matches[idx]
+            pieces.append(text[pos:match.start()])
+            if self.is_templates[idx]:
+                pieces.append(match.expand(self.repls[idx]))
+            else:
+                pieces.append(self.repls[idx])
+            pos = match.end()
+            if match.start() == pos:
+                # move on from an empty match
+                pieces.append(text[pos:pos + 1])
+                pos += 1
+            # search again for the rules whose next matches overlap the
+            # replaced content
+            for i, match in enumerate(matches):
+                if match is not None and match.start() < pos:
+                    matches[i] = self.patterns[i].search(text, pos)
+        pieces.append(text[pos:])
+        return ''.join(pieces)
+
+    @staticmethod
+    def _precedes(match, other):
+        # an empty match of an earlier rule shouldn't hide a non-empty match
+        # of a later rule at the same position, e.g. `a*` and `b+` at a "b"
+        if match.start() != other.start():
+            return match.start() < other.start()
+        return match.end() > match.start() and other.end() == other.start()
+
+
+class TextCleaningEngine:
+    """
+    Apply a list of cleaning rules to texts in order. A rule is either a
+    (pattern, repl, flags) tuple for regex substitution, or a function that
+    takes a text and returns the cleaned one. Each run of consecutive regex
+    rules is applied by one RegexStep, so that a text is scanned and rebuilt
+    once for all of them instead of once for each rule.
+    """
+
+    def __init__(self, rules):
+        """
+        Initialization method.
+
+        :param rules: a list of cleaning rules.
+        """
+        self.steps = []
+        regex_rules = []
+
+        def _flush():
+            if regex_rules:
+                self.steps.append(RegexStep(list(regex_rules)))
+                regex_rules.clear()
+
+        for rule in rules:
+            if callable(rule):
+                _flush()
+                self.steps.append(rule)
+            else:
+                regex_rules.append(rule)
+        _flush()
+
+    def __call__(self, text):
+        for step in self.steps:
+            text = step(text)
+        return text
@@ -0,0 +1,175 @@
+from collections import OrderedDict
+
+import xxhash
+
+from data_juicer.utils.model_utils import get_model
+
+from .helper_func import get_words_from_document, words_refinement
+
+# default max number of words in the shared words cache
+DEFAULT_WORDS_CACHE_SIZE = 2**16
+
+
+class WordsCache:
+    """
+    An LRU cache of the words split from documents. It's bounded by the total
+    number of cached words instead of the number of documents, since the
+    memory of the word lists grows with the length of documents.
+    """
+
+    def __init__(self, max_words=DEFAULT_WORDS_CACHE_SIZE):
+        """
+        Initialization method.
+
+        :param max_words: max number of words in all cached word lists. 0
+            means disabling the cache.
+        """
+        self.max_words = max_words
+        self.num_words = 0
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        words = self.cache.get(key)
+        if words is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return words
+
+    @property
+    def enabled(self):
+        return self.max_words > 0
+
+    def put(self, key, words):
+        if not self.enabled or key in self.cache \
+                or len(words) > self.max_words:
+            return
+        self.cache[key] = words
+        self.num_words += len(words)
+        self._evict()
+
+    def resize(self, max_words):
+        """
+        Change the max number of cached words, and evict the least recently
+        used word lists beyond it.
+
+        :param max_words: new max number of words. 0 means disabling the
+            cache.
+        """
+        self.max_words = max(max_words, 0)
+        self._evict()
+
+    def _evict(self):
+        while self.num_words > self.max_words:
+            _, evicted = self.cache.popitem(last=False)
+            self.num_words -= len(evicted)
+
+    def clear(self):
+        self.cache.clear()
+        self.num_words = 0
+        self.hits = 0
+        self.misses = 0
+
+
+# shared by all ops in the same process. Its size is set by the
+# `words_cache_size` arg of the configs.
+WORDS_CACHE = WordsCache()
+
+# id of strip chars -> (strip chars, hash of them). The strip chars are
+# referenced here so that their ids won't be reused.
+_STRIP_CHARS_KEYS = {}
+
+
+def _get_strip_chars_key(strip_chars):
+    if strip_chars is None:
+        return None
+    entry = _STRIP_CHARS_KEYS.get(id(strip_chars))
+    if entry is None or entry[0] is not strip_chars:
+        entry = (strip_chars, hash(frozenset(strip_chars)))
+        _STRIP_CHARS_KEYS[id(strip_chars)] = entry
+    return entry[1]
+
+
+def get_cached_words(document,
+                     model_key=None,
+                     refine=False,
+                     lower_case=False,
+                     strip_chars=None,
+                     use_words_aug=False,
+                     words_aug_group_sizes=[2],
+                     words_aug_join_char=''):
+    """
+    Get the (refined) words of a document from the words cache shared by all
+    ops in the same process, so that the same document is split only once
+    for all the ops that tokenize it in the same way. The results are keyed
+    by the hash of the document, the tokenizer and the refinement params.
+
+    The returned word lists are shared, so they must not be modified. If the
+    cache is disabled, the words are split without being hashed or cached.
+
+    :param document: document to split words.
+    :param model_key: key of the sentencepiece tokenizer. If it's None,
+        the document is split on whitespaces.
+    :param refine: whether to refine the words with `words_refinement`.
+    :param lower_case: refinement param, see `words_refinement`.
+    :param strip_chars: refinement param, see `words_refinement`.
+    :param use_words_aug: refinement param, see `words_refinement`.
+    :param words_aug_group_sizes: refinement param, see `words_refinement`.
+    :param words_aug_join_char: refinement param, see `words_refinement`.
+    :return: the word list.
+    """
+    if not WORDS_CACHE.enabled:
+        return _split_words(document, model_key, refine, lower_case,
+                            strip_chars, use_words_aug, words_aug_group_sizes,
+                            words_aug_join_char)
+
+    # model keys are partials, whose strings are the same for the same
+    # tokenizer in different ops
+    words_key = (xxhash.xxh3_128_digest(document.encode('utf-8')),
+                 str(model_key))
+    if refine:
+        key = words_key + (lower_case, _get_strip_chars_key(strip_chars),
+                           use_words_aug, tuple(words_aug_group_sizes),
+                           words_aug_join_char)
+    else:
+        key = words_key
+    words = WORDS_CACHE.get(key)
+    if words is not None:
+        return words
+
+    if refine:
+        words = get_cached_words(document, model_key)
+        words = words_refinement(words,
+                                 lower_case=lower_case,
+                                 strip_chars=strip_chars,
+                                 use_words_aug=use_words_aug,
+                                 words_aug_group_sizes=words_aug_group_sizes,
+                                 words_aug_join_char=words_aug_join_char)
+    else:
+        words = _split_words(document, model_key)
+    WORDS_CACHE.put(key, words)
+    return words
+
+
+def _split_words(document,
+                 model_key=None,
+                 refine=False,
+                 lower_case=False,
+                 strip_chars=None,
+                 use_words_aug=False,
+                 words_aug_group_sizes=[2],
+                 words_aug_join_char=''):
+    tokenizer = get_model(model_key)
+    words = get_words_from_document(
+        document, token_func=tokenizer.encode_as_pieces if tokenizer else None)
+    if refine:
+        words = words_refinement(words,
+                                 lower_case=lower_case,
+                                 strip_chars=strip_chars,
+                                 use_words_aug=use_words_aug,
+                                 words_aug_group_sizes=words_aug_group_sizes,
+                                 words_aug_join_char=words_aug_join_char)
+    return words
@@ -0,0 +1,117 @@
+from collections import Counter
+
+import xxhash
+
+from data_juicer.utils.asset_utils import load_words_asset
+
+
+class WordsMatcher:
+    """
+    A precompiled matcher of a word list, e.g. flagged words or stopwords of
+    a language. The words are kept in a frozen set for O(1) membership tests,
+    and the word groups used by words augmentation are matched by walking a
+    prefix set of the words, so the augmented word lists don't need to be
+    built.
+    """
+
+    def __init__(self, words):
+        """
+        Initialization method.
+
+        :param words: the word list to match.
+        """
+        self.words = frozenset(words)
+        self._prefixes = None
+        self._digest = None
+
+    @property
+    def digest(self):
+        # hash of the words, which changes with the content of the assets
+        if self._digest is None:
+            hasher = xxhash.xxh3_128()
+            for word in sorted(self.words):
+                hasher.update(word.encode('utf-8') + b'\0')
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    @property
+    def prefixes(self):
+        # all prefixes of the words, which are only needed for augmentation
+        if self._prefixes is None:
+            self._prefixes = frozenset(word[:i] for word in self.words
+                                       for i in range(1, len(word) + 1))
+        return self._prefixes
+
+    def count(self,
+              words,
+              use_words_aug=False,
+              words_aug_group_sizes=[2],
+              words_aug_join_char=''):
+        """
+        Count the matched words in a word list. The results are the same as
+        counting the matched ones in the word list augmented by
+        `words_refinement` with the same augmentation params.
+
+        :param words: the refined word list without augmentation.
+        :param use_words_aug: whether to augment words.
+        :param words_aug_group_sizes: the group sizes of words to augment.
+        :param words_aug_join_char: the join char between words to augment.
+        :return: the number of matched words and the number of words after
+            augmentation.
+        """
+        matched_words = self.words
+        num_matched = sum(1 for word in words if word in matched_words)
+        num_words = len(words)
+        if not use_words_aug:
+            return num_matched, num_words
+
+        group_sizes = Counter(words_aug_group_sizes)
+        max_group_size = max(group_sizes)
+        for group_size, num in group_sizes.items():
+            num_words += num * max(len(words) - group_size + 1, 0)
+
+        prefixes = self.prefixes
+        for i in range(len(words)):
+            group = words[i]
+            max_size = min(max_group_size, len(words) - i)
+            for group_size in range(1, max_size + 1):
+                if group_size > 1:
+                    if group not in prefixes:
+                        # no words start with this group
+                        break
+                    group += words_aug_join_char + words[i + group_size - 1]
+                if group_size in group_sizes and group in matched_words:
+                    num_matched += group_sizes[group_size]
+        return num_matched, num_words
+
+
+# the loaded words assets and the matchers built from them. They are built
+# once in the main process, and shared by the forked workers.
+WORDS_ASSETS = {}
+WORDS_MATCHERS = {}
+
+
+def get_words_matcher(words_dir, words_type, lang):
+    """
+    Get the words matcher of a language from the words assets. The assets
+    are loaded and the matchers are built only once in each process.
+
+    :param words_dir: directory that stores the words asset files.
+    :param words_type: name of the words assets, e.g. 'flagged_words'.
+    :param lang: language of the words. If it's 'all' and there are no
+        words for 'all' in the assets, the words of all languages are used.
+    :return: the words matcher.
+    """
+    key = (words_dir, words_type, lang)
+    if key not in WORDS_MATCHERS:
+        asset_key = (words_dir, words_type)
+        if asset_key not in WORDS_ASSETS:
+            WORDS_ASSETS[asset_key] = load_words_asset(words_dir=words_dir,
+                                                       words_type=words_type)
+        words_dict = WORDS_ASSETS[asset_key]
+        if lang == 'all' and 'all' not in words_dict:
+            words = [val for vals in words_dict.values() for val in vals]
+        else:
+            words = words_dict[lang]
+        WORDS_MATCHERS[key] = WordsMatcher(words)
+    return WORDS_MATCHERS[key]
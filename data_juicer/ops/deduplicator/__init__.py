@@ -4,6 +4,8 @@ from .document_simhash_deduplicator import DocumentSimhashDeduplicator
 from .image_deduplicator import ImageDeduplicator
 from .ray_basic_deduplicator import RayBasicDeduplicator
 from .ray_document_deduplicator import RayDocumentDeduplicator
+from .ray_document_minhash_deduplicator import \
+    RayDocumentMinhashDeduplicator
 from .ray_image_deduplicator import RayImageDeduplicator
 from .ray_video_deduplicator import RayVideoDeduplicator
 from .video_deduplicator import VideoDeduplicator
@@ -11,5 +13,6 @@ from .video_deduplicator import VideoDeduplicator
 __all__ = [
     'VideoDeduplicator', 'RayBasicDeduplicator', 'DocumentMinhashDeduplicator',
     'RayImageDeduplicator', 'RayDocumentDeduplicator', 'DocumentDeduplicator',
-    'ImageDeduplicator', 'DocumentSimhashDeduplicator', 'RayVideoDeduplicator'
+    'ImageDeduplicator', 'DocumentSimhashDeduplicator', 'RayVideoDeduplicator',
+    'RayDocumentMinhashDeduplicator'
 ]
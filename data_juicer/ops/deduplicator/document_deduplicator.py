@@ -5,13 +5,16 @@
 import hashlib
 import string
 from collections import defaultdict
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 
+import numpy as np
 import regex as re
+from loguru import logger
 
 from data_juicer.utils.constant import HashKeys
 
 from ..base_op import OPERATORS, Deduplicator
+from ..common.hash_index import HashIndex
 
 
 @OPERATORS.register_module('document_deduplicator')
@@ -25,6 +28,7 @@ class DocumentDeduplicator(Deduplicator):
     def __init__(self,
                  lowercase: bool = False,
                  ignore_non_character: bool = False,
+                 index_dir: Optional[str] = None,
                  *args,
                  **kwargs):
         """
@@ -33,6 +37,13 @@ class DocumentDeduplicator(Deduplicator):
         :param lowercase: Whether to convert sample text to lower case
         :param ignore_non_character: Whether to ignore non-alphabet
             characters, including whitespaces, digits, and punctuations
+        :param index_dir: directory of a persistent index of the hashes seen
+            in previous runs. If it's set, samples that are seen in previous
+            runs are removed as well, and the hashes of this run are added
+            into the index after the processed dataset is exported. The
+            index is refused if it's built with different hashing params.
+            Default it's None, which only deduplicates within the current
+            dataset.
         :param args: extra args
         :param kwargs: extra args.
         """
@@ -41,6 +52,13 @@ class DocumentDeduplicator(Deduplicator):
         self.remove_non_character_regex = re.compile(
             f'\s+|\d+|[{re.escape(string.punctuation)}]'  # noqa: W605
         ) if ignore_non_character else None
+        self.index_dir = index_dir
+        self.hash_index = HashIndex(
+            index_dir,
+            meta=dict(op='document_deduplicator',
+                      lowercase=lowercase,
+                      ignore_non_character=ignore_non_character)
+        ) if index_dir is not None else None
 
     def compute_hash(self, sample):
         """
@@ -65,6 +83,37 @@ class DocumentDeduplicator(Deduplicator):
         sample[HashKeys.hash] = _get_hash(text)
         return sample
 
+    def remove_seen_in_history(self, dataset):
+        """
+        Remove samples whose hashes exist in the persistent index, and then
+        stage the hashes of the current dataset, which are added into the
+        index when the op is committed.
+
+        :param dataset: input dataset with hash values.
+        :return: dataset without samples seen in previous runs.
+        """
+        # store the 16-byte digests instead of the hex strings
+        keys = np.array([bytes.fromhex(h) for h in dataset[HashKeys.hash]],
+                        dtype='S16')
+        is_seen = self.hash_index.contains(keys)
+        self.hash_index.stage(keys)
+        if is_seen.any():
+            logger.info(f'Remove {int(is_seen.sum())} samples seen in '
+                        f'previous runs.')
+
+            def _filter_seen_helper(samples, indices):
+                return (~is_seen[indices]).tolist()
+
+            dataset = dataset.filter(_filter_seen_helper,
+                                     with_indices=True,
+                                     batched=True,
+                                     load_from_cache_file=False)
+        return dataset
+
+    def commit(self):
+        if self.hash_index is not None:
+            self.hash_index.commit()
+
     def process(self, dataset, show_num=0):
         """
         For doc-level, dataset --> dataset.
@@ -74,6 +123,9 @@ class DocumentDeduplicator(Deduplicator):
             open.
         :return: deduplicated dataset and the sampled duplicate pairs.
         """
+        if self.index_dir is not None:
+            dataset = self.remove_seen_in_history(dataset)
+
         # no need to deduplicate because too few samples
         if len(dataset) <= 1:
             return dataset, {}
@@ -8,6 +8,7 @@ from collections import defaultdict
 from typing import Optional
 
 import numpy as np
+import pyarrow as pa
 import regex
 from loguru import logger
 from pydantic import Field, PositiveInt
@@ -19,15 +20,23 @@ from data_juicer.utils.lazy_loader import LazyLoader
 from data_juicer.utils.model_utils import prepare_sentencepiece_model
 
 from ..base_op import OPERATORS, Deduplicator
-from ..common.helper_func import UnionFind, split_on_whitespace
+from ..common.disk_buckets import DiskBuckets
+from ..common.hash_index import HashIndex
+from ..common.helper_func import (ArrayUnionFind, UnionFind,
+                                  split_on_whitespace)
 
 integrate = LazyLoader('integrate', 'scipy.integrate')
+xxhash = LazyLoader('xxhash', 'xxhash')
 
 OP_NAME = 'document_minhash_deduplicator'
 
 MERSENNE_PRIME = np.uint64((1 << 61) - 1)
 MAX_HASH = np.uint64((1 << 32) - 1)
 
+# max number of shingles permuted at a time, which bounds the size of the
+# (num_shingles, num_permutations) matrix to compute in a batch
+MAX_SHINGLES_PER_CHUNK = 1 << 15
+
 
 def sha1_hash32(data):
     """
@@ -44,6 +53,67 @@ def sha1_hash32(data):
     return struct.unpack('<I', hashlib.sha1(data).digest()[:4])[0]
 
 
+def xxh32_hash(data):
+    """
+    Non-cryptographic 32-bit hash, which is much cheaper than sha1.
+
+    :param data: bytes to hash
+    :return: int
+    """
+    return xxhash.xxh32_intdigest(data)
+
+
+def xxh64_hash(data):
+    """
+    Non-cryptographic 64-bit hash, which is much cheaper than sha1.
+
+    :param data: bytes to hash
+    :return: int
+    """
+    return xxhash.xxh64_intdigest(data)
+
+
+HASH_FUNCS = {
+    'sha1': sha1_hash32,
+    'xxh32': xxh32_hash,
+    'xxh64': xxh64_hash,
+}
+
+LSH_ENGINES = ['dict', 'array']
+
+# multiplier to mix the minhash values of a band into a 64-bit fingerprint
+FINGERPRINT_PRIME = np.uint64(0x100000001b3)
+
+
+def band_fingerprints(band_values):
+    """
+    Mix the minhash values of each band into a 64-bit fingerprint, so that
+    a band can be compared with a single integer.
+
+    :param band_values: uint64 array of minhash values in shape
+        (num_samples, num_bands, num_rows_per_band).
+    :return: uint64 array of fingerprints in shape (num_samples, num_bands).
+    """
+    fingerprints = np.zeros(band_values.shape[:2], dtype=np.uint64)
+    for row in range(band_values.shape[2]):
+        fingerprints = (fingerprints ^ band_values[:, :, row]) * \
+                       FINGERPRINT_PRIME
+    return fingerprints
+
+
+def band_keys(fingerprints):
+    """
+    Mix the band index into the fingerprints, so that the same fingerprints
+    in different bands are not matched when all bands share one key space.
+
+    :param fingerprints: uint64 array of fingerprints in shape
+        (num_samples, num_bands).
+    :return: uint64 array of keys in the same shape.
+    """
+    bands = np.arange(fingerprints.shape[1], dtype=np.uint64)
+    return (fingerprints ^ bands) * FINGERPRINT_PRIME
+
+
 def optimal_param(
     threshold: float,
     num_perm: int,
@@ -105,6 +175,8 @@ class DocumentMinhashDeduplicator(Deduplicator):
     kept in the final dataset.
     """
 
+    _batched_op = True
+
     def __init__(
         self,
         tokenization: str = 'space',
@@ -116,6 +188,11 @@ class DocumentMinhashDeduplicator(Deduplicator):
         num_bands: Optional[PositiveInt] = None,
         num_rows_per_band: Optional[PositiveInt] = None,
         tokenizer_model: Optional[str] = None,
+        hash_func: str = 'sha1',
+        lsh_engine: str = 'dict',
+        spill_dir: Optional[str] = None,
+        num_spill_buckets: PositiveInt = 256,
+        index_dir: Optional[str] = None,
         *args,
         **kwargs,
     ):
@@ -149,6 +226,31 @@ class DocumentMinhashDeduplicator(Deduplicator):
             params computation algorithm
         :param tokenizer_model: path for the sentencepiece model, used for
             sentencepiece tokenization.
+        :param hash_func: hash function to hash shingles before
+            permutation. It should be one of [sha1, xxh32, xxh64]. 'sha1'
+            is the same as datasketch, while 'xxh32' and 'xxh64' are
+            much cheaper non-cryptographic hashes, but the minhash values
+            are different from the 'sha1' ones.
+        :param lsh_engine: engine to cluster samples with LSH. It should be
+            one of [dict, array]. 'dict' builds hash tables of Python dicts
+            and sets for each band, while 'array' stores a 64-bit
+            fingerprint of each band of each sample in NumPy arrays, finds
+            collisions by sorting and unions samples over an int array,
+            which takes tens of bytes instead of kilobytes for each sample.
+        :param spill_dir: directory to spill hashes to for out-of-core
+            deduplication. If it's set, band fingerprints are partitioned
+            into bucket files under this directory and clustered one bucket
+            at a time, so they don't need to fit in memory, and lsh_engine
+            is ignored. Default it's None, which keeps all hashes in memory.
+        :param num_spill_buckets: number of bucket files to partition the
+            band fingerprints into. Only available when spill_dir is set.
+        :param index_dir: directory of a persistent index of the band keys
+            seen in previous runs. If it's set, samples that are
+            near-duplicates of any sample in previous runs are removed as
+            well, and the band keys of this run are added into the index
+            after the processed dataset is exported. The index is refused
+            if it's built with different minhash and LSH params. Default
+            it's None, which only deduplicates within the current dataset.
         """
         super().__init__(*args, **kwargs)
         # about minhash computation
@@ -174,6 +276,18 @@ class DocumentMinhashDeduplicator(Deduplicator):
         else:
             self.tokenizer = None
 
+        if hash_func not in HASH_FUNCS:
+            raise ValueError(f'Unknown hash function [{hash_func}]. It '
+                             f'should be one of {list(HASH_FUNCS.keys())}.')
+        self.hash_func = hash_func
+        if lsh_engine not in LSH_ENGINES:
+            raise ValueError(f'Unknown LSH engine [{lsh_engine}]. It should '
+                             f'be one of {LSH_ENGINES}.')
+        self.lsh_engine = lsh_engine
+        self.spill_dir = spill_dir
+        self.num_spill_buckets = num_spill_buckets
+        self.index_dir = index_dir
+
         # about deduplication
         self.num_permutation = num_permutations
         self.jaccard_threshold = jaccard_threshold
@@ -204,19 +318,29 @@ class DocumentMinhashDeduplicator(Deduplicator):
             dtype=np.uint64,
         ).T
 
-    def compute_hash(self, sample):
+        # the band keys are only comparable across runs with the same params
+        self.hash_index = HashIndex(
+            index_dir,
+            meta=dict(op='document_minhash_deduplicator',
+                      tokenization=tokenization,
+                      tokenizer_model=tokenizer_model,
+                      window_size=window_size,
+                      lowercase=lowercase,
+                      ignore_pattern=ignore_pattern,
+                      hash_func=hash_func,
+                      seed=42,
+                      num_permutations=self.num_permutation,
+                      num_bands=self.num_bands,
+                      num_rows_per_band=self.num_rows_per_band)
+        ) if index_dir is not None else None
+
+    def get_shingles(self, text):
         """
-        Compute minhash values for the sample.
+        Split the text into the set of shingles to compute minhash on.
 
-        :param sample: input sample
-        :return: sample with minhash value.
+        :param text: input text
+        :return: set of shingles in bytes.
         """
-        # check if it's computed already
-        if HashKeys.minhash in sample:
-            return sample
-
-        text = sample[self.text_key]
-
         if self.lowercase:
             text = text.lower()
         if self.ignore_pattern:
@@ -250,44 +374,83 @@ class DocumentMinhashDeduplicator(Deduplicator):
         else:
             raise NotImplementedError(
                 f'Unimplemented tokenization method [{self.tokenization}]')
+        return tokens
+
+    def compute_hash(self, samples):
+        """
+        Compute minhash values for a batch of samples.
+
+        :param samples: input samples
+        :return: samples with minhash values.
+        """
+        # check if it's computed already
+        if HashKeys.minhash in samples:
+            return samples
 
-        # compute minhash value
-        hv = np.array([sha1_hash32(token) for token in tokens],
-                      dtype=np.uint64)
-        phv = np.bitwise_and(
-            ((hv * np.tile(self.perm_a,
-                           (len(hv), 1)).T).T + self.perm_b) % MERSENNE_PRIME,
-            MAX_HASH)
-        hash_values = np.vstack([
-            phv,
-            np.ones(self.num_permutation, dtype=np.uint64) * MAX_HASH
-        ]).min(axis=0)
-        sample[HashKeys.minhash] = [
-            bytes(hash_values[start:end].byteswap().data)
+        hash_values = self.compute_minhash_values(samples[self.text_key])
+        samples[HashKeys.minhash] = [[
+            bytes(hash_value[start:end].byteswap().data)
             for start, end in self.hash_ranges
-        ]
-        return sample
+        ] for hash_value in hash_values]
+        return samples
 
-    def process(self, dataset, show_num=0):
+    def compute_minhash_values(self, texts):
         """
-        For doc-level, dataset --> dataset.
+        Compute minhash values for a batch of texts.
 
-        :param dataset: input dataset
-        :param show_num: number of traced samples used when tracer is
-            open.
-        :return: deduplicated dataset and the sampled duplicate pairs.
+        Shingles of all texts in the batch are hashed first, and then they
+        are permuted together in chunks by broadcasting, so the permutation
+        matrix is not rebuilt for each text.
+
+        :param texts: list of texts.
+        :return: uint64 array of minhash values in shape
+            (num_texts, num_permutations).
         """
-        # no need to deduplicate because too few samples
-        if len(dataset) <= 1:
-            return dataset, {}
+        hash_func = HASH_FUNCS[self.hash_func]
+        shingle_hashes = [
+            np.fromiter((hash_func(shingle)
+                         for shingle in self.get_shingles(text)),
+                        dtype=np.uint64) for text in texts
+        ]
+        num_shingles = np.array([len(hv) for hv in shingle_hashes])
+
+        # samples without any shingles keep MAX_HASH as their minhash values
+        hash_values = np.full((len(shingle_hashes), self.num_permutation),
+                              MAX_HASH,
+                              dtype=np.uint64)
+        begin = 0
+        while begin < len(shingle_hashes):
+            # take samples into this chunk until it's full
+            end = begin + 1
+            chunk_size = num_shingles[begin]
+            while end < len(shingle_hashes) and chunk_size + num_shingles[
+                    end] <= MAX_SHINGLES_PER_CHUNK:
+                chunk_size += num_shingles[end]
+                end += 1
+            if chunk_size > 0:
+                hv = np.concatenate(shingle_hashes[begin:end])
+                phv = np.bitwise_and(
+                    (hv[:, np.newaxis] * self.perm_a + self.perm_b) %
+                    MERSENNE_PRIME, MAX_HASH)
+                # min over the shingles of each non-empty sample
+                chunk_num_shingles = num_shingles[begin:end]
+                offsets = np.cumsum(chunk_num_shingles) - chunk_num_shingles
+                non_empty = chunk_num_shingles > 0
+                hash_values[begin:end][non_empty] = np.minimum.reduceat(
+                    phv, offsets[non_empty], axis=0)
+            begin = end
+        return hash_values
+
+    def cluster_with_dicts(self, dataset):
+        """
+        Cluster samples with hash tables of Python dicts for each band.
 
+        :param dataset: input dataset with minhash values.
+        :return: int array of the cluster root index of each sample.
+        """
         minhashes = dataset[HashKeys.minhash]
-        # remove bytes minhash column otherwise unexpected error would occur
-        # when exporting the processed dataset
-        dataset = dataset.remove_columns([HashKeys.minhash])
 
         # make clusters -- construct the minhash lookup tables of seg to ids
-        logger.info(f'Start clustering for {len(dataset)} samples...')
         batch_size = 10000
         for i in tqdm(range(0, len(minhashes), batch_size),
                       dynamic_ncols=True,
@@ -308,14 +471,173 @@ class DocumentMinhashDeduplicator(Deduplicator):
                 idx = min(cluster)
                 for x in cluster:
                     union_find.union(x, idx)
-        logger.info(f'There are {len(set(union_find.parent.values()))} '
+        return np.array([union_find.find(i) for i in range(len(dataset))],
+                        dtype=np.int64)
+
+    def iter_band_fingerprints(self, dataset, batch_size=10000):
+        """
+        Read the minhash values in arrow batches and mix the values of each
+        band into a 64-bit fingerprint, which avoids creating Python objects
+        for each band.
+
+        :param dataset: input dataset with minhash values.
+        :param batch_size: number of samples to read at a time.
+        :return: an iterator of (start index, fingerprints) pairs, where the
+            fingerprints is a uint64 array in shape (batch_size, num_bands).
+        """
+        arrow_dataset = dataset.select_columns([HashKeys.minhash
+                                                ]).with_format('arrow')
+        for i in tqdm(range(0, len(dataset), batch_size),
+                      dynamic_ncols=True,
+                      desc='Iterating MinHashes of samples...'):
+            minhashes = arrow_dataset[i:i + batch_size].column(
+                HashKeys.minhash).combine_chunks()
+            bands = minhashes.flatten()
+            offset_type = np.int64 if pa.types.is_large_binary(
+                bands.type) else np.int32
+            offsets = np.frombuffer(bands.buffers()[1], dtype=offset_type)
+            offsets = offsets[bands.offset:bands.offset + len(bands) + 1]
+            values = np.frombuffer(bands.buffers()[2],
+                                   dtype=np.uint8)[offsets[0]:offsets[-1]]
+            values = values.view(np.uint64).reshape(len(minhashes),
+                                                    self.num_bands,
+                                                    self.num_rows_per_band)
+            yield i, band_fingerprints(values)
+
+    def cluster_with_arrays(self, dataset):
+        """
+        Cluster samples with NumPy arrays. The minhash values of each band
+        are mixed into a 64-bit fingerprint, samples with the same
+        fingerprint in a band are found by sorting, and then they are
+        unioned over an int array.
+
+        :param dataset: input dataset with minhash values.
+        :return: int array of the cluster root index of each sample.
+        """
+        num_samples = len(dataset)
+        fingerprints = np.empty((num_samples, self.num_bands),
+                                dtype=np.uint64)
+        for i, batch_fingerprints in self.iter_band_fingerprints(dataset):
+            fingerprints[i:i + len(batch_fingerprints)] = batch_fingerprints
+
+        # samples with the same fingerprint are adjacent after sorting, so
+        # union each sample with the previous one if they are the same
+        union_find = ArrayUnionFind(num_samples)
+        for band in tqdm(range(self.num_bands),
+                         dynamic_ncols=True,
+                         desc='Clustering'):
+            order = np.argsort(fingerprints[:, band], kind='stable')
+            sorted_fingerprints = fingerprints[order, band]
+            same = sorted_fingerprints[1:] == sorted_fingerprints[:-1]
+            union_find.union(order[1:][same], order[:-1][same])
+        return union_find.find(np.arange(num_samples))
+
+    def cluster_with_disk_buckets(self, dataset):
+        """
+        Cluster samples out of core. The band fingerprints are spilled to
+        bucket files under the spill directory by their hash prefixes, and
+        then samples with the same fingerprint in a band are found and
+        unioned one bucket at a time. So only the parent array of the
+        union-find set and one bucket need to be held in memory.
+
+        :param dataset: input dataset with minhash values.
+        :return: int array of the cluster root index of each sample.
+        """
+        num_samples = len(dataset)
+        union_find = ArrayUnionFind(num_samples)
+        with DiskBuckets(self.spill_dir, self.num_spill_buckets) as buckets:
+            for i, fingerprints in self.iter_band_fingerprints(dataset):
+                num_batch = len(fingerprints)
+                buckets.add(
+                    fingerprints.ravel(),
+                    np.tile(np.arange(self.num_bands, dtype=np.uint32),
+                            num_batch),
+                    id=np.repeat(np.arange(i, i + num_batch), self.num_bands))
+            for records in tqdm(buckets,
+                                dynamic_ncols=True,
+                                desc='Clustering buckets'):
+                order = np.lexsort(
+                    (records['id'], records['key'], records['table']))
+                keys = records['key'][order]
+                tables = records['table'][order]
+                ids = records['id'][order]
+                same = (keys[1:] == keys[:-1]) & (tables[1:] == tables[:-1])
+                union_find.union(ids[1:][same], ids[:-1][same])
+        return union_find.find(np.arange(num_samples))
+
+    def remove_seen_in_history(self, dataset):
+        """
+        Remove samples that share any band key with the samples in the
+        persistent index, and then stage the band keys of the current
+        dataset, which are added into the index when the op is committed.
+
+        :param dataset: input dataset with minhash values.
+        :return: dataset without near-duplicates of previous runs.
+        """
+        is_seen = np.zeros(len(dataset), dtype=bool)
+        new_keys = []
+        for i, fingerprints in self.iter_band_fingerprints(dataset):
+            keys = band_keys(fingerprints)
+            is_seen[i:i + len(keys)] = \
+                self.hash_index.contains(keys).any(axis=1)
+            new_keys.append(keys.ravel())
+        if len(new_keys) > 0:
+            self.hash_index.stage(np.concatenate(new_keys))
+        if is_seen.any():
+            logger.info(f'Remove {int(is_seen.sum())} samples that are '
+                        f'near-duplicates of previous runs.')
+
+            def _filter_seen_helper(samples, indices):
+                return (~is_seen[indices]).tolist()
+
+            dataset = dataset.filter(_filter_seen_helper,
+                                     with_indices=True,
+                                     batched=True,
+                                     load_from_cache_file=False)
+        return dataset
+
+    def commit(self):
+        if self.hash_index is not None:
+            self.hash_index.commit()
+
+    def process(self, dataset, show_num=0):
+        """
+        For doc-level, dataset --> dataset.
+
+        :param dataset: input dataset
+        :param show_num: number of traced samples used when tracer is
+            open.
+        :return: deduplicated dataset and the sampled duplicate pairs.
+        """
+        if self.index_dir is not None:
+            dataset = self.remove_seen_in_history(dataset)
+
+        # no need to deduplicate because too few samples
+        if len(dataset) <= 1:
+            if HashKeys.minhash in dataset.column_names:
+                dataset = dataset.remove_columns([HashKeys.minhash])
+            return dataset, {}
+
+        logger.info(f'Start clustering for {len(dataset)} samples...')
+        if self.spill_dir is not None:
+            roots = self.cluster_with_disk_buckets(dataset)
+        elif self.lsh_engine == 'array':
+            roots = self.cluster_with_arrays(dataset)
+        else:
+            roots = self.cluster_with_dicts(dataset)
+        is_root = roots == np.arange(len(dataset))
+        logger.info(f'There are {len(np.unique(roots[~is_root]))} '
                     f'clusters that includes multiple near-duplicate samples.')
 
+        # remove bytes minhash column otherwise unexpected error would occur
+        # when exporting the processed dataset
+        dataset = dataset.remove_columns([HashKeys.minhash])
+
         # record the duplicate sample pairs
         dup_pairs = {}
         if show_num > 0:
             for i in range(len(dataset)):
-                cluster_idx = union_find.find(i)
+                cluster_idx = int(roots[i])
                 if cluster_idx not in dup_pairs and cluster_idx != i:
                     dup_pairs[cluster_idx] = [
                         dataset[cluster_idx],
@@ -328,12 +650,13 @@ class DocumentMinhashDeduplicator(Deduplicator):
         # including:
         # 1. samples that form a cluster by themselves
         # 2. the first sample in a cluster that includes multiple samples
-        def _filter_minhash_dup_helper(sample, index):
-            return union_find.find(index) == index
+        def _filter_minhash_dup_helper(samples, indices):
+            return is_root[indices].tolist()
 
         dataset = dataset.filter(
             _filter_minhash_dup_helper,
             with_indices=True,
+            batched=True,
         )
         logger.info(f'Keep {len(dataset)} samples after MinHash dedup.')
 
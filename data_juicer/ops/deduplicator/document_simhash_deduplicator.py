@@ -3,24 +3,39 @@
 # --------------------------------------------------------
 
 from collections import defaultdict, deque
+from itertools import combinations
 from typing import Dict, Optional, Set
 
 import numpy as np
 import regex
 from loguru import logger
 from pydantic import PositiveInt
+from tqdm import tqdm
 
 from data_juicer.utils.constant import HashKeys
 from data_juicer.utils.lazy_loader import LazyLoader
 
 from ..base_op import OPERATORS, Deduplicator
-from ..common.helper_func import split_on_whitespace
+from ..common.disk_buckets import DiskBuckets
+from ..common.helper_func import ArrayUnionFind, split_on_whitespace
 
 simhash = LazyLoader('simhash', 'simhash')
 
 OP_NAME = 'document_simhash_deduplicator'
 
 
+def hamming_distances(x, y):
+    """
+    Compute the hamming distances between two arrays of 64-bit hashes.
+
+    :param x: uint64 array of hashes.
+    :param y: uint64 array of hashes, with the same length as x.
+    :return: int array of hamming distances.
+    """
+    diff = np.ascontiguousarray(x ^ y)
+    return np.unpackbits(diff.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
 @OPERATORS.register_module(OP_NAME)
 class DocumentSimhashDeduplicator(Deduplicator):
     """Deduplicator to deduplicate samples at document-level using SimHash."""
@@ -32,6 +47,8 @@ class DocumentSimhashDeduplicator(Deduplicator):
                  ignore_pattern: Optional[str] = None,
                  num_blocks: PositiveInt = 6,
                  hamming_distance: PositiveInt = 4,
+                 spill_dir: Optional[str] = None,
+                 num_spill_buckets: PositiveInt = 256,
                  *args,
                  **kwargs):
         """
@@ -53,6 +70,13 @@ class DocumentSimhashDeduplicator(Deduplicator):
             similar samples and this op will only keep one of them after
             deduplication. This threshold should be always less than
             num_blocks
+        :param spill_dir: directory to spill hashes to for out-of-core
+            deduplication. If it's set, the hashes are partitioned into
+            bucket files under this directory by the blocks they share, and
+            matched one bucket at a time, so they don't need to fit in
+            memory. Default it's None, which keeps all hashes in memory.
+        :param num_spill_buckets: number of bucket files to partition the
+            hashes into. Only available when spill_dir is set.
         """
         # about simhash computation
         super().__init__(*args, **kwargs)
@@ -73,6 +97,8 @@ class DocumentSimhashDeduplicator(Deduplicator):
         # about deduplication
         self.num_blocks = num_blocks
         self.hamming_distance = hamming_distance
+        self.spill_dir = spill_dir
+        self.num_spill_buckets = num_spill_buckets
 
     def compute_hash(self, sample):
         """
@@ -120,6 +146,96 @@ class DocumentSimhashDeduplicator(Deduplicator):
             np.uint64(simhash.compute(map(simhash.unsigned_hash, tokens))))
         return sample
 
+    def get_block_masks(self):
+        """
+        Split the 64 bits of simhash into blocks, and get the bit masks of
+        each combination of (num_blocks - hamming_distance) blocks. Two
+        hashes within the hamming distance share all bits of at least one of
+        these combinations.
+
+        :return: list of uint64 masks.
+        """
+        if self.hamming_distance >= self.num_blocks:
+            raise ValueError(f'The hamming distance '
+                             f'[{self.hamming_distance}] should be less than '
+                             f'the number of blocks [{self.num_blocks}].')
+        block_masks = []
+        start = 0
+        for i in range(self.num_blocks):
+            width = 64 // self.num_blocks + (i < 64 % self.num_blocks)
+            block_masks.append(((1 << width) - 1) << start)
+            start += width
+        return [
+            np.uint64(sum(block_masks[i] for i in blocks))
+            for blocks in combinations(range(self.num_blocks),
+                                       self.num_blocks - self.hamming_distance)
+        ]
+
+    def cluster_with_disk_buckets(self, dataset):
+        """
+        Cluster samples out of core. For each block combination, the hashes
+        are spilled to bucket files under the spill directory by the bits of
+        these blocks. Then candidates that share the same bits in a bucket
+        are compared and the matched samples are unioned one bucket at a
+        time. So only the parent array of the union-find set and one bucket
+        need to be held in memory.
+
+        :param dataset: input dataset with simhash values.
+        :return: int array of the cluster root index of each sample.
+        """
+        num_samples = len(dataset)
+        masks = self.get_block_masks()
+        union_find = ArrayUnionFind(num_samples)
+        with DiskBuckets(self.spill_dir, self.num_spill_buckets) as buckets:
+            batch_size = 10000
+            for i in tqdm(range(0, num_samples, batch_size),
+                          dynamic_ncols=True,
+                          desc='Iterating SimHashes of samples...'):
+                hashes = np.array(dataset[i:i + batch_size][HashKeys.simhash],
+                                  dtype=np.uint64)
+                ids = np.arange(i, i + len(hashes))
+                for table, mask in enumerate(masks):
+                    buckets.add(hashes & mask,
+                                np.full(len(hashes), table, dtype=np.uint32),
+                                hash=hashes,
+                                id=ids)
+
+            for records in tqdm(buckets,
+                                dynamic_ncols=True,
+                                desc='Clustering buckets'):
+                order = np.lexsort((records['id'], records['hash'],
+                                    records['key'], records['table']))
+                keys = records['key'][order]
+                tables = records['table'][order]
+                hashes = records['hash'][order]
+                ids = records['id'][order]
+
+                # candidates are in the same group if they share the bits of
+                # the same block combination
+                new_group = np.concatenate(
+                    [[True],
+                     (keys[1:] != keys[:-1]) | (tables[1:] != tables[:-1])])
+                new_hash = new_group | np.concatenate(
+                    [[True], hashes[1:] != hashes[:-1]])
+                # samples with the same hash in a group are adjacent
+                xs = [ids[1:][~new_hash[1:]]]
+                ys = [ids[:-1][~new_hash[1:]]]
+                # and the distinct hashes in a group are compared pairwise
+                starts = np.flatnonzero(new_group)
+                ends = np.append(starts[1:], len(keys))
+                for start, end in zip(starts, ends):
+                    positions = np.flatnonzero(new_hash[start:end]) + start
+                    if len(positions) <= 1:
+                        continue
+                    left, right = np.triu_indices(len(positions), 1)
+                    left, right = positions[left], positions[right]
+                    matched = hamming_distances(
+                        hashes[left], hashes[right]) <= self.hamming_distance
+                    xs.append(ids[left[matched]])
+                    ys.append(ids[right[matched]])
+                union_find.union(np.concatenate(xs), np.concatenate(ys))
+        return union_find.find(np.arange(num_samples))
+
     def process(self, dataset, show_num=0):
         """
         For doc-level, dataset --> dataset.
@@ -133,6 +249,9 @@ class DocumentSimhashDeduplicator(Deduplicator):
         if len(dataset) <= 1:
             return dataset, {}
 
+        if self.spill_dir is not None:
+            return self.process_out_of_core(dataset, show_num)
+
         # find matches
         logger.info(f'Start querying {len(dataset)} samples.')
         matches = simhash.find_all(
@@ -224,3 +343,44 @@ class DocumentSimhashDeduplicator(Deduplicator):
         logger.info(f'Keep {len(dataset)} samples after SimHash dedup.')
 
         return dataset, dup_pairs
+
+    def process_out_of_core(self, dataset, show_num=0):
+        """
+        Deduplicate the dataset with hashes spilled to disk.
+
+        :param dataset: input dataset
+        :param show_num: number of traced samples used when tracer is
+            open.
+        :return: deduplicated dataset and the sampled duplicate pairs.
+        """
+        logger.info(f'Start clustering {len(dataset)} samples out of core.')
+        roots = self.cluster_with_disk_buckets(dataset)
+        is_root = roots == np.arange(len(dataset))
+        logger.info(f'Found {len(np.unique(roots[~is_root]))} clusters '
+                    f'that include multiple near-duplicate samples.')
+
+        # record the duplicate sample pairs
+        dup_pairs = {}
+        if show_num > 0:
+            for i in range(len(dataset)):
+                cluster_idx = int(roots[i])
+                if cluster_idx not in dup_pairs and cluster_idx != i:
+                    dup_pairs[cluster_idx] = [
+                        dataset[cluster_idx],
+                        dataset[i],
+                    ]
+                if len(dup_pairs) >= show_num:
+                    break
+
+        # only keep the first sample in each cluster
+        def _filter_simhash_dup_helper(samples, indices):
+            return is_root[indices].tolist()
+
+        dataset = dataset.filter(
+            _filter_simhash_dup_helper,
+            with_indices=True,
+            batched=True,
+        )
+        logger.info(f'Keep {len(dataset)} samples after SimHash dedup.')
+
+        return dataset, dup_pairs
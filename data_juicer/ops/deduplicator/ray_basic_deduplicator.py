@@ -1,11 +1,102 @@
+import uuid
+import zlib
+
 from pydantic import PositiveInt
 
-from data_juicer.utils.constant import HashKeys
+from data_juicer.utils.constant import Fields, HashKeys
 from data_juicer.utils.lazy_loader import LazyLoader
 
 from ..base_op import Filter
 
 redis = LazyLoader('redis', 'redis')
+ray = LazyLoader('ray', 'ray')
+
+BACKENDS = {'redis', 'ray_actor'}
+
+# seconds to keep the hash values in redis after the last update
+REDIS_KEY_TTL = 24 * 3600
+
+
+class DedupSet:
+    """A shard of the seen hash values, run as a Ray actor."""
+
+    def __init__(self):
+        self.hash_values = set()
+
+    def setnx_multi(self, hash_values):
+        """
+        Insert a batch of hash values, and return whether each of them is
+        newly inserted, like `SETNX` in redis.
+        """
+        is_new = []
+        for hash_value in hash_values:
+            if hash_value in self.hash_values:
+                is_new.append(False)
+            else:
+                self.hash_values.add(hash_value)
+                is_new.append(True)
+        return is_new
+
+
+class RayActorBackend:
+    """
+    Keep the seen hash values in a group of Ray actors in the cluster. The
+    hash space is partitioned across the actors, so each batch of samples
+    only needs one lookup-and-insert call to each actor.
+    """
+
+    def __init__(self, num_shards: int):
+        self.dedup_sets = [
+            ray.remote(DedupSet).remote() for _ in range(num_shards)
+        ]
+
+    def get_shard_id(self, hash_value):
+        # the builtin hash is salted per process, so use a stable one instead
+        return zlib.crc32(hash_value.encode('utf-8')) % len(self.dedup_sets)
+
+    def setnx_multi(self, hash_values):
+        shards = {}
+        for idx, hash_value in enumerate(hash_values):
+            shard_id = self.get_shard_id(hash_value)
+            shards.setdefault(shard_id, ([], []))
+            shards[shard_id][0].append(idx)
+            shards[shard_id][1].append(hash_value)
+        shard_ids = list(shards.keys())
+        results = ray.get([
+            self.dedup_sets[shard_id].setnx_multi.remote(shards[shard_id][1])
+            for shard_id in shard_ids
+        ])
+        is_new = [False] * len(hash_values)
+        for shard_id, shard_res in zip(shard_ids, results):
+            for idx, res in zip(shards[shard_id][0], shard_res):
+                is_new[idx] = res
+        return is_new
+
+
+class RedisBackend:
+    """
+    Keep the seen hash values in an external redis server. All hash values
+    of a batch of samples are sent in one pipeline.
+
+    The hash values of each backend are kept in a redis hash of its own
+    instead of the whole db, so the db doesn't need to be flushed before
+    deduplication, and ops or jobs that share the redis server never see or
+    wipe each other's hash values. The redis hash expires when it's not
+    updated for `REDIS_KEY_TTL` seconds.
+    """
+
+    def __init__(self, redis_host: str, redis_port: int):
+        self.redis_host = redis_host
+        self.redis_port = redis_port
+        self.redis_key = f'data_juicer:dedup:{uuid.uuid4().hex}'
+
+    def setnx_multi(self, hash_values):
+        r = redis.StrictRedis(host=self.redis_host, port=self.redis_port, db=0)
+        pipe = r.pipeline()
+        for hash_value in hash_values:
+            pipe.hsetnx(self.redis_key, hash_value, 1)
+        pipe.expire(self.redis_key, REDIS_KEY_TTL)
+        return [bool(res) for res in pipe.execute()[:-1]]
 
 
 class RayBasicDeduplicator(Filter):
@@ -15,41 +106,60 @@ class RayBasicDeduplicator(Filter):
     it is implemented as Filter sub-class.
     """
 
+    _batched_op = True
+
     # TODO: Set a more reasonable value
     EMPTY_HASH_VALUE = 'EMPTY'
 
     def __init__(self,
+                 backend: str = 'redis',
                  redis_host: str = 'localhost',
                  redis_port: PositiveInt = 6380,
+                 num_shards: PositiveInt = 8,
                  *args,
                  **kwargs):
         """
         Initialization.
+        :param backend: where to keep the seen hash values. Should be one of
+            [redis, ray_actor]. "redis" keeps them in a redis server.
+            "ray_actor" partitions them across a group of Ray actors in the
+            cluster, and no external service is needed.
         :param redis_host: the hostname of redis server
         :param redis_port: the port of redis server
+        :param num_shards: number of Ray actors to partition the hash values
+            into. Only available when backend is "ray_actor".
         :param args: extra args
         :param kwargs: extra args
         """
         super().__init__(*args, **kwargs)
+        if backend not in BACKENDS:
+            raise ValueError(f'Backend [{backend}] is not supported. '
+                             f'Can only be one of {BACKENDS}.')
+        self.backend = backend
         self.redis_host = redis_host
         self.redis_port = redis_port
-        # TODO: add a barrier to ensure that flushdb is performed before
-        # the operator is called
-        r = redis.StrictRedis(host=self.redis_host, port=self.redis_port, db=0)
-        r.flushdb(0)
+        if backend == 'redis':
+            self.dedup_backend = RedisBackend(redis_host, redis_port)
+        else:
+            self.dedup_backend = RayActorBackend(num_shards)
 
     def calculate_hash(self, sample, context=False):
         """Calculate hash value for the sample."""
         raise NotImplementedError
 
-    def compute_stats_single(self, sample, context=False):
-        # init redis client
-        r = redis.StrictRedis(host=self.redis_host, port=self.redis_port, db=0)
-        # compute hash
-        md5_value = self.calculate_hash(sample, context)
-        # check existing
-        sample[HashKeys.is_duplicate] = r.setnx(md5_value, 1)
-        return sample
-
-    def process_single(self, sample):
-        return sample[HashKeys.is_duplicate]
+    def compute_stats_batched(self, samples, context=False):
+        keys = samples.keys()
+        num_samples = len(samples[Fields.stats])
+        hash_values = [
+            self.calculate_hash({key: samples[key][i]
+                                 for key in keys}, context)
+            for i in range(num_samples)
+        ]
+        # check existing for the whole batch at once
+        samples[HashKeys.is_duplicate] = self.dedup_backend.setnx_multi(
+            hash_values)
+        return samples
+
+    def process_batched(self, samples):
+        # a list of flags for a batch, or a single flag for ray filter
+        return samples[HashKeys.is_duplicate]
@@ -0,0 +1,260 @@
+import numpy as np
+import pyarrow as pa
+from loguru import logger
+
+from data_juicer.utils.constant import HashKeys
+from data_juicer.utils.lazy_loader import LazyLoader
+
+from ..base_op import OPERATORS
+from .document_minhash_deduplicator import (DocumentMinhashDeduplicator,
+                                            band_fingerprints, band_keys)
+
+rd = LazyLoader('rd', 'ray.data')
+
+OP_NAME = 'ray_document_minhash_deduplicator'
+
+# placeholder edge to mark that the graph is not a star forest yet
+UNSTABLE_EDGE = -1
+
+# column of the max duplicate mark of each uid after aggregation
+MAX_DUP_MARK = f'max({HashKeys.is_duplicate})'
+
+
+def _positions_to_uids(batch):
+    return {HashKeys.uid: batch['id']}
+
+
+def _mark_kept(batch):
+    return {
+        HashKeys.uid: batch['id'],
+        HashKeys.is_duplicate: np.zeros(len(batch['id']), dtype=np.int8),
+    }
+
+
+def _mark_duplicates(edges):
+    return {
+        HashKeys.uid: edges['u'],
+        HashKeys.is_duplicate: np.ones(len(edges['u']), dtype=np.int8),
+    }
+
+
+def _to_dup_flags(batch):
+    return {HashKeys.is_duplicate: batch[MAX_DUP_MARK]}
+
+
+def _filter_duplicates(table: pa.Table) -> pa.Table:
+    is_dup = table.column(HashKeys.is_duplicate).to_numpy()
+    return table.filter(pa.array(is_dup == 0)).drop(
+        [HashKeys.uid, HashKeys.is_duplicate])
+
+
+def _empty_edges():
+    return {
+        'u': np.array([], dtype=np.int64),
+        'v': np.array([], dtype=np.int64),
+    }
+
+
+def _band_star_edges(group):
+    """
+    Link all samples in a band bucket to the one with the min uid.
+    Edges are always oriented as (larger uid, smaller uid).
+    """
+    uids = np.unique(group[HashKeys.uid])
+    if len(uids) <= 1:
+        return _empty_edges()
+    return {'u': uids[1:], 'v': np.full(len(uids) - 1, uids[0])}
+
+
+def _symmetrize(edges):
+    return pa.table({
+        'u': pa.concat_arrays([edges['u'].combine_chunks(),
+                               edges['v'].combine_chunks()]),
+        'v': pa.concat_arrays([edges['v'].combine_chunks(),
+                               edges['u'].combine_chunks()]),
+    })
+
+
+def _large_star(group):
+    """
+    Large-star step on a node u with all its neighbors: link each neighbor
+    larger than u to the min node of u's neighborhood.
+
+    If u has a smaller neighbor and a larger one, or more than one smaller
+    neighbors, the graph is not a star forest yet, and an unstable edge is
+    emitted to mark it.
+    """
+    u = group['u'][0]
+    neighbors = np.unique(group['v'])
+    min_node = min(u, neighbors[0])
+    larger = neighbors[neighbors > u]
+    num_smaller = len(neighbors) - len(larger)
+    res = {'u': larger, 'v': np.full(len(larger), min_node)}
+    if num_smaller > 1 or (num_smaller > 0 and len(larger) > 0):
+        res['u'] = np.append(res['u'], UNSTABLE_EDGE)
+        res['v'] = np.append(res['v'], UNSTABLE_EDGE)
+    return res
+
+
+def _count_unstable_edges(edges):
+    return {'count': np.array([np.sum(edges['u'] == UNSTABLE_EDGE)])}
+
+
+def _drop_unstable_edges(edges):
+    keep = edges['u'] != UNSTABLE_EDGE
+    return {'u': edges['u'][keep], 'v': edges['v'][keep]}
+
+
+def _small_star(group):
+    """
+    Small-star step on a node u with its smaller neighbors: link u and each
+    of these neighbors to the min one of them.
+    """
+    u = group['u'][0]
+    neighbors = np.unique(group['v'])
+    nodes = np.append(neighbors[1:], u)
+    return {'u': nodes, 'v': np.full(len(nodes), neighbors[0])}
+
+
+@OPERATORS.register_module(OP_NAME)
+class RayDocumentMinhashDeduplicator(DocumentMinhashDeduplicator):
+    """
+    Deduplicator to deduplicate samples at document-level using MinHashLSH
+    on Ray.
+
+    Minhash values are computed with `map_batches`, samples are shuffled by
+    their band fingerprints to find candidate pairs, connected components
+    are found by the alternating large-star and small-star algorithm as
+    distributed Ray Data jobs, and the duplicates are removed by an
+    anti-join on uids. The uid of each sample is its position, so only the
+    first sample in each component is kept, the same as
+    `document_minhash_deduplicator`. No external service is required.
+
+    The arguments are the same as `document_minhash_deduplicator`, while
+    `lsh_engine`, `spill_dir` and `index_dir` are not used since the
+    clustering is done by Ray. It runs as `document_minhash_deduplicator`
+    on datasets that are not Ray datasets.
+    """
+
+    def compute_signatures(self, table: pa.Table):
+        """
+        Compute the band fingerprints of a batch of samples.
+
+        :param table: a batch of samples with uids.
+        :return: the uids and fingerprints of the batch.
+        """
+        num_samples = len(table)
+        texts = table.column(self.text_key).to_pylist()
+        hash_values = self.compute_minhash_values(texts)
+        num_hashes = self.num_bands * self.num_rows_per_band
+        fingerprints = band_fingerprints(hash_values[:, :num_hashes].reshape(
+            num_samples, self.num_bands, self.num_rows_per_band))
+        # store the fingerprints of each sample as bytes, the same as the
+        # minhash values in the non-distributed op
+        return pa.table({
+            HashKeys.uid:
+            table.column(HashKeys.uid),
+            HashKeys.minhash:
+            pa.array([row.tobytes() for row in fingerprints],
+                     type=pa.binary()),
+        })
+
+    def get_band_keys(self, table: pa.Table):
+        """
+        Flatten a batch of fingerprints into (band key, uid) rows. The band
+        index is mixed into the key, so the same fingerprints in different
+        bands are not matched.
+        """
+        fingerprints = np.frombuffer(
+            b''.join(table.column(HashKeys.minhash).to_pylist()),
+            dtype=np.uint64).reshape(len(table), self.num_bands)
+        return pa.table({
+            'key':
+            band_keys(fingerprints).ravel(),
+            HashKeys.uid:
+            np.repeat(table.column(HashKeys.uid).to_numpy(), self.num_bands),
+        })
+
+    @staticmethod
+    def find_duplicates(edges):
+        """
+        Find the connected components of the graph, and return the edges
+        from the nodes that are not the min one in their components.
+
+        :param edges: Ray dataset of edges in columns 'u' and 'v'.
+        :return: Ray dataset of edges, whose 'u' column contains all the
+            duplicate uids.
+        """
+        num_rounds = 0
+        while True:
+            num_rounds += 1
+            edges = edges.map_batches(
+                _symmetrize, batch_format='pyarrow').groupby('u').map_groups(
+                    _large_star, batch_format='numpy').materialize()
+            num_unstable = edges.map_batches(
+                _count_unstable_edges, batch_format='numpy').sum('count')
+            if not num_unstable:
+                break
+            edges = edges.map_batches(_drop_unstable_edges,
+                                      batch_format='numpy')
+            edges = edges.groupby('u').map_groups(
+                _small_star, batch_format='numpy').materialize()
+        logger.info(f'Connected components are found in {num_rounds} '
+                    f'rounds.')
+
+        # now the graph is a star forest with the min node of each component
+        # as the center, so all the other nodes are duplicates
+        return edges
+
+    @staticmethod
+    def remove_duplicates(dataset, dup_edges, num_samples):
+        """
+        Remove the duplicates from the dataset by an anti-join on uids as
+        distributed jobs. Each uid is marked as kept, the duplicate uids are
+        marked again as duplicates, and the max mark of each uid is taken.
+        The marks sorted by uid are aligned with the samples, since the uids
+        are the positions of the samples.
+
+        :param dataset: Ray dataset of samples with uids in order.
+        :param dup_edges: Ray dataset of edges from the duplicate uids.
+        :param num_samples: number of samples in the dataset.
+        :return: the deduplicated dataset.
+        """
+        marks = rd.range(num_samples).map_batches(
+            _mark_kept, batch_format='numpy').union(
+                dup_edges.map_batches(_mark_duplicates,
+                                      batch_format='numpy'))
+        dup_flags = marks.groupby(HashKeys.uid).max(
+            HashKeys.is_duplicate).sort(HashKeys.uid).map_batches(
+                _to_dup_flags, batch_format='numpy')
+        return dataset.zip(dup_flags).map_batches(_filter_duplicates,
+                                                  batch_format='pyarrow')
+
+    def run(self, dataset, *, exporter=None, tracer=None):
+        if not isinstance(dataset, rd.Dataset):
+            # not a Ray dataset, so run it as document_minhash_deduplicator
+            return super().run(dataset, exporter=exporter, tracer=tracer)
+        num_samples = dataset.count()
+        if num_samples <= 1:
+            return dataset
+        # the uid of each sample is its position, so the first sample of
+        # duplicates is kept no matter how the batches are scheduled
+        dataset = dataset.zip(
+            rd.range(num_samples).map_batches(
+                _positions_to_uids, batch_format='numpy')).materialize()
+
+        signatures = dataset.select_columns(
+            [HashKeys.uid, self.text_key]).map_batches(
+                self.compute_signatures,
+                batch_size=self.batch_size,
+                batch_format='pyarrow')
+        edges = signatures.map_batches(
+            self.get_band_keys, batch_format='pyarrow').groupby(
+                'key').map_groups(_band_star_edges,
+                                  batch_format='numpy').materialize()
+        if edges.count() == 0:
+            logger.info('Found 0 near-duplicate samples.')
+            return dataset.drop_columns([HashKeys.uid])
+        dup_edges = self.find_duplicates(edges)
+        logger.info(f'Found {dup_edges.count()} near-duplicate samples.')
+        return self.remove_duplicates(dataset, dup_edges, num_samples)
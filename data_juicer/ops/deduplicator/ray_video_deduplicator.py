@@ -21,19 +21,27 @@ class RayVideoDeduplicator(RayBasicDeduplicator):
     """
 
     def __init__(self,
+                 backend: str = 'redis',
                  redis_host: str = 'localhost',
                  redis_port: PositiveInt = 6380,
+                 num_shards: PositiveInt = 8,
                  *args,
                  **kwargs):
         """
         Initialization.
+        :param backend: where to keep the seen hash values. Should be one of
+            [redis, ray_actor].
         :param redis_host: the hostname of redis server
         :param redis_port: the port of redis server
+        :param num_shards: number of Ray actors to partition the hash values
+            into. Only available when backend is "ray_actor".
         :param args: extra args
         :param kwargs: extra args
         """
-        super().__init__(redis_host=redis_host,
+        super().__init__(backend=backend,
+                         redis_host=redis_host,
                          redis_port=redis_port,
+                         num_shards=num_shards,
                          *args,
                          **kwargs)
 
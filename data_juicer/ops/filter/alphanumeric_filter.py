@@ -1,10 +1,13 @@
 import sys
 
-from data_juicer.utils.constant import Fields, StatsKeys
+import pyarrow as pa
+
+from data_juicer.utils.constant import StatsKeys
 from data_juicer.utils.model_utils import get_model, prepare_model
 
 from ..base_op import OPERATORS, Filter
 from ..common import get_words_from_document
+from ..common.columnar import fill_stats_field, stats_in_range
 
 OP_NAME = 'alphanumeric_filter'
 
@@ -14,7 +17,10 @@ class AlphanumericFilter(Filter):
     """Filter to keep samples with alphabet/numeric ratio within a specific
     range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_ratio', 'max_ratio'}
     _batched_op = True
+    _columnar_op = True
 
     def __init__(self,
                  tokenization: bool = False,
@@ -51,44 +57,33 @@ class AlphanumericFilter(Filter):
                 return_model=False)
 
     def compute_stats_batched(self, samples):
-        samples_list = samples[self.text_key]
-        samples_stats = samples[Fields.stats]
-
-        for idx, stat in enumerate(samples_stats):
-            cur_text = samples_list[idx]
-            if self.tokenization:
-                if StatsKeys.alpha_token_ratio in stat:
-                    continue
+        if self.tokenization:
+            tokenizer = get_model(self.model_key)
+
+            def alpha_token_ratio(text):
                 alpha_count = sum(
-                    map(lambda char: 1 if char.isalpha() else 0, cur_text))
-                tokenizer = get_model(self.model_key)
+                    map(lambda char: 1 if char.isalpha() else 0, text))
                 token_count = len(
                     get_words_from_document(
-                        cur_text,
+                        text,
                         token_func=tokenizer.tokenize if tokenizer else None))
-                samples_stats[idx][StatsKeys.alpha_token_ratio] = (
-                    alpha_count / token_count) if token_count != 0 else 0.0
-            else:
-                if StatsKeys.alnum_ratio in stat:
-                    continue
-                alnum_count = sum(
-                    map(lambda char: 1 if char.isalnum() else 0, cur_text))
-                samples_stats[idx][StatsKeys.alnum_ratio] = (
-                    alnum_count / len(cur_text)) if len(cur_text) != 0 else 0.0
-
-        return samples
+                return (alpha_count /
+                        token_count) if token_count != 0 else 0.0
+
+            return fill_stats_field(samples, StatsKeys.alpha_token_ratio,
+                                    self.text_key, alpha_token_ratio,
+                                    pa.float64())
+
+        def alnum_ratio(text):
+            alnum_count = sum(
+                map(lambda char: 1 if char.isalnum() else 0, text))
+            return (alnum_count / len(text)) if len(text) != 0 else 0.0
+
+        return fill_stats_field(samples, StatsKeys.alnum_ratio, self.text_key,
+                                alnum_ratio, pa.float64())
 
     def process_batched(self, samples):
         ratio_key = StatsKeys.alpha_token_ratio if self.tokenization \
             else StatsKeys.alnum_ratio
-        if isinstance(samples[Fields.stats], list):
-            return map(
-                lambda stat: self.min_ratio <= stat[ratio_key] <= self.
-                max_ratio, samples[Fields.stats])
-        else:
-            # single sample for ray filter
-            if self.min_ratio <= samples[
-                    Fields.stats][ratio_key] <= self.max_ratio:
-                return True
-            else:
-                return False
+        return stats_in_range(samples, ratio_key, self.min_ratio,
+                              self.max_ratio)
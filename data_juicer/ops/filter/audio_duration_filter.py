@@ -18,6 +18,9 @@ class AudioDurationFilter(Filter):
     """Keep data samples whose audios' durations are within a specified range.
     """
 
+    _stats_input_keys = ('audio_key', )
+    _threshold_params = {'min_duration', 'max_duration'}
+
     def __init__(self,
                  min_duration: int = 0,
                  max_duration: int = sys.maxsize,
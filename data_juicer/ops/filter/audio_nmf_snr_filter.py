@@ -64,6 +64,9 @@ class AudioNMFSNRFilter(Filter):
     a specified range.
     """
 
+    _stats_input_keys = ('audio_key', )
+    _threshold_params = {'min_snr', 'max_snr'}
+
     def __init__(self,
                  min_snr: float = 0,
                  max_snr: float = sys.maxsize,
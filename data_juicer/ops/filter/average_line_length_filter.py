@@ -14,6 +14,8 @@ class AverageLineLengthFilter(Filter):
     """Filter to keep samples with average line length within a specific
     range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_len', 'max_len'}
     _batched_op = True
 
     def __init__(self,
@@ -3,11 +3,13 @@
 # --------------------------------------------------------
 
 import numpy as np
+import pyarrow as pa
 from pydantic import PositiveInt
 
-from data_juicer.utils.constant import Fields, StatsKeys
+from data_juicer.utils.constant import StatsKeys
 
 from ..base_op import OPERATORS, Filter
+from ..common.columnar import fill_stats_field, stats_in_range
 
 
 @OPERATORS.register_module('character_repetition_filter')
@@ -15,7 +17,10 @@ class CharacterRepetitionFilter(Filter):
     """Filter to keep samples with char-level n-gram repetition ratio within a
     specific range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_ratio', 'max_ratio'}
     _batched_op = True
+    _columnar_op = True
 
     def __init__(self,
                  rep_len: PositiveInt = 10,
@@ -42,18 +47,10 @@ class CharacterRepetitionFilter(Filter):
         self.max_ratio = max_ratio
 
     def compute_stats_batched(self, samples):
-        samples_list = samples[self.text_key]
-        samples_stats = samples[Fields.stats]
 
-        for idx, stat in enumerate(samples_stats):
-            # check if it's computed already
-            if StatsKeys.char_rep_ratio in stat:
-                continue
-
-            cur_text = samples_list[idx]
+        def char_rep_ratio(text):
             char_ngrams = [
-                cur_text[i:i + self.n]
-                for i in range(len(cur_text) - self.n + 1)
+                text[i:i + self.n] for i in range(len(text) - self.n + 1)
             ]
             freq_char_ngrams = {}
             for char_ngram in char_ngrams:
@@ -61,8 +58,7 @@ class CharacterRepetitionFilter(Filter):
                     freq_char_ngrams.get(char_ngram, 0) + 1)
 
             if len(freq_char_ngrams) == 0:
-                samples_stats[idx][StatsKeys.char_rep_ratio] = 0.0
-                continue
+                return 0.0
 
             freq_char_ngrams = sorted(list(freq_char_ngrams.values()),
                                       reverse=True)
@@ -72,21 +68,13 @@ class CharacterRepetitionFilter(Filter):
                 int(np.sqrt(len(freq_char_ngrams))),
                 len(freq_char_ngrams) - num_no_rep_char_ngrams,
             )
-            samples_stats[idx][StatsKeys.char_rep_ratio] = (
-                sum(freq_char_ngrams[:num_rep_char_ngrams]) /
-                sum(freq_char_ngrams)) if sum(freq_char_ngrams) != 0 else 0.0
+            total = sum(freq_char_ngrams)
+            return (sum(freq_char_ngrams[:num_rep_char_ngrams]) /
+                    total) if total != 0 else 0.0
 
-        return samples
+        return fill_stats_field(samples, StatsKeys.char_rep_ratio,
+                                self.text_key, char_rep_ratio, pa.float64())
 
     def process_batched(self, samples):
-        if isinstance(samples[Fields.stats], list):
-            return map(
-                lambda stat: self.min_ratio <= stat[StatsKeys.char_rep_ratio]
-                <= self.max_ratio, samples[Fields.stats])
-        else:
-            # single sample for ray filter
-            if self.min_ratio <= samples[Fields.stats][
-                    StatsKeys.char_rep_ratio] <= self.max_ratio:
-                return True
-            else:
-                return False
+        return stats_in_range(samples, StatsKeys.char_rep_ratio,
+                              self.min_ratio, self.max_ratio)
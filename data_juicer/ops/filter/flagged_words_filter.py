@@ -7,12 +7,12 @@ from typing import List
 from pydantic import PositiveInt
 
 from data_juicer.utils.constant import Fields, InterVars, StatsKeys
-from data_juicer.utils.model_utils import get_model, prepare_model
+from data_juicer.utils.model_utils import prepare_model
 
-from ...utils.asset_utils import ASSET_DIR, load_words_asset
+from ...utils.asset_utils import ASSET_DIR
 from ..base_op import OPERATORS, Filter
-from ..common import (SPECIAL_CHARACTERS, get_words_from_document,
-                      words_refinement)
+from ..common import (SPECIAL_CHARACTERS, get_cached_words,
+                      get_words_matcher)
 from ..op_fusion import INTER_WORDS
 
 OP_NAME = 'flagged_words_filter'
@@ -24,6 +24,9 @@ class FlaggedWordFilter(Filter):
     """Filter to keep samples with flagged-word ratio less than a specific max
     value."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'max_ratio'}
+
     def __init__(self,
                  lang: str = 'en',
                  tokenization: bool = False,
@@ -61,17 +64,20 @@ class FlaggedWordFilter(Filter):
         self.words_aug_join_char = words_aug_join_char
         self.model_key = None
 
-        self.FLAGGED_WORDS = load_words_asset(words_dir=flagged_words_dir,
-                                              words_type='flagged_words')
-
-        if 'all' not in self.FLAGGED_WORDS:
-            self.FLAGGED_WORDS['all'] = [
-                val for vals in self.FLAGGED_WORDS.values() for val in vals
-            ]
+        self.flagged_words_dir = flagged_words_dir
+        # build the matcher in the main process, so that the forked workers
+        # can share it
+        get_words_matcher(flagged_words_dir, 'flagged_words', lang)
         if tokenization:
             self.model_key = prepare_model(model_type='sentencepiece',
                                            lang=lang)
 
+    def fingerprint_state(self):
+        # the words in the assets, which might be changed in place
+        matcher = get_words_matcher(self.flagged_words_dir, 'flagged_words',
+                                    self.lang)
+        return matcher.digest
+
     def compute_stats_single(self, sample, context=False):
         # check if it's computed already
         if StatsKeys.flagged_words_ratio in sample[Fields.stats]:
@@ -82,35 +88,34 @@ class FlaggedWordFilter(Filter):
         if context and words_key in sample[Fields.context]:
             words = sample[Fields.context][words_key]
         else:
-            tokenizer = get_model(self.model_key)
-            words = get_words_from_document(
-                sample[self.text_key],
-                token_func=tokenizer.encode_as_pieces if tokenizer else None)
+            words = get_cached_words(sample[self.text_key], self.model_key)
             if context:
                 sample[Fields.context][words_key] = words
 
-        # try to get refined words from context
+        # try to get refined words from context. The augmented words are
+        # matched by the words matcher, so they are not needed here
         refined_words_key = f'{InterVars.refined_words}-True-SPECIAL_CHARS-' \
-                            f'{self.use_words_aug}-' \
-                            f'{self.words_aug_group_sizes}-' \
-                            f'{self.words_aug_join_char}'
+                            f'False-[2]-'
         if context and refined_words_key in sample[Fields.context]:
             words = sample[Fields.context][refined_words_key]
         else:
-            words = words_refinement(
-                words,
-                lower_case=True,
-                strip_chars=SPECIAL_CHARACTERS,
-                use_words_aug=self.use_words_aug,
-                words_aug_group_sizes=self.words_aug_group_sizes,
-                words_aug_join_char=self.words_aug_join_char)
+            words = get_cached_words(sample[self.text_key],
+                                     self.model_key,
+                                     refine=True,
+                                     lower_case=True,
+                                     strip_chars=SPECIAL_CHARACTERS)
             if context:
                 sample[Fields.context][refined_words_key] = words
 
-        flagged_words_ratio = (len(
-            [word
-             for word in words if word in self.FLAGGED_WORDS[self.lang]]) /
-                               len(words)) if len(words) != 0 else 0.0
+        matcher = get_words_matcher(self.flagged_words_dir, 'flagged_words',
+                                    self.lang)
+        num_flagged_words, num_words = matcher.count(
+            words,
+            use_words_aug=self.use_words_aug,
+            words_aug_group_sizes=self.words_aug_group_sizes,
+            words_aug_join_char=self.words_aug_join_char)
+        flagged_words_ratio = num_flagged_words / num_words \
+            if num_words != 0 else 0.0
 
         if flagged_words_ratio > 1.0:
             flagged_words_ratio = 1.0
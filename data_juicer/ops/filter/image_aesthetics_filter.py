@@ -20,6 +20,8 @@ class ImageAestheticsFilter(Filter):
     """Filter to keep samples with aesthetics scores within a specific range.
     """
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'min_score', 'max_score'}
     _accelerator = 'cuda'
 
     def __init__(self,
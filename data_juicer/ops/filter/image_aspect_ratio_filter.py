@@ -14,6 +14,9 @@ class ImageAspectRatioFilter(Filter):
     AspectRatio = W / H.
     """
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'min_ratio', 'max_ratio'}
+
     def __init__(self,
                  min_ratio: float = 0.333,
                  max_ratio: float = 3.0,
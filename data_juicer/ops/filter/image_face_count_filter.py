@@ -24,6 +24,8 @@ class ImageFaceCountFilter(Filter):
     """Filter to keep samples with the number of faces within a specific range.
     """
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'min_face_count', 'max_face_count'}
     _default_kwargs = {
         'scaleFactor': 1.1,
         'minNeighbors': 3,
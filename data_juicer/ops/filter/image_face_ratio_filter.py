@@ -24,6 +24,8 @@ class ImageFaceRatioFilter(Filter):
     """Filter to keep samples with face area ratios within a specific range.
     """
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'min_ratio', 'max_ratio'}
     _default_kwargs = {
         'scaleFactor': 1.1,
         'minNeighbors': 3,
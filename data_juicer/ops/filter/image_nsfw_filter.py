@@ -18,6 +18,8 @@ OP_NAME = 'image_nsfw_filter'
 class ImageNSFWFilter(Filter):
     """Filter to keep samples whose images have low nsfw scores."""
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'score_threshold'}
     _accelerator = 'cuda'
 
     def __init__(self,
@@ -19,6 +19,8 @@ class ImagePairSimilarityFilter(Filter):
     """Filter to keep image pairs with similarities between images
     within a specific range."""
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'min_score', 'max_score'}
     _accelerator = 'cuda'
 
     def __init__(self,
@@ -15,6 +15,9 @@ class ImageShapeFilter(Filter):
     """Filter to keep samples with image shape (w, h) within specific ranges.
     """
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'min_width', 'max_width', 'min_height', 'max_height'}
+
     def __init__(self,
                  min_width: int = 1,
                  max_width: int = sys.maxsize,
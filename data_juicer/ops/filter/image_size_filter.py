@@ -12,6 +12,9 @@ class ImageSizeFilter(Filter):
     specific range.
     """
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'min_size', 'max_size'}
+
     def __init__(self,
                  min_size: str = '0',
                  max_size: str = '1TB',
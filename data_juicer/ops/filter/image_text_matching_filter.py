@@ -18,6 +18,8 @@ class ImageTextMatchingFilter(Filter):
     """Filter to keep samples those matching score between image and text
     within a specific range."""
 
+    _stats_input_keys = ('text_key', 'image_key')
+    _threshold_params = {'min_score', 'max_score'}
     _accelerator = 'cuda'
 
     def __init__(self,
@@ -21,6 +21,8 @@ class ImageWatermarkFilter(Filter):
         probability.
     """
 
+    _stats_input_keys = ('image_key', )
+    _threshold_params = {'prob_threshold'}
     _accelerator = 'cuda'
 
     def __init__(self,
@@ -18,6 +18,12 @@ class LanguageIDScoreFilter(Filter):
     """Filter to keep samples in a specific language with confidence score
     larger than a specific min value."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_score'}
+
+    # the stats are the same for any target language
+    _non_stats_params = {'lang'}
+
     def __init__(self,
                  lang: Union[str, List[str]] = '',
                  min_score: float = 0.8,
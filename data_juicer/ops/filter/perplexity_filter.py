@@ -2,15 +2,25 @@
 # https://huggingface.co/spaces/huggingface/text-data-filtering
 # --------------------------------------------------------
 
+from collections import OrderedDict
+from typing import Optional
+
+import xxhash
+
 from data_juicer.utils.constant import Fields, InterVars, StatsKeys
 from data_juicer.utils.model_utils import get_model, prepare_model
 
 from ..base_op import OPERATORS, Filter
-from ..common import get_words_from_document
+from ..common import get_cached_words, get_words_from_document
 from ..op_fusion import INTER_WORDS
 
 OP_NAME = 'perplexity_filter'
 
+# (kenlm model key, tokenizer key for raw lines) -> LRU cache of line hash ->
+# (log10 score, length) of the line, shared by the perplexity filters of the
+# same models in a process
+LINE_SCORE_CACHES = {}
+
 
 @OPERATORS.register_module(OP_NAME)
 @INTER_WORDS.register_module(OP_NAME)
@@ -18,11 +28,18 @@ class PerplexityFilter(Filter):
     """Filter to keep samples with perplexity score less than a specific max
     value."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'max_ppl'}
     _batched_op = True
 
+    # the cache of line scores doesn't change the stats
+    _non_stats_params = {'line_cache_size'}
+
     def __init__(self,
                  lang: str = 'en',
                  max_ppl: float = 1500,
+                 line_level: bool = False,
+                 line_cache_size: Optional[int] = None,
                  *args,
                  **kwargs):
         """
@@ -31,6 +48,15 @@ class PerplexityFilter(Filter):
         :param lang: Compute perplexity for samples in which language.
         :param max_ppl: The max filter perplexity in this op, samples
             will be filtered if their perplexity exceeds this parameter.
+        :param line_level: Whether to tokenize and score each line of the
+            text on its own. Otherwise, the line breaks are dropped by the
+            tokenizer, so the whole text is scored as one line.
+        :param line_cache_size: The max number of line scores cached across
+            batches, so that lines repeated in many samples, e.g.
+            boilerplate lines like cookie banners and navigation menus with
+            line_level enabled, are scored only once. Set it to 0 to disable
+            the cache. If it's None, 1000000 line scores are cached when
+            line_level is enabled, otherwise the cache is disabled.
         :param args: extra args
         :param kwargs: extra args
         """
@@ -40,34 +66,92 @@ class PerplexityFilter(Filter):
         self.sp_model_key = prepare_model(model_type='sentencepiece',
                                           lang=lang)
         self.kl_model_key = prepare_model(model_type='kenlm', lang=lang)
+        self.line_level = line_level
+        if line_cache_size is None:
+            line_cache_size = 1000000 if line_level else 0
+        self.line_cache_size = line_cache_size
+
+    def _score_lines(self, lines, tokenize=False):
+        """
+        Score the distinct lines with the kenlm model and the line cache.
+
+        :param lines: the distinct lines to score.
+        :param tokenize: whether the lines are raw lines that need to be
+            tokenized first.
+        :return: a dict from each line to its log10 score and length.
+        """
+        kenlm_model = get_model(self.kl_model_key)
+        tokenizer = get_model(self.sp_model_key) if tokenize else None
+
+        def score(line):
+            if tokenize:
+                words = get_words_from_document(
+                    line, token_func=tokenizer.encode_as_pieces)
+                line = ' '.join(words)
+            return kenlm_model.score(line), len(line.split()) + 1
+
+        if self.line_cache_size <= 0:
+            return {line: score(line) for line in lines}
+
+        cache = LINE_SCORE_CACHES.setdefault(
+            (str(self.kl_model_key),
+             str(self.sp_model_key) if tokenize else None), OrderedDict())
+        results = {}
+        for line in lines:
+            line_hash = xxhash.xxh3_128_digest(line.encode('utf-8'))
+            result = cache.get(line_hash)
+            if result is None:
+                result = score(line)
+                cache[line_hash] = result
+                if len(cache) > self.line_cache_size:
+                    cache.popitem(last=False)
+            else:
+                cache.move_to_end(line_hash)
+            results[line] = result
+        return results
 
     def compute_stats_batched(self, samples, context=False):
         samples_list = samples[self.text_key]
         samples_stats = samples[Fields.stats]
         words_key = f'{InterVars.words}-{self.sp_model_key}'
 
+        # lines of the samples whose perplexity is not computed yet
+        samples_lines = {}
         for idx, stat in enumerate(samples_stats):
             # check if it's computed already
             if StatsKeys.perplexity in stat:
                 continue
+            if self.line_level:
+                # raw lines, which are tokenized when they are scored
+                samples_lines[idx] = [
+                    line for line in samples_list[idx].splitlines()
+                    if line.strip()
+                ]
+                continue
             # tokenization
             if context and words_key in samples[Fields.context][idx]:
                 words = samples[Fields.context][idx][words_key]
             else:
-                tokenizer = get_model(self.sp_model_key)
-                words = get_words_from_document(
-                    samples_list[idx],
-                    token_func=tokenizer.encode_as_pieces
-                    if tokenizer else None)
+                words = get_cached_words(samples_list[idx],
+                                         self.sp_model_key)
                 if context:
                     samples[Fields.context][idx][words_key] = words
             text = ' '.join(words)
+            samples_lines[idx] = text.splitlines()
+
+        # score each distinct line in this batch only once
+        results = self._score_lines(
+            {line
+             for lines in samples_lines.values()
+             for line in lines},
+            tokenize=self.line_level)
+        for idx, lines in samples_lines.items():
             # compute perplexity
             logits, length = 0, 0
-            kenlm_model = get_model(self.kl_model_key)
-            for line in text.splitlines():
-                logits += kenlm_model.score(line)
-                length += (len(line.split()) + 1)
+            for line in lines:
+                line_logits, line_length = results[line]
+                logits += line_logits
+                length += line_length
             ppl = (10.0**(-logits / length)) if length != 0 else 0.0
             samples_stats[idx][StatsKeys.perplexity] = round(ppl, 1)
 
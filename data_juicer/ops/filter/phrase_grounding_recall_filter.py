@@ -66,6 +66,8 @@ class PhraseGroundingRecallFilter(Filter):
     """Filter to keep samples whose locating recalls of phrases extracted
     from text in the images are within a specified range."""
 
+    _stats_input_keys = ('text_key', 'image_key')
+    _threshold_params = {'min_recall', 'max_recall'}
     _accelerator = 'cuda'
 
     def __init__(self,
@@ -2,10 +2,13 @@
 # https://huggingface.co/spaces/huggingface/text-data-filtering
 # --------------------------------------------------------
 
-from data_juicer.utils.constant import Fields, StatsKeys
+import pyarrow as pa
+
+from data_juicer.utils.constant import StatsKeys
 
 from ..base_op import OPERATORS, Filter
 from ..common import SPECIAL_CHARACTERS
+from ..common.columnar import fill_stats_field, stats_in_range
 
 
 @OPERATORS.register_module('special_characters_filter')
@@ -13,7 +16,10 @@ class SpecialCharactersFilter(Filter):
     """Filter to keep samples with special-char ratio within a specific
     range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_ratio', 'max_ratio'}
     _batched_op = True
+    _columnar_op = True
 
     def __init__(self,
                  min_ratio: float = 0.0,
@@ -37,32 +43,15 @@ class SpecialCharactersFilter(Filter):
         self.max_ratio = max_ratio
 
     def compute_stats_batched(self, samples):
-        samples_list = samples[self.text_key]
-        samples_stats = samples[Fields.stats]
 
-        for idx, stat in enumerate(samples_stats):
-            # check if it's computed already
-            if StatsKeys.special_char_ratio in stat:
-                continue
-            cur_text = samples_list[idx]
-            # get ratio of special characters
-            samples_stats[idx][StatsKeys.special_char_ratio] = (
-                len([c for c in cur_text if c in SPECIAL_CHARACTERS]) /
-                len(cur_text)) if len(cur_text) != 0 else 0.0
+        def special_char_ratio(text):
+            return (len([c for c in text if c in SPECIAL_CHARACTERS]) /
+                    len(text)) if len(text) != 0 else 0.0
 
-        return samples
+        return fill_stats_field(samples, StatsKeys.special_char_ratio,
+                                self.text_key, special_char_ratio,
+                                pa.float64())
 
     def process_batched(self, samples):
-        if isinstance(samples[Fields.stats], list):
-            return map(
-                lambda stat: self.min_ratio <= stat[
-                    StatsKeys.special_char_ratio] <= self.max_ratio,
-                samples[Fields.stats])
-        else:
-            # single sample for ray filter
-            if self.min_ratio <= \
-                    samples[Fields.stats][StatsKeys.special_char_ratio] \
-                    <= self.max_ratio:
-                return True
-            else:
-                return False
+        return stats_in_range(samples, StatsKeys.special_char_ratio,
+                              self.min_ratio, self.max_ratio)
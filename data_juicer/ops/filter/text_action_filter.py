@@ -14,6 +14,9 @@ class TextActionFilter(Filter):
     Filter to keep texts those contain actions in the text.
     """
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_action_num'}
+
     def __init__(self,
                  lang: str = 'en',
                  min_action_num: int = 1,
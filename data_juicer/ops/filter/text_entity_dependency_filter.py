@@ -17,6 +17,9 @@ class TextEntityDependencyFilter(Filter):
     and filter them. The text containing no entities will be omitted.
     """
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_dependency_num'}
+
     def __init__(self,
                  lang: str = 'en',
                  min_dependency_num: int = 1,
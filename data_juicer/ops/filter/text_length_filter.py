@@ -1,8 +1,13 @@
 import sys
 
-from data_juicer.utils.constant import Fields, StatsKeys
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from data_juicer.utils.constant import StatsKeys
 
 from ..base_op import OPERATORS, Filter
+from ..common.columnar import (get_column, get_stats_field, get_stats_names,
+                               set_stats_field, stats_in_range)
 
 
 @OPERATORS.register_module('text_length_filter')
@@ -10,7 +15,10 @@ class TextLengthFilter(Filter):
     """Filter to keep samples with total text length within a specific
     range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_len', 'max_len'}
     _batched_op = True
+    _columnar_op = True
 
     def __init__(self,
                  min_len: int = 10,
@@ -34,26 +42,15 @@ class TextLengthFilter(Filter):
         self.max_len = max_len
 
     def compute_stats_batched(self, samples):
-        samples_list = samples[self.text_key]
-        samples_stats = samples[Fields.stats]
-        for i, stat in enumerate(samples_stats):
-            # check if it's computed already
-            if StatsKeys.text_len in stat:
-                continue
-            else:
-                samples_stats[i][StatsKeys.text_len] = len(samples_list[i])
-
-        return samples
+        text_len = pc.cast(
+            pc.utf8_length(get_column(samples, self.text_key)), pa.int64())
+        if StatsKeys.text_len in get_stats_names(samples):
+            # only compute for samples without it
+            text_len = pc.coalesce(
+                get_stats_field(samples, StatsKeys.text_len), text_len)
+        return set_stats_field(samples, StatsKeys.text_len,
+                               text_len.combine_chunks())
 
     def process_batched(self, samples):
-        if isinstance(samples[Fields.stats], list):
-            return map(
-                lambda stat: self.min_len <= stat[StatsKeys.text_len] <= self.
-                max_len, samples[Fields.stats])
-        else:
-            # single sample for ray filter
-            if self.min_len <= samples[Fields.stats][
-                    StatsKeys.text_len] <= self.max_len:
-                return True
-            else:
-                return False
+        return stats_in_range(samples, StatsKeys.text_len, self.min_len,
+                              self.max_len)
@@ -14,6 +14,9 @@ class TokenNumFilter(Filter):
     """Filter to keep samples with total token number within a specific
     range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_num', 'max_num'}
+
     def __init__(self,
                  hf_tokenizer: str = 'EleutherAI/pythia-6.9b-deduped',
                  min_num: int = 10,
@@ -25,6 +25,8 @@ class VideoAestheticsFilter(Filter):
     in the videos within a specific range.
     """
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'min_score', 'max_score'}
     _accelerator = 'cuda'
 
     def __init__(self,
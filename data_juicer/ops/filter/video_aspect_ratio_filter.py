@@ -17,6 +17,9 @@ class VideoAspectRatioFilter(Filter):
     AspectRatio = W / H.
     """
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'min_ratio', 'max_ratio'}
+
     def __init__(self,
                  min_ratio: str = '9/21',
                  max_ratio: str = '21/9',
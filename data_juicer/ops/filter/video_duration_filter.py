@@ -18,6 +18,9 @@ class VideoDurationFilter(Filter):
     """Keep data samples whose videos' durations are within a specified range.
     """
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'min_duration', 'max_duration'}
+
     def __init__(self,
                  min_duration: float = 0,
                  max_duration: float = sys.maxsize,
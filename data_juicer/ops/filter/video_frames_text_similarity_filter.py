@@ -23,6 +23,8 @@ class VideoFramesTextSimilarityFilter(Filter):
     """Filter to keep samples those similarities between sampled video frame
     images and text within a specific range."""
 
+    _stats_input_keys = ('text_key', 'video_key')
+    _threshold_params = {'min_score', 'max_score'}
     _accelerator = 'cuda'
 
     def __init__(self,
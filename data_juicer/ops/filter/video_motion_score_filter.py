@@ -31,6 +31,8 @@ class VideoMotionScoreFilter(Filter):
     Farneback's algorith from OpenCV is used to compute dense optical flow.
     """
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'min_score', 'max_score'}
     _default_kwargs = {
         'pyr_scale': 0.5,
         'levels': 3,
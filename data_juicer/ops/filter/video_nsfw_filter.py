@@ -22,6 +22,8 @@ OP_NAME = 'video_nsfw_filter'
 class VideoNSFWFilter(Filter):
     """Filter to keep samples whose videos have low nsfw scores."""
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'score_threshold'}
     _accelerator = 'cuda'
 
     def __init__(self,
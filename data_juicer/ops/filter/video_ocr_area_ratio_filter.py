@@ -39,6 +39,8 @@ class VideoOcrAreaRatioFilter(Filter):
     in the video are within a specified range.
     """
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'min_area_ratio', 'max_area_ratio'}
     _accelerator = 'cuda'
 
     def __init__(self,
@@ -18,6 +18,9 @@ class VideoResolutionFilter(Filter):
     """Keep data samples whose videos' resolutions are within a specified range.
     """
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'min_width', 'max_width', 'min_height', 'max_height'}
+
     def __init__(self,
                  min_width: int = 1,
                  max_width: int = sys.maxsize,
@@ -25,6 +25,8 @@ class VideoWatermarkFilter(Filter):
         probability.
     """
 
+    _stats_input_keys = ('video_key', )
+    _threshold_params = {'prob_threshold'}
     _accelerator = 'cuda'
 
     def __init__(self,
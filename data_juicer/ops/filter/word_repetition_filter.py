@@ -5,11 +5,10 @@
 from pydantic import PositiveInt
 
 from data_juicer.utils.constant import Fields, InterVars, StatsKeys
-from data_juicer.utils.model_utils import get_model, prepare_model
+from data_juicer.utils.model_utils import prepare_model
 
 from ..base_op import OPERATORS, Filter
-from ..common import (SPECIAL_CHARACTERS, get_words_from_document,
-                      words_refinement)
+from ..common import SPECIAL_CHARACTERS, get_cached_words
 from ..op_fusion import INTER_WORDS
 
 OP_NAME = 'word_repetition_filter'
@@ -21,6 +20,8 @@ class WordRepetitionFilter(Filter):
     """Filter to keep samples with word-level n-gram repetition ratio within a
     specific range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_ratio', 'max_ratio'}
     _batched_op = True
 
     def __init__(self,
@@ -70,11 +71,7 @@ class WordRepetitionFilter(Filter):
             if context and words_key in samples[Fields.context][idx]:
                 words = samples[Fields.context][idx][words_key]
             else:
-                tokenizer = get_model(self.model_key)
-                words = get_words_from_document(
-                    samples_list[idx],
-                    token_func=tokenizer.encode_as_pieces
-                    if tokenizer else None)
+                words = get_cached_words(samples_list[idx], self.model_key)
                 if context:
                     samples[Fields.context][idx][words_key] = words
 
@@ -84,7 +81,9 @@ class WordRepetitionFilter(Filter):
             if context and refined_words_key in samples[Fields.context][idx]:
                 words = samples[Fields.context][idx][refined_words_key]
             else:
-                words = words_refinement(words,
+                words = get_cached_words(samples_list[idx],
+                                         self.model_key,
+                                         refine=True,
                                          lower_case=True,
                                          strip_chars=SPECIAL_CHARACTERS)
                 if context:
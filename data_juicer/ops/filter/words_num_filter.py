@@ -1,11 +1,10 @@
 import sys
 
 from data_juicer.utils.constant import Fields, InterVars, StatsKeys
-from data_juicer.utils.model_utils import get_model, prepare_model
+from data_juicer.utils.model_utils import prepare_model
 
 from ..base_op import OPERATORS, Filter
-from ..common import (SPECIAL_CHARACTERS, get_words_from_document,
-                      words_refinement)
+from ..common import SPECIAL_CHARACTERS, get_cached_words
 from ..op_fusion import INTER_WORDS
 
 OP_NAME = 'words_num_filter'
@@ -17,6 +16,8 @@ class WordsNumFilter(Filter):
     """Filter to keep samples with total words number within a specific
     range."""
 
+    _stats_input_keys = ('text_key', )
+    _threshold_params = {'min_num', 'max_num'}
     _batched_op = True
 
     def __init__(self,
@@ -62,14 +63,13 @@ class WordsNumFilter(Filter):
             if context and words_key in samples[Fields.context][idx]:
                 words = samples[Fields.context][idx][words_key]
             else:
-                tokenizer = get_model(self.model_key)
-                words = get_words_from_document(
-                    samples_list[idx],
-                    token_func=tokenizer.encode_as_pieces
-                    if tokenizer else None)
+                words = get_cached_words(samples_list[idx], self.model_key)
                 if context:
                     samples[Fields.context][idx][words_key] = words
-            words = words_refinement(words, strip_chars=SPECIAL_CHARACTERS)
+            words = get_cached_words(samples_list[idx],
+                                     self.model_key,
+                                     refine=True,
+                                     strip_chars=SPECIAL_CHARACTERS)
             samples_stats[idx][StatsKeys.num_words] = len(words)
 
         return samples
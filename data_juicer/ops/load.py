@@ -1,8 +1,8 @@
 from .base_op import OPERATORS
-from .op_fusion import fuse_operators
+from .op_fusion import fuse_general_ops, fuse_operators
 
 
-def load_ops(process_list, op_fusion=False):
+def load_ops(process_list, op_fusion=False, general_fusion=False):
     """
     Load op list according to the process list from config file.
 
@@ -10,18 +10,39 @@ def load_ops(process_list, op_fusion=False):
         arguments.
     :param op_fusion: whether to fuse ops that share the same intermediate
         variables.
+    :param general_fusion: whether to fuse each run of consecutive Mappers
+        and Filters into one op that processes the dataset in a single pass.
     :return: The op instance list.
     """
     ops = []
-    new_process_list = []
     for process in process_list:
         op_name, args = list(process.items())[0]
         ops.append(OPERATORS.modules[op_name](**args))
-        new_process_list.append(process)
+
+    return fuse_ops(process_list, ops, op_fusion, general_fusion)
+
+
+def fuse_ops(process_list, ops, op_fusion=False, general_fusion=False):
+    """
+    Fuse the loaded ops, so ops that are already instantiated, e.g. the ones
+    probed to reorder filters, are reused instead of being loaded again.
+
+    :param process_list: the process list that the ops are loaded from.
+    :param ops: the corresponding op instance list.
+    :param op_fusion: whether to fuse ops that share the same intermediate
+        variables.
+    :param general_fusion: whether to fuse each run of consecutive Mappers
+        and Filters into one op that processes the dataset in a single pass.
+    :return: The fused op instance list.
+    """
+    new_process_list = list(process_list)
+    ops = list(ops)
 
     # detect filter groups
     if op_fusion:
         new_process_list, ops = fuse_operators(new_process_list, ops)
+    if general_fusion:
+        new_process_list, ops = fuse_general_ops(new_process_list, ops)
 
     for op_cfg, op in zip(new_process_list, ops):
         op._op_cfg = op_cfg
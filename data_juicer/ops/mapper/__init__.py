@@ -32,6 +32,7 @@ from .remove_words_with_incorrect_substrings_mapper import \
     RemoveWordsWithIncorrectSubstringsMapper
 from .replace_content_mapper import ReplaceContentMapper
 from .sentence_split_mapper import SentenceSplitMapper
+from .text_cleaning_mapper import TextCleaningMapper
 from .video_captioning_from_audio_mapper import VideoCaptioningFromAudioMapper
 from .video_captioning_from_frames_mapper import \
     VideoCaptioningFromFramesMapper
@@ -98,4 +99,5 @@ __all__ = [
     'VideoSplitByDurationMapper',
     'VideoFaceBlurMapper',
     'ImageTaggingMapper',
+    'TextCleaningMapper',
 ]
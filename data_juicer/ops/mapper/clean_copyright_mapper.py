@@ -54,6 +54,9 @@ class CleanCopyrightMapper(Mapper):
             sample = '\n'.join(lines[skip:])
         return sample
 
+    def get_cleaning_rules(self):
+        return [self._process_single_sample]
+
     def process_batched(self, samples):
         samples[self.text_key] = [
             self._process_single_sample(text)
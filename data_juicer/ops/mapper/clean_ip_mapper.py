@@ -3,6 +3,7 @@ from typing import Optional
 import regex as re
 
 from ..base_op import OPERATORS, Mapper
+from ..common import strip_raw_prefix
 
 
 @OPERATORS.register_module('clean_ip_mapper')
@@ -33,19 +34,16 @@ class CleanIpMapper(Mapper):
             self.pattern += r'(?:25[0-5])|(?:[1-9][0-9])|(?:[0-9]))|'
             self.pattern += r'([\da-fA-F]{1,4}:){7}[\da-fA-F]{1,4}'  # ipv6
         else:
-            self.pattern = pattern
-            if ((len(pattern) > 2) and
-                (pattern.startswith("r'") and pattern.endswith("'")
-                 or pattern.startswith('r"') and pattern.endswith('"'))):
-                self.pattern = pattern[2:-1]
+            self.pattern = strip_raw_prefix(pattern)
         self.repl = repl
+        self.compiled_pattern = re.compile(self.pattern, flags=re.DOTALL)
+
+    def get_cleaning_rules(self):
+        return [(self.pattern, self.repl, re.DOTALL)]
 
     def process_batched(self, samples):
-        for idx, text in enumerate(samples[self.text_key]):
-            if not re.search(self.pattern, text, flags=re.DOTALL):
-                continue
-            samples[self.text_key][idx] = re.sub(pattern=self.pattern,
-                                                 repl=self.repl,
-                                                 string=text,
-                                                 flags=re.DOTALL)
+        samples[self.text_key] = [
+            self.compiled_pattern.sub(self.repl, text)
+            for text in samples[self.text_key]
+        ]
         return samples
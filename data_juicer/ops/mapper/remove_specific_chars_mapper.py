@@ -29,15 +29,20 @@ class RemoveSpecificCharsMapper(Mapper):
             self.pattern = '[' + '|'.join(chars_to_remove) + ']'
         else:
             self.pattern = None
+        self.compiled_pattern = re.compile(
+            self.pattern, flags=re.DOTALL) if self.pattern else None
+
+    def get_cleaning_rules(self):
+        if self.pattern is None:
+            return []
+        return [(self.pattern, '', re.DOTALL)]
 
     def process_batched(self, samples):
         if self.pattern is None:
             return samples
 
         samples[self.text_key] = [
-            re.sub(pattern=self.pattern,
-                   repl=r'',
-                   string=text,
-                   flags=re.DOTALL) for text in samples[self.text_key]
+            self.compiled_pattern.sub('', text)
+            for text in samples[self.text_key]
         ]
         return samples
@@ -3,6 +3,7 @@ from typing import List, Union
 import regex as re
 
 from ..base_op import OPERATORS, Mapper
+from ..common import strip_raw_prefix
 
 
 @OPERATORS.register_module('replace_content_mapper')
@@ -38,11 +39,21 @@ class ReplaceContentMapper(Mapper):
 
     def _prepare_pattern(self, pattern: str) -> re.Pattern:
         """Prepare the regular expression pattern."""
-        if ((pattern is not None and len(pattern) > 2)
-                and (pattern.startswith("r'") and pattern.endswith("'")
-                     or pattern.startswith('r"') and pattern.endswith('"'))):
-            pattern = pattern[2:-1]
-        return re.compile(pattern, flags=re.DOTALL)
+        return re.compile(strip_raw_prefix(pattern), flags=re.DOTALL)
+
+    def _get_replacement(self, i):
+        if isinstance(self.repl, list) and i < len(self.repl):
+            return self.repl[i]
+        elif isinstance(self.repl, list) and i >= len(self.repl):
+            raise ValueError(f"pattern length: {len(self.pattern)} '"
+                             f'must be equal to '
+                             f'repl length: {len(self.repl)}')
+        else:
+            return self.repl
+
+    def get_cleaning_rules(self):
+        return [(pattern.pattern, self._get_replacement(i), re.DOTALL)
+                for i, pattern in enumerate(self.compiled_patterns)]
 
     def process_batched(self, samples):
         if self.pattern is None:
@@ -50,16 +61,7 @@ class ReplaceContentMapper(Mapper):
 
         for idx, text in enumerate(samples[self.text_key]):
             for i, pattern in enumerate(self.compiled_patterns):
-                if isinstance(self.repl, list) and i < len(self.repl):
-                    replacement = self.repl[i]
-                elif isinstance(self.repl, list) and i >= len(self.repl):
-                    raise ValueError(f"pattern length: {len(self.pattern)} '"
-                                     f'must be equal to '
-                                     f'repl length: {len(self.repl)}')
-                else:
-                    replacement = self.repl
-
-                text = pattern.sub(replacement, text)
+                text = pattern.sub(self._get_replacement(i), text)
 
             samples[self.text_key][idx] = text
 
@@ -0,0 +1,73 @@
+from typing import Dict, List, Optional, Union
+
+import regex as re
+
+from ..base_op import OPERATORS, Mapper
+from ..common import TextCleaningEngine, strip_raw_prefix
+
+OP_NAME = 'text_cleaning_mapper'
+
+
+@OPERATORS.register_module(OP_NAME)
+class TextCleaningMapper(Mapper):
+    """Mapper to clean text samples with a set of cleaning rules in one pass.
+    The rules can be defined directly with regular expressions, or absorbed
+    from the cleaning mappers, e.g. clean_email_mapper and
+    replace_content_mapper. Consecutive regex rules are applied in one
+    left-to-right pass over each text instead of one pass for each rule. At
+    each position, the first rule that matches wins, and the replaced content
+    is not scanned again by the other rules."""
+
+    _batched_op = True
+
+    def __init__(self,
+                 rules: Optional[List[Union[str, Dict]]] = None,
+                 *args,
+                 **kwargs):
+        """
+        Initialization method.
+
+        :param rules: a list of cleaning rules applied in order. Each rule is
+            a dict with a regular expression 'pattern' and an optional 'repl'
+            string, or the name or the config of a cleaning mapper to absorb,
+            e.g. 'clean_email_mapper' or {'clean_email_mapper': {'repl':
+            '<EMAIL>'}}. Cleaning mappers are the ones that define their
+            rules with a `get_cleaning_rules` method. If it's None, emails,
+            ip addresses and links are cleaned.
+        :param args: extra args
+        :param kwargs: extra args
+        """
+        super().__init__(*args, **kwargs)
+        if rules is None:
+            rules = [
+                'clean_email_mapper', 'clean_ip_mapper', 'clean_links_mapper'
+            ]
+        self.rules = rules
+        cleaning_rules = []
+        for rule in rules:
+            cleaning_rules.extend(self._get_cleaning_rules(rule))
+        self.engine = TextCleaningEngine(cleaning_rules)
+
+    def _get_cleaning_rules(self, rule):
+        if isinstance(rule, dict) and 'pattern' in rule:
+            return [(strip_raw_prefix(rule['pattern']), rule.get('repl', ''),
+                     re.DOTALL)]
+        if isinstance(rule, str):
+            op_name, op_args = rule, {}
+        elif isinstance(rule, dict) and len(rule) == 1:
+            op_name, op_args = list(rule.items())[0]
+            op_args = op_args or {}
+        else:
+            raise ValueError(f'Invalid cleaning rule [{rule}]. It should be '
+                             f'a dict with a pattern, or an op config.')
+        if op_name not in OPERATORS.modules or not hasattr(
+                OPERATORS.modules[op_name], 'get_cleaning_rules'):
+            raise ValueError(f'Op [{op_name}] does not define cleaning rules '
+                             f'and can not be absorbed by [{OP_NAME}].')
+        return OPERATORS.modules[op_name](**op_args).get_cleaning_rules()
+
+    def process_batched(self, samples):
+        samples[self.text_key] = [
+            self.engine(text) for text in samples[self.text_key]
+        ]
+        return samples
@@ -5,7 +5,7 @@ from loguru import logger
 from data_juicer.utils.constant import Fields, InterVars
 from data_juicer.utils.registry import Registry
 
-from .base_op import Filter
+from .base_op import UNFORKABLE, Filter, Mapper
 
 # Type of intermediate vars
 # text
@@ -126,9 +126,74 @@ def fuse_filter_group(original_filter_group):
     return fused_group_def, fused_group
 
 
+def fuse_general_ops(process_list, ops):
+    """
+    Fuse each run of consecutive Mappers and Filters in the input ops list
+    into a single GeneralFusedOP, so that the whole run needs only one pass
+    over the dataset.
+
+    :param process_list: the list of original process definition, including op
+        names and args.
+    :param ops: the corresponding list of op objects.
+    :return: a list of fused op objects.
+    """
+    fused_op_def = []
+    fused_ops = []
+    op_group = []
+
+    def _flush_group():
+        if len(op_group) > 1:
+            defs, group_ops = zip(*op_group)
+            general_fused_op_def = {
+                'OpFusion:(%s)' % ','.join([
+                    list(process.keys())[0] for process in defs
+                ]):
+                list(defs)
+            }
+            logger.info(f'Ops are fused into one op '
+                        f'{list(general_fused_op_def.keys())[0]}.')
+            fused_op_def.append(general_fused_op_def)
+            fused_ops.append(GeneralFusedOP(list(group_ops)))
+        elif len(op_group) == 1:
+            fused_op_def.append(op_group[0][0])
+            fused_ops.append(op_group[0][1])
+        op_group.clear()
+
+    for process, op in zip(process_list, ops):
+        if is_general_fusible(op):
+            op_group.append((process, op))
+        else:
+            _flush_group()
+            fused_op_def.append(process)
+            fused_ops.append(op)
+    _flush_group()
+    return fused_op_def, fused_ops
+
+
+def is_general_fusible(op):
+    """
+    Check whether an op can be fused into a GeneralFusedOP. Only Mappers and
+    Filters that run on CPU with the default fork start method are fusible.
+    Stats exporting of Filters is done on the whole dataset after computing
+    the stats, so Filters that export their stats are not fusible either.
+
+    :param op: the op object to check.
+    :return: True if it's fusible, otherwise False.
+    """
+    if not isinstance(op, (Mapper, Filter)):
+        return False
+    if op.use_cuda() or op._name in UNFORKABLE.modules:
+        return False
+    if getattr(op, 'stats_export_path', None) is not None:
+        return False
+    return True
+
+
 class FusedFilter(Filter):
     """A fused operator for filters."""
 
+    _name = 'FusedFilter'
+
     def __init__(self, fused_filters: List):
         """
         Initialization method.
@@ -171,3 +236,61 @@ class FusedFilter(Filter):
             if not op.process(sample):
                 return False
         return True
+
+
+class GeneralFusedOP(Mapper):
+    """
+    A fused operator for a run of consecutive Mappers and Filters.
+
+    Each batch is pushed through all fused ops in one map pass. Filters drop
+    the rejected samples from the batch directly, so the following ops only
+    process the samples that are still kept.
+    """
+
+    _name = 'GeneralFusedOP'
+    _batched_op = True
+
+    def __init__(self, fused_ops: List, *args, **kwargs):
+        """
+        Initialization method.
+
+        :param fused_ops: a list of Mappers and Filters to be fused.
+        """
+        # all fused ops live in the same worker, so the memory they require
+        # adds up
+        num_procs = [op.num_proc for op in fused_ops if op.num_proc]
+        kwargs.setdefault('num_proc', min(num_procs) if num_procs else None)
+        kwargs.setdefault('cpu_required',
+                          max(op.cpu_required for op in fused_ops))
+        kwargs.setdefault('mem_required',
+                          sum(op.mem_required for op in fused_ops))
+        kwargs.setdefault('batch_size',
+                          min(op.batch_size for op in fused_ops))
+        super().__init__(*args, **kwargs)
+        self.fused_ops = fused_ops
+        self.text_key = fused_ops[0].text_key
+
+    def process_batched(self, samples):
+        for op in self.fused_ops:
+            samples = op.run_batch(samples)
+            if len(next(iter(samples.values()), [])) == 0:
+                # all samples in this batch are filtered out, and empty
+                # batches are skipped when writing the results
+                break
+        return samples
+
+    def run(self, dataset, *, exporter=None, tracer=None):
+        dataset = super(Mapper, self).run(dataset)
+        new_dataset = dataset.map(
+            self.process,
+            num_proc=self.runtime_np(),
+            batch_size=self.batch_size,
+            desc=self._name + '_process',
+        )
+        if tracer:
+            if len(dataset) == len(new_dataset):
+                tracer.trace_mapper(self._name, dataset, new_dataset,
+                                    self.text_key)
+            else:
+                tracer.trace_filter(self._name, dataset, new_dataset)
+        return new_dataset
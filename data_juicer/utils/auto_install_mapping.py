@@ -46,6 +46,7 @@ PKG_TO_OPS = {
         'video_captioning_from_video_mapper'
     ],
     'selectolax': ['clean_html_mapper'],
+    'xxhash': ['document_minhash_deduplicator'],
     'nlpaug': ['nlpaug_en_mapper'],
     'nlpcda': ['nlpcda'],
     'nltk': ['phrase_grounding_recall_filter', 'sentence_split_mapper'],
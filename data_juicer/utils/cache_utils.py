@@ -21,3 +21,4 @@ DATA_JUICER_MODELS_CACHE = os.getenv('DATA_JUICER_MODELS_CACHE',
                                      DEFAULT_DATA_JUICER_MODELS_CACHE)
 
 CACHE_COMPRESS = None
+CACHE_COMPRESS_BATCHES = False
@@ -1,8 +1,11 @@
 import json
 import os
+import shutil
 
 from loguru import logger
 
+CKPT_OP_RECORD = 'ckpt_op.json'
+
 
 class CheckpointManager:
     """
@@ -12,24 +15,43 @@ class CheckpointManager:
 
     If any args of operator in process list is changed, all ops will be
     rerun from the beginning.
+
+    When shard_size is set, the checkpoint is updated after each op, and
+    Mappers and Filters process the dataset shard by shard. Each finished
+    shard is saved to the checkpoint directory right away and its range is
+    recorded, so a rerun after a crash resumes the interrupted op from the
+    unfinished shards.
     """
 
-    def __init__(self, ckpt_dir, original_process_list, num_proc=1):
+    def __init__(self,
+                 ckpt_dir,
+                 original_process_list,
+                 num_proc=1,
+                 shard_size=None):
         """
         Initialization method.
 
         :param ckpt_dir: path to save and load checkpoint
         :param original_process_list: process list in config
         :param num_proc: number of process workers when saving dataset
+        :param shard_size: number of samples in each shard for the
+            intra-op checkpoints. None means only checkpointing the
+            dataset when the processing ends or fails.
         """
         self.ckpt_dir = ckpt_dir
         self.ckpt_ds_dir = os.path.join(self.ckpt_dir, 'latest')
-        self.ckpt_op_record = os.path.join(self.ckpt_dir, 'ckpt_op.json')
+        self.ckpt_op_record = os.path.join(self.ckpt_dir, CKPT_OP_RECORD)
+        self.ckpt_partial_dir = os.path.join(self.ckpt_dir, 'partial')
+        self.ckpt_progress = os.path.join(self.ckpt_partial_dir,
+                                          'progress.json')
         self.process_list = original_process_list
         self.num_proc = num_proc
+        self.shard_size = shard_size
         self.op_record = []
 
         self.ckpt_available = self.check_ckpt()
+        # number of ops whose results are stored in the checkpoint
+        self.num_saved_ops = len(self.op_record)
 
     def get_left_process_list(self):
         """
@@ -47,6 +69,7 @@ class CheckpointManager:
 
         :return: True when checkpoint is available, else False
         """
+        self.recover_ckpt()
         if os.path.exists(self.ckpt_ds_dir) \
                 and os.path.isdir(self.ckpt_ds_dir) \
                 and os.path.exists(self.ckpt_op_record) \
@@ -121,10 +144,47 @@ class CheckpointManager:
 
         :param ds: input dataset to save
         """
-        ds.save_to_disk(self.ckpt_ds_dir, num_proc=self.num_proc)
+        # save to a temp dir first with a copy of the op record, and then
+        # swap it in: move the old checkpoint aside, move the new one in,
+        # update the op record, and remove the old one at last. A crash at
+        # any step leaves a checkpoint that matches the op record, which is
+        # recovered by `recover_ckpt`
+        tmp_ds_dir = self.ckpt_ds_dir + '.tmp'
+        if os.path.exists(tmp_ds_dir):
+            shutil.rmtree(tmp_ds_dir)
+        ds.save_to_disk(tmp_ds_dir, num_proc=self.num_proc)
+        dump_json(self.op_record, os.path.join(tmp_ds_dir, CKPT_OP_RECORD))
+
+        old_ds_dir = self.ckpt_ds_dir + '.old'
+        if os.path.exists(old_ds_dir):
+            shutil.rmtree(old_ds_dir)
+        if os.path.exists(self.ckpt_ds_dir):
+            os.replace(self.ckpt_ds_dir, old_ds_dir)
+        os.replace(tmp_ds_dir, self.ckpt_ds_dir)
+        dump_json(self.op_record, self.ckpt_op_record)
+        if os.path.exists(old_ds_dir):
+            shutil.rmtree(old_ds_dir)
+        self.num_saved_ops = len(self.op_record)
 
-        with open(self.ckpt_op_record, 'w') as fout:
-            json.dump(self.op_record, fout)
+    def recover_ckpt(self):
+        """
+        Recover the checkpoint if a crash happened when it was swapped in
+        by `save_ckpt`.
+        """
+        old_ds_dir = self.ckpt_ds_dir + '.old'
+        if not os.path.exists(old_ds_dir):
+            return
+        if not os.path.exists(self.ckpt_ds_dir):
+            # crashed before the new checkpoint was moved in
+            logger.info('Recovering the last checkpoint...')
+            os.replace(old_ds_dir, self.ckpt_ds_dir)
+            return
+        # crashed before the op record was updated or the old checkpoint
+        # was removed, so update the op record from the new checkpoint
+        logger.info('Recovering the op record of the last checkpoint...')
+        with open(os.path.join(self.ckpt_ds_dir, CKPT_OP_RECORD)) as fin:
+            dump_json(json.load(fin), self.ckpt_op_record)
+        shutil.rmtree(old_ds_dir)
 
     def load_ckpt(self):
         """
@@ -135,3 +195,118 @@ class CheckpointManager:
         from data_juicer.core.data import NestedDataset
         ds = NestedDataset.load_from_disk(self.ckpt_ds_dir)
         return ds
+
+    def can_run_in_shards(self, op):
+        """
+        Check whether an op can be run shard by shard. Only Mappers and
+        Filters are supported, which process each sample independently.
+        Stats exporting of the op is done on the whole dataset, so it's not
+        supported either.
+
+        :param op: the op to check
+        :return: True if the op can be run in shards, otherwise False
+        """
+        from data_juicer.ops import Filter, Mapper
+        return self.shard_size is not None \
+            and isinstance(op, (Mapper, Filter)) \
+            and getattr(op, 'stats_export_path', None) is None
+
+    def run_op_in_shards(self, op, dataset, *, tracer=None, **kwargs):
+        """
+        Run an op on the dataset shard by shard. Each finished shard is
+        saved to the checkpoint directory and recorded in the progress file,
+        and the shards that are finished in a previous run are reused.
+
+        :param op: the op to run
+        :param dataset: the input dataset
+        :param tracer: tracer to trace the changes of the whole dataset
+        :param kwargs: other args for the `run` method of the op
+        :return: the processed dataset
+        """
+        from data_juicer.core.data import NestedDataset, concatenate_shards
+        from data_juicer.ops import Mapper
+
+        progress = self.load_progress(op._op_cfg, len(dataset))
+        ranges = [(start, min(start + self.shard_size, len(dataset)))
+                  for start in range(0, len(dataset), self.shard_size)]
+        for start, end in ranges:
+            if [start, end] in progress['done']:
+                logger.info(f'Skip finished shard [{start}, {end}) of op '
+                            f'[{op._name}].')
+                continue
+            shard = op.run(dataset.select(range(start, end)), **kwargs)
+            shard_dir = self.shard_dir(start, end)
+            tmp_shard_dir = shard_dir + '.tmp'
+            shard.save_to_disk(tmp_shard_dir)
+            os.replace(tmp_shard_dir, shard_dir)
+            progress['done'].append([start, end])
+            dump_json(progress, self.ckpt_progress)
+            logger.info(f'Finished shard [{start}, {end}) of op '
+                        f'[{op._name}].')
+
+        shards = [
+            NestedDataset.load_from_disk(self.shard_dir(start, end))
+            for start, end in ranges
+        ]
+        if len(shards) == 0:
+            # nothing to split for empty datasets
+            new_dataset = op.run(dataset, **kwargs)
+        else:
+            new_dataset = concatenate_shards(shards)
+        # trace the changes of the whole dataset instead of each shard
+        if tracer:
+            if isinstance(op, Mapper):
+                tracer.trace_mapper(op._name, dataset, new_dataset,
+                                    op.text_key)
+            else:
+                tracer.trace_filter(op._name, dataset, new_dataset)
+        return new_dataset
+
+    def shard_dir(self, start, end):
+        return os.path.join(self.ckpt_partial_dir,
+                            f'shard-{start:012d}-{end:012d}')
+
+    def load_progress(self, op_cfg, num_samples):
+        """
+        Load the progress of the op from the checkpoint directory. The
+        progress is reused only if it's recorded for the same op at the same
+        position of the process list, on an input dataset of the same size,
+        with the same shard size. Otherwise, it's cleaned up and a new
+        progress is created.
+
+        :param op_cfg: the config of the op
+        :param num_samples: number of samples of the input dataset
+        :return: the progress dict, where "done" is the list of finished
+            ranges of samples
+        """
+        progress = {
+            'ops': self.op_record + [op_cfg],
+            'num_samples': num_samples,
+            'shard_size': self.shard_size,
+            'done': [],
+        }
+        if os.path.isfile(self.ckpt_progress):
+            with open(self.ckpt_progress, 'r') as fin:
+                last_progress = json.load(fin)
+            if all(last_progress.get(key) == value
+                   for key, value in progress.items() if key != 'done'):
+                logger.info(f'Found {len(last_progress["done"])} finished '
+                            f'shards of op [{list(op_cfg.keys())[0]}].')
+                return last_progress
+        self.cleanup_progress()
+        os.makedirs(self.ckpt_partial_dir, exist_ok=True)
+        dump_json(progress, self.ckpt_progress)
+        return progress
+
+    def cleanup_progress(self):
+        """Remove the finished shards and the progress of the last op."""
+        if os.path.exists(self.ckpt_partial_dir):
+            shutil.rmtree(self.ckpt_partial_dir)
+
+
+def dump_json(obj, path):
+    # replace the file atomically, so it's never partially written
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fout:
+        json.dump(obj, fout)
+    os.replace(tmp_path, path)
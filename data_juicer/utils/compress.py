@@ -6,6 +6,7 @@ from multiprocessing import Pool
 from pathlib import Path
 from typing import Dict, List, Optional, Type, Union
 
+import pyarrow as pa
 from datasets import Dataset
 from datasets.utils.extract import Extractor as HF_Extractor
 from datasets.utils.filelock import FileLock as HF_FileLock
@@ -179,6 +180,58 @@ class Compressor:
             compressor.compress(input_path, output_path)
 
 
+class ArrowBatchCompressor:
+    """
+    This class compresses the record batches of an Arrow cache file in place
+    with the buffer compression of Arrow IPC. Unlike the whole-file
+    compression, the compressed cache is still a valid Arrow file that can be
+    loaded by HF datasets directly, so it never needs to be decompressed to
+    disk. Only `zstd` and `lz4` are supported by Arrow IPC.
+    """
+    formats = ['zstd', 'lz4']
+    # the compression method is recorded in the schema metadata
+    metadata_key = b'data_juicer_compression'
+
+    @classmethod
+    def is_compressed(cls, path: Union[Path, str]):
+        """
+        Check whether the record batches of an Arrow cache file are
+        compressed already.
+
+        :param path: path to the Arrow cache file.
+        """
+        with pa.memory_map(str(path)) as source:
+            metadata = pa.ipc.open_stream(source).schema.metadata or {}
+        return cls.metadata_key in metadata
+
+    @classmethod
+    def compress(cls, path: Union[Path, str], compressor_format: str):
+        """
+        Compress the record batches of an Arrow cache file one by one, and
+        replace the file with the compressed one.
+
+        :param path: path to the Arrow cache file.
+        :param compressor_format: compression format, `zstd` or `lz4`.
+        """
+        assert compressor_format in cls.formats
+        path = str(path)
+        tmp_path = path + '.tmp'
+        options = pa.ipc.IpcWriteOptions(compression=compressor_format)
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_stream(source)
+            schema = reader.schema.with_metadata({
+                **(reader.schema.metadata or {}), cls.metadata_key:
+                compressor_format.encode()
+            })
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_stream(sink, schema,
+                                       options=options) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+        # datasets that map the original file keep reading it until closed
+        os.replace(tmp_path, path)
+
+
 class CompressManager:
     """
     This class is used to compress or decompress a input file
@@ -232,14 +285,22 @@ class CacheCompressManager:
     using compression format algorithms.
     """
 
-    def __init__(self, compressor_format: str = 'zstd'):
+    def __init__(self,
+                 compressor_format: str = 'zstd',
+                 batches: bool = False):
         """
         Initialization method.
 
         :param compressor_format: compression format algorithms,
             default `zstd`.
+        :param batches: whether to compress the record batches in the cache
+            files in place instead of compressing the whole files. Such
+            caches are loaded directly without decompression, but their
+            batches are decompressed into memory when they are loaded.
         """
+        assert not batches or compressor_format in ArrowBatchCompressor.formats
         self.compressor_format = compressor_format
+        self.batches = batches
         self.compressor_extension = '.' + compressor_format
         self.compress_manager = CompressManager(
             compressor_format=compressor_format)
@@ -343,6 +404,21 @@ class CacheCompressManager:
             # If there are no specified cache files, just skip
             if not os.path.exists(full_name):
                 continue
+            if self.batches:
+                if ArrowBatchCompressor.is_compressed(full_name):
+                    continue
+                logger.debug(f'Compressing record batches of cache file '
+                             f'{full_name}')
+                if num_proc > 1:
+                    pool.apply_async(ArrowBatchCompressor.compress,
+                                     args=(
+                                         full_name,
+                                         self.compressor_format,
+                                     ))
+                else:
+                    ArrowBatchCompressor.compress(full_name,
+                                                  self.compressor_format)
+                continue
             compress_filename = self._get_compressed_filename(full_name)
             formatted_cache_name = self.format_cache_file_name(
                 compress_filename)
@@ -389,6 +465,9 @@ class CacheCompressManager:
             `cache-` and ends with compression format.
         :param num_proc: number of processes to decompress cache files.
         """
+        # caches with compressed batches are loaded directly
+        if self.batches:
+            return
         cache_directory = self._get_cache_directory(ds)
         if cache_directory is None:
             return
@@ -486,14 +565,16 @@ class CompressionOff:
 
 def compress(prev_ds, this_ds=None, num_proc=1):
     if cache_utils.CACHE_COMPRESS:
-        CacheCompressManager(cache_utils.CACHE_COMPRESS).compress(
-            prev_ds, this_ds, num_proc)
+        CacheCompressManager(cache_utils.CACHE_COMPRESS,
+                             cache_utils.CACHE_COMPRESS_BATCHES).compress(
+                                 prev_ds, this_ds, num_proc)
 
 
 def decompress(ds, fingerprints=None, num_proc=1):
     if cache_utils.CACHE_COMPRESS:
-        CacheCompressManager(cache_utils.CACHE_COMPRESS).decompress(
-            ds, fingerprints, num_proc)
+        CacheCompressManager(cache_utils.CACHE_COMPRESS,
+                             cache_utils.CACHE_COMPRESS_BATCHES).decompress(
+                                 ds, fingerprints, num_proc)
 
 
 def cleanup_compressed_cache_files(ds):
@@ -192,6 +192,9 @@ class HashKeys(object):
     # duplicate flag
     is_duplicate = DEFAULT_PREFIX + 'is_duplicate'
 
+    # unique id of samples for distributed deduplication
+    uid = DEFAULT_PREFIX + 'uid'
+
 
 class InterVars(object):
     # text
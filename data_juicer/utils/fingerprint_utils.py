@@ -1,3 +1,6 @@
+import inspect
+import json
+from functools import lru_cache, partial
 from typing import Any, Dict, List, Union
 
 import dill
@@ -122,6 +125,88 @@ def update_fingerprint(fingerprint, transform, transform_args):
     return hasher.hexdigest()
 
 
+@lru_cache(maxsize=None)
+def get_code_version(cls):
+    """
+    Get the version of the code of an op class, which is the hash of the
+    source code of the class and its base classes in Data-Juicer, so that
+    caches are invalidated when the code of the op is changed.
+
+    :param cls: the op class.
+    :return: hex string of the version.
+    """
+    from data_juicer import __version__
+    hasher = xxhash.xxh64(__version__.encode('utf-8'))
+    for klass in cls.__mro__:
+        if not klass.__module__.startswith('data_juicer'):
+            continue
+        try:
+            hasher.update(inspect.getsource(klass).encode('utf-8'))
+        except (OSError, TypeError):
+            # the source code is unavailable, e.g. the op is defined in an
+            # interactive session, so only the name of the class is used
+            hasher.update(klass.__qualname__.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def get_op_state(op):
+    """
+    Get the state of an op to be hashed for the fingerprint, which consists
+    of its config, the version of its code, and the extra state provided by
+    its `fingerprint_state` hook. It's much cheaper and more stable than
+    serializing the whole op with the models, tokenizers and so on in it.
+
+    :param op: the op instance.
+    :return: the state string, or None if the config of the op is unknown,
+        i.e. it's not loaded by `load_ops`.
+    """
+    op_cfg = getattr(op, '_op_cfg', None)
+    if not op_cfg:
+        return None
+    fingerprint_state = getattr(op, 'fingerprint_state', None)
+    return json.dumps(
+        {
+            'op': op_cfg,
+            'code': get_code_version(type(op)),
+            'extra': fingerprint_state() if fingerprint_state else None,
+        },
+        sort_keys=True,
+        default=str)
+
+
+def get_function_state(function):
+    """
+    Get the state of the map/filter function to be hashed instead of the
+    function itself, if it's a method of an op or a partial of it.
+
+    :param function: the function of map/filter.
+    :return: the state string, or None if it's not a function of an op.
+    """
+    # For wrapped function, try to get its unwrapped (bound) method
+    while not inspect.ismethod(function) and hasattr(
+            function, '__wrapped__'):
+        function = function.__wrapped__
+    if inspect.ismethod(function):
+        op_state = get_op_state(function.__self__)
+        if op_state is None:
+            return None
+        return f'{function.__func__.__qualname__}:{op_state}'
+    if isinstance(function, partial):
+        values = list(function.args) + [
+            function.keywords[key] for key in sorted(function.keywords)
+        ]
+        op_states = [get_op_state(value) for value in values]
+        if all(state is None for state in op_states):
+            return None
+        states = [Hasher.hash(function.func), sorted(function.keywords)]
+        states += [
+            state if state else Hasher.hash(value)
+            for value, state in zip(values, op_states)
+        ]
+        return json.dumps(states)
+    return None
+
+
 def generate_fingerprint(ds, *args, **kwargs):
     """
     Generate new fingerprints by using various kwargs of the dataset.
@@ -139,6 +224,14 @@ def generate_fingerprint(ds, *args, **kwargs):
     kwargs_for_fingerprint = format_kwargs_for_fingerprint(
         ds._map_single, (), dataset_kwargs)
     kwargs_for_fingerprint['fingerprint_name'] = 'new_fingerprint'
+    # methods of ops are hashed by their states instead of being serialized
+    try:
+        function_state = get_function_state(
+            kwargs_for_fingerprint.get('function'))
+    except:  # noqa various errors might raise here from pickle or dill
+        function_state = None
+    if function_state is not None:
+        kwargs_for_fingerprint['function'] = function_state
     new_fingerprint = update_fingerprint(ds._fingerprint, transform,
                                          kwargs_for_fingerprint)
     validate_fingerprint(new_fingerprint)
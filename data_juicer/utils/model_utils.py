@@ -5,6 +5,7 @@ from pickle import UnpicklingError
 from typing import Optional, Union
 
 import multiprocess as mp
+import psutil
 import wget
 from loguru import logger
 
@@ -28,6 +29,17 @@ cv2 = LazyLoader('cv2', 'cv2')
 
 MODEL_ZOO = {}
 
+# types of models that are read-only and run on CPU, so they can be loaded
+# once in the main process and shared by the forked workers
+SHAREABLE_MODEL_TYPES = {'fasttext', 'sentencepiece', 'kenlm', 'nltk'}
+
+# whether to share the models of the types above with the forked workers
+SHARE_MODELS = False
+
+# id of model key -> shared model, and its memory in bytes
+SHARED_MODELS = {}
+SHARED_MODELS_MEM = {}
+
 # Default cached models links for downloading
 MODEL_LINKS = 'https://dail-wlcb.oss-cn-wulanchabu.aliyuncs.com/' \
                'data_juicer/models/'
@@ -611,11 +623,51 @@ def prepare_model(model_type, **model_kwargs):
                 list(MODEL_FUNCTION_MAPPING.keys()))
     model_func = MODEL_FUNCTION_MAPPING[model_type]
     model_key = partial(model_func, **model_kwargs)
-    # always instantiate once for possible caching
-    model_key()
+    if SHARE_MODELS and model_type in SHAREABLE_MODEL_TYPES:
+        # load it in the main process, so that the forked workers share its
+        # memory pages instead of loading their own copies
+        key_id = get_model_key_id(model_key)
+        if key_id not in SHARED_MODELS:
+            process = psutil.Process()
+            rss = process.memory_info().rss
+            SHARED_MODELS[key_id] = model_key()
+            SHARED_MODELS_MEM[key_id] = max(
+                process.memory_info().rss - rss, 0)
+    else:
+        # always instantiate once for possible caching
+        model_key()
     return model_key
 
 
+def get_model_key_id(model_key):
+    """
+    Get an id of the model key, which is the same for the keys of the same
+    model, even if they are created by different ops or unpickled in the
+    workers.
+
+    :param model_key: a model key returned by `prepare_model`.
+    :return: the id of the model key.
+    """
+    if not isinstance(model_key, partial):
+        return model_key
+    return (model_key.func.__module__, model_key.func.__qualname__,
+            repr(model_key.args), repr(sorted(model_key.keywords.items())))
+
+
+def get_shared_models_mem(model_keys):
+    """
+    Get the total memory of the shared models among the given model keys.
+
+    :param model_keys: model keys returned by `prepare_model`.
+    :return: the memory of the shared models in bytes.
+    """
+    key_ids = {
+        get_model_key_id(model_key)
+        for model_key in model_keys if isinstance(model_key, partial)
+    }
+    return sum(SHARED_MODELS_MEM.get(key_id, 0) for key_id in key_ids)
+
+
 def move_to_cuda(model, rank):
     # Assuming model can be either a single module or a tuple of modules
     if not isinstance(model, tuple):
@@ -634,10 +686,14 @@ def get_model(model_key=None, rank=None, use_cuda=False):
 
     global MODEL_ZOO
     if model_key not in MODEL_ZOO:
-        logger.debug(
-            f'{model_key} not found in MODEL_ZOO ({mp.current_process().name})'
-        )
-        MODEL_ZOO[model_key] = model_key()
+        shared_model = SHARED_MODELS.get(
+            get_model_key_id(model_key)) if SHARED_MODELS else None
+        if shared_model is not None:
+            MODEL_ZOO[model_key] = shared_model
+        else:
+            logger.debug(f'{model_key} not found in MODEL_ZOO '
+                         f'({mp.current_process().name})')
+            MODEL_ZOO[model_key] = model_key()
     if use_cuda:
         rank = 0 if rank is None else rank
         rank = rank % cuda_device_count()
@@ -653,3 +709,5 @@ def free_models():
         except Exception:
             pass
     MODEL_ZOO.clear()
+    SHARED_MODELS.clear()
+    SHARED_MODELS_MEM.clear()
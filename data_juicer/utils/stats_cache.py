@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+
+# op params that don't affect the computed stats, such as the filtering
+# strategies and runtime params. The thresholds of each filter are declared
+# in its `_threshold_params`
+NON_STATS_PARAMS = {
+    'any_or_all',
+    'reversed_range',
+    'text_key',
+    'image_key',
+    'audio_key',
+    'video_key',
+    'num_proc',
+    'batch_size',
+    'turbo',
+    'accelerator',
+    'cpu_required',
+    'mem_required',
+    'stats_export_path',
+    'stats_cache_path',
+}
+
+# key attrs of the fields that store paths of media files
+MEDIA_KEY_ATTRS = {'image_key', 'audio_key', 'video_key'}
+
+# max number of variables in one SQLite statement
+MAX_SQL_VARIABLES = 900
+
+
+def get_op_stats_key(op):
+    """
+    Get the key of an op in the stats cache, which is the hash of its name
+    and the params that affect the stats. The thresholds declared in
+    `_threshold_params` are left out, so tweaking them won't invalidate the
+    cached stats of a filter.
+
+    :param op: the op instance, which must be loaded by `load_ops` so that
+        its config is recorded in `_op_cfg`.
+    :return: hex string of the key, or None if the config of the op or the
+        fields its stats are computed from are unknown.
+    """
+    op_cfg = getattr(op, '_op_cfg', None)
+    if not op_cfg or getattr(op, '_stats_input_keys', None) is None:
+        return None
+    op_name, op_args = list(op_cfg.items())[0]
+    op_args = op_args or {}
+    non_stats_params = (NON_STATS_PARAMS
+                        | set(getattr(op, '_threshold_params', ()))
+                        | set(getattr(op, '_non_stats_params', ())))
+    params = {
+        name: value
+        for name, value in op_args.items() if name not in non_stats_params
+    }
+    content = json.dumps({
+        'name': op_name,
+        'params': params
+    },
+                         sort_keys=True,
+                         default=str)
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def get_media_state(paths):
+    """
+    Get the state of media files to be hashed for the stats cache, which is
+    the path, size and modification time of each file. Paths that are not
+    local files, e.g. URLs, are kept as they are.
+
+    :param paths: a path or a list of paths.
+    :return: the state, a JSON-serializable object.
+    """
+    if isinstance(paths, (list, tuple)):
+        return [get_media_state(path) for path in paths]
+    if not isinstance(paths, str):
+        return paths
+    try:
+        stat = os.stat(paths)
+    except OSError:
+        return paths
+    return [paths, stat.st_size, stat.st_mtime_ns]
+
+
+class StatsCache:
+    """
+    A persistent cache of the stats computed by filters across runs, backed
+    by a local SQLite file.
+
+    Stats are stored by the hash of (op key, sample content), where the
+    sample content is the values of the fields that the op computes stats
+    from, so the same sample in another dataset or another run hits the cache
+    as well. Media fields are hashed by the path, size and modification time
+    of the files, so replacing a file at the same path invalidates its stats.
+    """
+
+    def __init__(self, path):
+        """
+        Initialization method.
+
+        :param path: path to the SQLite file of the cache.
+        """
+        self.path = path
+        self._conn = None
+        self._pid = None
+
+    def __getstate__(self):
+        # connections can't be shared across processes
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        return state
+
+    @property
+    def conn(self):
+        if self._conn is None or self._pid != os.getpid():
+            cache_dir = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS stats '
+                               '(key TEXT PRIMARY KEY, value BLOB)')
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+    @staticmethod
+    def get_sample_keys(op, op_key, samples):
+        """
+        Compute the cache keys of a batch of samples for an op.
+
+        :param op: the op instance.
+        :param op_key: the key of the op from `get_op_stats_key`.
+        :param samples: a batch of samples in "dict of lists" format.
+        :return: list of hex string keys.
+        """
+        # the fields that the stats are computed from, and whether they
+        # store media paths
+        content_keys = [(getattr(op, key_attr), key_attr in MEDIA_KEY_ATTRS)
+                        for key_attr in op._stats_input_keys]
+        content_keys = [(key, is_media) for key, is_media in content_keys
+                        if key in samples]
+        num_samples = len(next(iter(samples.values())))
+        keys = []
+        for i in range(num_samples):
+            content = json.dumps([
+                get_media_state(samples[key][i])
+                if is_media else samples[key][i]
+                for key, is_media in content_keys
+            ],
+                                 default=str)
+            keys.append(
+                hashlib.md5((op_key + content).encode('utf-8')).hexdigest())
+        return keys
+
+    def get_many(self, keys):
+        """
+        Fetch the cached stats of the given keys.
+
+        :param keys: list of keys.
+        :return: a dict from the keys that hit the cache to their stats.
+        """
+        res = {}
+        for i in range(0, len(keys), MAX_SQL_VARIABLES):
+            batch = keys[i:i + MAX_SQL_VARIABLES]
+            rows = self.conn.execute(
+                f'SELECT key, value FROM stats WHERE key IN '
+                f'({",".join("?" * len(batch))})', batch).fetchall()
+            for key, value in rows:
+                res[key] = pickle.loads(value)
+        return res
+
+    def put_many(self, items):
+        """
+        Store the stats of the given keys.
+
+        :param items: a dict from keys to stats.
+        """
+        if not items:
+            return
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)',
+                [(key, pickle.dumps(value)) for key, value in items.items()])
@@ -291,9 +291,8 @@ def create_deduplicator_tab(op_type, op_tab):
             op = op_class(**op_params)
             sample = encode_sample(input_text, input_image, input_video, input_audio)
             sample2 = encode_sample(input_text2, input_image2, input_video2, input_audio2)
-            output_sample = op.compute_hash(copy.deepcopy(sample))
-            output_sample2 = op.compute_hash(copy.deepcopy(sample2))
-            ds = Dataset.from_list([output_sample, output_sample2])
+            ds = Dataset.from_list([sample, sample2]).map(
+                op.compute_hash, batched=op.is_batched_op())
             hash_values = ds.remove_columns([text_key, image_key, video_key, audio_key]).to_dict()
             ds.cleanup_cache_files()
             for key, values in hash_values.items():
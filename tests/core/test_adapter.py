@@ -4,10 +4,14 @@ import datasets
 from datasets import load_dataset
 from loguru import logger
 from data_juicer.core import Adapter
+from data_juicer.core.adapter import WorkloadTuner
 from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
-from data_juicer.ops.mapper import FixUnicodeMapper
-from data_juicer.ops.filter import PerplexityFilter
+from data_juicer.core.data import NestedDataset
+from data_juicer.ops.mapper import FixUnicodeMapper, WhitespaceNormalizationMapper
+from data_juicer.ops.filter import (AlphanumericFilter, PerplexityFilter,
+                                    TextLengthFilter)
 from data_juicer.ops.deduplicator import DocumentDeduplicator
+from data_juicer.ops.load import fuse_ops, load_ops
 
 class AdapterTest(DataJuicerTestCaseBase):
 
@@ -178,5 +182,149 @@ class AdapterTest(DataJuicerTestCaseBase):
         datasets.enable_caching()
 
 
+class FilterReorderTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.ds = NestedDataset.from_list([
+            {'text': 'short'},
+            {'text': 'a   long enough text to be kept'},
+            {'text': 'tiny'},
+            {'text': 'another  long enough text to be kept'},
+        ])
+
+    def _get_ops(self):
+        # the alphanumeric filter keeps all samples while the text length
+        # filter drops half of them
+        return [
+            WhitespaceNormalizationMapper(),
+            AlphanumericFilter(min_ratio=0.0),
+            TextLengthFilter(min_len=10),
+            DocumentDeduplicator(),
+        ]
+
+    def test_probe_filters(self):
+        samples = self.ds.to_dict()
+        ops = self._get_ops()[1:3]
+        probe_res = Adapter.probe_filters(samples, ops)
+        self.assertEqual(len(probe_res), len(ops))
+        self.assertEqual(probe_res[0]['pass_ratio'], 1.0)
+        self.assertEqual(probe_res[1]['pass_ratio'], 0.5)
+        for res in probe_res:
+            self.assertGreaterEqual(res['cost'], 0)
+
+    def test_reorder_filters(self):
+        ops = self._get_ops()
+        adapter = Adapter({'batch_size': 100})
+        reordered = adapter.reorder_filters(self.ds, ops)
+        self.assertEqual([op._name for op in reordered], [
+            'whitespace_normalization_mapper',
+            'text_length_filter',
+            'alphanumeric_filter',
+            'document_deduplicator',
+        ])
+
+        # the result won't change after reordering
+        expected = self.ds.process(self._get_ops())
+        res = self.ds.process(reordered)
+        self.assertEqual(res.to_list(), expected.to_list())
+
+    def test_fuse_reordered_filters(self):
+        ops = load_ops([{
+            'whitespace_normalization_mapper': {}
+        }, {
+            'alphanumeric_filter': {
+                'min_ratio': 0.0
+            }
+        }, {
+            'text_length_filter': {
+                'min_len': 10
+            }
+        }])
+        adapter = Adapter({'batch_size': 100})
+        reordered = adapter.reorder_filters(self.ds, ops)
+        fused = fuse_ops([op._op_cfg for op in reordered],
+                         reordered,
+                         general_fusion=True)
+        # the probed ops are fused without being loaded again
+        self.assertEqual(len(fused), 1)
+        self.assertEqual(fused[0].fused_ops, reordered)
+        self.assertEqual([op._name for op in fused[0].fused_ops], [
+            'whitespace_normalization_mapper',
+            'text_length_filter',
+            'alphanumeric_filter',
+        ])
+        self.assertEqual(
+            list(fused[0]._op_cfg.values())[0],
+            [op._op_cfg for op in reordered])
+
+
+class AdaptiveWorkloadsTest(DataJuicerTestCaseBase):
+
+    def test_tune_batch_size(self):
+        tuner = WorkloadTuner(100, 4)
+        # warm-up chunk
+        tuner.update(10, 0.5)
+        self.assertEqual(tuner.batch_size, 100)
+        tuner.update(100, 0.5)
+        self.assertEqual(tuner.batch_size, 200)
+        tuner.update(150, 0.5)
+        self.assertEqual(tuner.batch_size, 400)
+        # no improvement, so it goes back to the best one
+        tuner.update(150, 0.5)
+        self.assertEqual(tuner.batch_size, 200)
+        self.assertTrue(tuner.converged)
+
+        # try halving if doubling doesn't help at all
+        tuner = WorkloadTuner(100, 4)
+        tuner.update(10, 0.5)
+        tuner.update(100, 0.5)
+        tuner.update(80, 0.5)
+        self.assertEqual(tuner.batch_size, 50)
+        tuner.update(200, 0.5)
+        self.assertEqual(tuner.batch_size, 25)
+
+    def test_back_off(self):
+        tuner = WorkloadTuner(100, 4, mem_util_threshold=0.8)
+        tuner.update(10, 0.9)
+        self.assertEqual((tuner.batch_size, tuner.num_proc), (50, 2))
+        tuner.update(10, 0.7)
+        self.assertEqual((tuner.batch_size, tuner.num_proc), (50, 2))
+        tuner.update(10, 0.5)
+        tuner.update(10, 0.5)
+        tuner.update(10, 0.5)
+        # the number of processes never exceeds the initial one
+        self.assertEqual((tuner.batch_size, tuner.num_proc), (50, 4))
+
+    def test_run_op_adaptively(self):
+        ds = NestedDataset.from_list([{
+            'text': 'a' * (i % 20)
+        } for i in range(100)])
+        op = TextLengthFilter(min_len=10)
+        adapter = Adapter({'adaptive_chunk_size': 30})
+        self.assertTrue(adapter.can_run_adaptively(op))
+        self.assertFalse(adapter.can_run_adaptively(DocumentDeduplicator()))
+        res = adapter.run_op_adaptively(op, ds)
+        self.assertEqual(res.to_list(), op.run(ds).to_list())
+        self.assertEqual(op.batch_size, 1000)
+
+    def test_chunks_with_different_features(self):
+        ds = NestedDataset.from_list([{
+            'text': 'a' * i
+        } for i in range(100)])
+        op = WhitespaceNormalizationMapper()
+
+        def add_tags(dataset, **kwargs):
+            # the tags of the first chunk are all empty lists
+            return dataset.map(lambda sample: {
+                'tags': ['long'] if len(sample['text']) > 50 else []
+            })
+
+        op.run = add_tags
+        adapter = Adapter({'adaptive_chunk_size': 30})
+        res = adapter.run_op_adaptively(op, ds)
+        self.assertEqual(res['tags'],
+                         [['long'] if i > 50 else [] for i in range(100)])
+
+
 if __name__ == '__main__':
     unittest.main()
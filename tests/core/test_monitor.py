@@ -1,7 +1,11 @@
+import json
+import os
+import tempfile
 import unittest
 import time
 from loguru import logger
-from data_juicer.core import Monitor
+from data_juicer.core import Monitor, NestedDataset, ResourceSampler
+from data_juicer.ops import load_ops
 from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase, SKIPPED_TESTS
 
 @SKIPPED_TESTS.register_module()
@@ -57,5 +61,89 @@ class MonitorTest(DataJuicerTestCaseBase):
             analysis2['resource_analysis']['Mem. util.']['avg'])
 
 
+class ResourceSamplerTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmp_dir.cleanup()
+
+    def test_sampler(self):
+        sampler = ResourceSampler(self.work_dir, interval=0.1, buffer_size=3)
+        sampler.start()
+        sampler.begin_op('op1')
+        time.sleep(0.6)
+        res = sampler.end_op('op1', 10)
+        sampler.stop()
+        # only the latest records are kept in the ring buffer
+        self.assertEqual(len(res['resource']), 3)
+        self.assertIn('CPU util.', res['resource'][0])
+        self.assertEqual(res['resource'][0]['op'], 'op1')
+        # while the analysis covers all the records of the op
+        self.assertGreater(res['num_records'], 3)
+        self.assertIn('CPU util.', res['resource_analysis'])
+        cpu_utils = res['resource_analysis']['CPU util.']
+        self.assertLessEqual(cpu_utils['min'], cpu_utils['avg'])
+        self.assertLessEqual(cpu_utils['avg'], cpu_utils['max'])
+
+        with open(os.path.join(self.work_dir,
+                               ResourceSampler.TIMELINE_FILENAME)) as fin:
+            records = [json.loads(line) for line in fin]
+        self.assertEqual(records[0]['event'], 'op_begin')
+        self.assertEqual(records[-1]['event'], 'op_end')
+        self.assertEqual(records[-1]['num_rows'], 10)
+        self.assertGreater(len(records), 3)
+        with open(os.path.join(self.work_dir,
+                               ResourceSampler.TRACE_FILENAME)) as fin:
+            events = json.load(fin)
+        self.assertEqual([e['ph'] for e in events if e['name'] == 'op1'],
+                         ['B', 'E'])
+
+    def test_failed_samples(self):
+        sampler = ResourceSampler(interval=0.1)
+        sample = sampler.sample
+        num_calls = [0]
+
+        def fail_every_other_sample():
+            num_calls[0] += 1
+            if num_calls[0] % 2 == 0:
+                raise RuntimeError('Set changed size during iteration')
+            return sample()
+
+        sampler.sample = fail_every_other_sample
+        sampler.start()
+        sampler.begin_op('op1')
+        time.sleep(0.6)
+        res = sampler.end_op('op1')
+        sampler.stop()
+        # the sampler keeps running after the failed samples
+        self.assertGreater(num_calls[0], 2)
+        self.assertGreater(res['num_records'], 1)
+
+    def test_process(self):
+        dataset = NestedDataset.from_list([{'text': 'a' * i} for i in range(10)])
+        ops = load_ops([{
+            'text_length_filter': {
+                'min_len': 5
+            }
+        }, {
+            'whitespace_normalization_mapper': {}
+        }])
+        dataset.process(ops, work_dir=self.work_dir)
+        with open(os.path.join(self.work_dir, 'monitor.json')) as fin:
+            resource_util_list = json.load(fin)
+        self.assertEqual(len(resource_util_list), 2)
+        with open(os.path.join(self.work_dir,
+                               ResourceSampler.TIMELINE_FILENAME)) as fin:
+            records = [json.loads(line) for line in fin]
+        ends = [record for record in records if record.get('event') == 'op_end']
+        self.assertEqual([(e['op'], e['num_rows']) for e in ends],
+                         [('text_length_filter', 5),
+                          ('whitespace_normalization_mapper', 5)])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,225 @@
+import glob
+import json
+import os
+import shutil
+import unittest
+
+import pyarrow.parquet as pq
+import zstandard as zstd
+
+from data_juicer.core import Exporter, StreamingProcessor
+from data_juicer.core.exporter import ParquetShardWriter
+from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.ops.deduplicator.document_deduplicator import \
+    DocumentDeduplicator
+from data_juicer.ops.filter.text_length_filter import TextLengthFilter
+from data_juicer.ops.mapper.clean_email_mapper import CleanEmailMapper
+from data_juicer.ops.mapper.whitespace_normalization_mapper import \
+    WhitespaceNormalizationMapper
+from data_juicer.utils.constant import Fields
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class StreamingProcessorTest(DataJuicerTestCaseBase):
+
+    tmp_dir = 'tmp/test_streaming/'
+
+    def setUp(self):
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.ds_list = [{
+            'text': 'contact me at  test@example.com please'
+        }, {
+            'text': 'short'
+        }, {
+            'text': 'a very   long text that will be kept after filtering'
+        }, {
+            'text': 'tiny'
+        }, {
+            'text': 'another text with odd whitespace inside it'
+        }]
+
+    def tearDown(self):
+        super().tearDown()
+        if os.path.exists(self.tmp_dir):
+            shutil.rmtree(self.tmp_dir)
+
+    def _get_ops(self):
+        return [
+            CleanEmailMapper(),
+            WhitespaceNormalizationMapper(),
+            TextLengthFilter(min_len=10, max_len=1000),
+        ]
+
+    def test_process_batch(self):
+        dataset = Dataset.from_list(self.ds_list)
+        expected = dataset.process(self._get_ops()).to_list()
+
+        processor = StreamingProcessor(self._get_ops(), batch_size=2)
+        res = []
+        for batch in processor.iter_batches(dataset):
+            res.extend(Exporter._iter_rows(batch))
+        self.assertEqual([s['text'] for s in res],
+                         [s['text'] for s in expected])
+        self.assertEqual([s[Fields.stats] for s in res],
+                         [s[Fields.stats] for s in expected])
+
+    def test_run_with_multiple_workers(self):
+        dataset = Dataset.from_list(self.ds_list * 10)
+        expected = dataset.process(self._get_ops()).to_list()
+
+        export_path = os.path.join(self.tmp_dir, 'res.jsonl')
+        exporter = Exporter(export_path, keep_stats_in_res_ds=False)
+        processor = StreamingProcessor(self._get_ops(),
+                                       batch_size=3,
+                                       num_proc=2)
+        num_kept = processor.run(dataset, exporter)
+        self.assertEqual(num_kept, len(expected))
+
+        with open(export_path) as fin:
+            res = [json.loads(line) for line in fin]
+        self.assertEqual(res, [{'text': s['text']} for s in expected])
+        stats_path = os.path.join(self.tmp_dir, 'res_stats.jsonl')
+        with open(stats_path) as fin:
+            stats = [json.loads(line)[Fields.stats] for line in fin]
+        self.assertEqual(stats, [s[Fields.stats] for s in expected])
+
+    def test_export_stream_with_rollover(self):
+        batches = [{
+            'text': [f'sample {i}' * 10 for i in range(start, start + 10)]
+        } for start in range(0, 50, 10)]
+        export_path = os.path.join(self.tmp_dir, 'res.jsonl.zst')
+        exporter = Exporter(export_path, export_shard_size=200)
+        self.assertEqual(exporter.export_stream(iter(batches)), 50)
+
+        filenames = sorted(
+            glob.glob(os.path.join(self.tmp_dir, 'res-*.jsonl.zst')))
+        self.assertGreater(len(filenames), 1)
+        self.assertTrue(filenames[0].endswith(
+            f'-of-{len(filenames):0{len(str(len(filenames))) + 1}d}'
+            f'.jsonl.zst'))
+        res = []
+        for filename in filenames:
+            with open(filename, 'rb') as fin:
+                reader = zstd.ZstdDecompressor().stream_reader(fin)
+                res.extend(
+                    json.loads(line)['text']
+                    for line in reader.read().decode('utf-8').splitlines())
+        self.assertEqual(res, [t for batch in batches for t in batch['text']])
+
+    def test_export_stream_to_parquet(self):
+        batches = [{
+            'text': ['a', 'b'],
+            Fields.stats: [{
+                'text_len': 1
+            }, {
+                'text_len': 1
+            }]
+        }, {
+            'text': ['cc'],
+            Fields.stats: [{
+                'text_len': 2
+            }]
+        }]
+        export_path = os.path.join(self.tmp_dir, 'res.parquet')
+        exporter = Exporter(export_path)
+        self.assertEqual(exporter.export_stream(iter(batches)), 3)
+        self.assertEqual(pq.read_table(export_path).to_pydict(),
+                         {'text': ['a', 'b', 'cc']})
+        with open(os.path.join(self.tmp_dir, 'res_stats.jsonl')) as fin:
+            stats = [json.loads(line)[Fields.stats] for line in fin]
+        self.assertEqual(stats, [{
+            'text_len': 1
+        }, {
+            'text_len': 1
+        }, {
+            'text_len': 2
+        }])
+
+    def _write_parquet(self, batches, row_group_nbytes=2**20):
+        path = os.path.join(self.tmp_dir, 'shard.parquet')
+        writer = ParquetShardWriter(path, row_group_nbytes)
+        for batch in batches:
+            writer.write(batch)
+        writer.close()
+        return pq.read_table(path).to_pylist()
+
+    def test_parquet_null_typed_first_batch(self):
+        batches = [{
+            'text': ['a', 'b'],
+            'meta': [None, None]
+        }, {
+            'text': ['c'],
+            'meta': ['x']
+        }]
+        rows = [row for batch in batches for row in Dataset.from_dict(
+            batch).to_list()]
+        self.assertEqual(self._write_parquet(batches), rows)
+        # the full row group is held back until the null field gets its type
+        self.assertEqual(self._write_parquet(batches, row_group_nbytes=8),
+                         rows)
+
+    def test_parquet_struct_gaining_fields(self):
+        batches = [{
+            'meta': [{
+                'a': 1
+            }],
+            'tags': [[{
+                'a': 1
+            }]]
+        }, {
+            'meta': [{
+                'a': 2,
+                'b': 2.5
+            }, None],
+            'tags': [[{
+                'b': 'x'
+            }], []]
+        }]
+        self.assertEqual(self._write_parquet(batches), [{
+            'meta': {
+                'a': 1,
+                'b': None
+            },
+            'tags': [{
+                'a': 1,
+                'b': None
+            }]
+        }, {
+            'meta': {
+                'a': 2,
+                'b': 2.5
+            },
+            'tags': [{
+                'a': None,
+                'b': 'x'
+            }]
+        }, {
+            'meta': None,
+            'tags': []
+        }])
+
+    def test_parquet_schema_changed_after_written(self):
+        # the schema of the written row group can't be changed, so the new
+        # field raises instead of being dropped
+        with self.assertRaises(ValueError):
+            self._write_parquet([{
+                'meta': [{
+                    'a': 1
+                }]
+            }, {
+                'meta': [{
+                    'a': 1,
+                    'b': 2
+                }]
+            }],
+                                row_group_nbytes=1)
+
+    def test_is_streamable(self):
+        self.assertTrue(StreamingProcessor.is_streamable(self._get_ops()))
+        self.assertFalse(
+            StreamingProcessor.is_streamable(self._get_ops() +
+                                             [DocumentDeduplicator()]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from datasets import (config, disable_caching, enable_caching,
+                      is_caching_enabled)
+
+from data_juicer.format.json_formatter import JsonFormatter
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class JsonFormatterTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self._path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                  'data', 'structured')
+        self._file = os.path.join(self._path, 'demo-dataset.jsonl')
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmp_dir.cleanup()
+
+    def test_json_file(self):
+        formatter = JsonFormatter(self._file)
+        ds = formatter.load_dataset()
+        self.assertEqual(len(ds), 6)
+        self.assertEqual(list(ds.features.keys()), ['text', 'meta'])
+
+    def test_jsonl_in_chunks(self):
+        file = os.path.join(self.tmp_dir.name, 'data.jsonl')
+        with open(file, 'w') as fout:
+            for i in range(100):
+                # the type of "tag" can't be inferred from the first chunks
+                sample = {'text': f'sample {i}', 'tag': None}
+                if i >= 90:
+                    sample['tag'] = f'tag {i}'
+                fout.write(json.dumps(sample) + '\n')
+
+        # store the caches in the tmp dir instead of the real cache dir
+        ds_cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        caching_enabled = is_caching_enabled()
+        try:
+            with mock.patch.object(config, 'HF_DATASETS_CACHE',
+                                   Path(ds_cache_dir)):
+                enable_caching()
+                target = JsonFormatter(file).load_dataset()
+                formatter = JsonFormatter(file)
+                formatter.CHUNK_SIZE = 256
+                ds = formatter.load_dataset(num_proc=2)
+                self.assertEqual(ds.features, target.features)
+                self.assertEqual(ds.to_list(), target.to_list())
+                # the chunks are stored in the dataset cache dir
+                for cache_file in ds.cache_files:
+                    self.assertTrue(cache_file['filename'].startswith(
+                        os.path.join(ds_cache_dir, 'jsonl_chunks')))
+
+                # the chunks are stored in a temp dir when caching is
+                # disabled
+                disable_caching()
+                ds = formatter.load_dataset(num_proc=2)
+                self.assertEqual(ds.to_list(), target.to_list())
+                for cache_file in ds.cache_files:
+                    self.assertFalse(
+                        cache_file['filename'].startswith(ds_cache_dir))
+        finally:
+            if caching_enabled:
+                enable_caching()
+            else:
+                disable_caching()
+
+
+if __name__ == '__main__':
+    unittest.main()
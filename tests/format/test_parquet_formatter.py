@@ -1,6 +1,16 @@
 import os
+import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
 
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datasets import (config, disable_caching, enable_caching,
+                      is_caching_enabled)
+
+from data_juicer.format.load import (get_pushdown_suffixes,
+                                     get_referenced_columns)
 from data_juicer.format.parquet_formatter import ParquetFormatter
 from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
 
@@ -13,6 +23,18 @@ class CsvFormatterTest(DataJuicerTestCaseBase):
         self._file = os.path.join(self._path, 'demo-dataset.parquet')
         print(self._file)
 
+        # store the caches in a tmp dir instead of the real cache dir
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.ds_cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        patcher = mock.patch.object(config, 'HF_DATASETS_CACHE',
+                                    Path(self.ds_cache_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(enable_caching
+                        if is_caching_enabled() else disable_caching)
+        enable_caching()
+
     def test_parquet_file(self):
         formatter = ParquetFormatter(self._file)
         ds = formatter.load_dataset()
@@ -25,6 +47,84 @@ class CsvFormatterTest(DataJuicerTestCaseBase):
         self.assertEqual(len(ds), 6)
         self.assertEqual(list(ds.features.keys()), ['text', 'meta'])
 
+    def test_cache_dir(self):
+        ds = ParquetFormatter(self._file).load_dataset()
+        # the scanned samples are stored in the dataset cache dir
+        for cache_file in ds.cache_files:
+            self.assertTrue(cache_file['filename'].startswith(
+                os.path.join(self.ds_cache_dir, 'parquet')))
+
+        # they are stored in a temp dir when caching is disabled
+        disable_caching()
+        ds = ParquetFormatter(self._file).load_dataset()
+        self.assertEqual(len(ds), 6)
+        for cache_file in ds.cache_files:
+            self.assertFalse(cache_file['filename'].startswith(
+                self.ds_cache_dir))
+
+    def test_pushdown(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            parquet_file = os.path.join(tmp_dir, 'wide.parquet')
+            pq.write_table(
+                pa.table({
+                    'text': ['a', None, 'c'],
+                    'embedding': [[0.1] * 4, [0.2] * 4, [0.3] * 4],
+                    'meta': [{
+                        'date': 1
+                    }, {
+                        'date': 2
+                    }, {
+                        'date': 3
+                    }],
+                }), parquet_file)
+            formatter = ParquetFormatter(parquet_file,
+                                         text_keys=['text'],
+                                         columns=['text', 'meta'])
+            ds = formatter.load_dataset()
+            self.assertEqual(list(ds.features.keys()), ['text', 'meta'])
+            self.assertEqual(ds.to_list(), [{
+                'text': 'a',
+                'meta': {
+                    'date': 1
+                }
+            }, {
+                'text': 'c',
+                'meta': {
+                    'date': 3
+                }
+            }])
+
+    def test_referenced_columns(self):
+        process_list = [{
+            'specified_field_filter': {
+                'field_key': 'meta.date',
+                'text_key': 'text',
+            }
+        }, {
+            'text_length_filter': None
+        }]
+        self.assertEqual(
+            get_referenced_columns(['text'], 'images', 'audios', 'videos',
+                                   process_list),
+            ['text', 'images', 'audios', 'videos', 'meta'])
+
+    def test_pushdown_suffixes(self):
+        process_list = [{
+            'clean_email_mapper': {}
+        }, {
+            'suffix_filter': {
+                'suffixes': ['.jsonl', 'txt']
+            }
+        }]
+        self.assertEqual(get_pushdown_suffixes([], True, process_list),
+                         ['.jsonl'])
+        self.assertEqual(get_pushdown_suffixes([], False, process_list), [])
+        # ops before the suffix_filter might depend on the other samples
+        self.assertEqual(
+            get_pushdown_suffixes([], True, [{
+                'document_deduplicator': {}
+            }] + process_list), [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from data_juicer.ops.common.hash_index import HashIndex
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class HashIndexTest(DataJuicerTestCaseBase):
+
+    def test_stage_and_commit(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            hash_index = HashIndex(index_dir)
+            hash_index.stage(np.array([3, 1, 2], dtype=np.uint64))
+            # staged keys are not queried before the commit
+            self.assertFalse(hash_index.contains([1, 2, 3]).any())
+            # pending segments of a crashed run are discarded
+            HashIndex(index_dir)
+            self.assertEqual(len(os.listdir(index_dir)), 0)
+
+            hash_index = HashIndex(index_dir)
+            hash_index.stage(np.array([3, 1, 2], dtype=np.uint64))
+            hash_index.commit()
+            self.assertEqual(hash_index.contains([1, 4, 3]).tolist(),
+                             [True, False, True])
+            self.assertEqual(len(hash_index), 3)
+
+    def test_compact(self):
+        rng = np.random.default_rng(42)
+        keys = rng.choice(1 << 40, size=5000, replace=False).astype(np.uint64)
+        with tempfile.TemporaryDirectory() as index_dir:
+            hash_index = HashIndex(index_dir, max_segments=1000)
+            for part in np.array_split(keys, 7):
+                hash_index.append(part)
+            self.assertEqual(len(hash_index.segment_ids()), 7)
+            hash_index.compact(chunk_size=64)
+            segments = hash_index.load_segments()
+            self.assertEqual(len(segments), 1)
+            np.testing.assert_array_equal(segments[0], np.sort(keys))
+
+    def test_meta(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            HashIndex(index_dir, meta={'num_bands': 8, 'seed': 42})
+            HashIndex(index_dir, meta={'seed': 42, 'num_bands': 8})
+            with self.assertRaises(ValueError):
+                HashIndex(index_dir, meta={'num_bands': 16, 'seed': 42})
+
+
+if __name__ == '__main__':
+    unittest.main()
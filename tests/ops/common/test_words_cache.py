@@ -0,0 +1,107 @@
+import unittest
+
+from data_juicer.ops.common import (SPECIAL_CHARACTERS, WORDS_CACHE,
+                                    get_cached_words, get_words_from_document,
+                                    words_refinement)
+from data_juicer.ops.common.words_cache import WordsCache
+from data_juicer.ops.filter.word_repetition_filter import WordRepetitionFilter
+from data_juicer.ops.filter.words_num_filter import WordsNumFilter
+from data_juicer.utils.constant import Fields, StatsKeys
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class WordsCacheTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        WORDS_CACHE.clear()
+
+    def tearDown(self):
+        WORDS_CACHE.clear()
+
+    def test_lru_eviction(self):
+        cache = WordsCache(max_words=5)
+        cache.put('a', ['1', '2'])
+        cache.put('b', ['3', '4'])
+        self.assertEqual(cache.get('a'), ['1', '2'])
+        cache.put('c', ['5', '6'])
+        # 'b' is the least recently used one
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), ['1', '2'])
+        self.assertEqual(cache.get('c'), ['5', '6'])
+        self.assertEqual(cache.num_words, 4)
+        # too large to cache
+        cache.put('d', ['x'] * 6)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 2)
+
+    def test_resize(self):
+        cache = WordsCache(max_words=5)
+        cache.put('a', ['1', '2'])
+        cache.put('b', ['3', '4'])
+        cache.resize(3)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), ['3', '4'])
+        # 0 disables the cache
+        cache.resize(0)
+        self.assertFalse(cache.enabled)
+        self.assertEqual(cache.num_words, 0)
+        cache.put('c', [])
+        self.assertIsNone(cache.get('c'))
+
+    def test_disabled(self):
+        max_words = WORDS_CACHE.max_words
+        WORDS_CACHE.resize(0)
+        try:
+            text = "Today is Sunday, and it's a HAPPY day!"
+            self.assertEqual(
+                get_cached_words(text, refine=True, lower_case=True),
+                words_refinement(get_words_from_document(text),
+                                 lower_case=True))
+            self.assertEqual(len(WORDS_CACHE.cache), 0)
+            self.assertEqual(WORDS_CACHE.misses, 0)
+        finally:
+            WORDS_CACHE.resize(max_words)
+
+    def test_same_as_uncached(self):
+        text = "Today is Sunday, and it's a HAPPY day!\nBUT... not for me."
+        words = get_words_from_document(text)
+        self.assertEqual(get_cached_words(text), words)
+        refined = words_refinement(words,
+                                   lower_case=True,
+                                   strip_chars=SPECIAL_CHARACTERS,
+                                   use_words_aug=True,
+                                   words_aug_group_sizes=[2, 3])
+        self.assertEqual(
+            get_cached_words(text,
+                             refine=True,
+                             lower_case=True,
+                             strip_chars=SPECIAL_CHARACTERS,
+                             use_words_aug=True,
+                             words_aug_group_sizes=[2, 3]), refined)
+        # different refinement params are cached separately
+        self.assertEqual(
+            get_cached_words(text, refine=True, lower_case=True),
+            words_refinement(words, lower_case=True))
+
+    def test_shared_across_filters(self):
+        samples = {
+            'text': [
+                "Today is Sunday Sunday Sunday and it's a happy day!",
+                'This proposed a novel proposed pretraining.',
+            ],
+            Fields.stats: [{}, {}],
+        }
+        WordsNumFilter().compute_stats_batched(samples)
+        # the raw and refined words of each sample
+        self.assertEqual(WORDS_CACHE.misses, 4)
+        WordRepetitionFilter().compute_stats_batched(samples)
+        # only the words refined in another way are missed, and the raw
+        # words are not split again
+        self.assertEqual(WORDS_CACHE.misses, 6)
+        self.assertEqual(samples[Fields.stats][0][StatsKeys.num_words], 10)
+        self.assertEqual(samples[Fields.stats][1][StatsKeys.num_words], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from data_juicer.ops.common import (SPECIAL_CHARACTERS, WordsMatcher,
+                                    get_words_from_document, get_words_matcher,
+                                    words_refinement)
+from data_juicer.ops.filter.flagged_words_filter import FlaggedWordFilter
+from data_juicer.ops.filter.stopwords_filter import StopWordsFilter
+from data_juicer.utils.constant import Fields, StatsKeys
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class WordsMatcherTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.words_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.words_dir, 'flagged_words.json'),
+                  'w') as f:
+            json.dump({'en': ['bad', 'very bad'], 'zh': ['打飞机', '三级片']}, f)
+        with open(os.path.join(self.words_dir, 'stopwords.json'), 'w') as f:
+            json.dump({'en': ['a', 'is', 'the', 'of']}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.words_dir)
+
+    def _count_with_refinement(self, matcher, words, **aug_params):
+        words = words_refinement(words, **aug_params)
+        return len([word for word in words
+                    if word in matcher.words]), len(words)
+
+    def test_count(self):
+        random.seed(42)
+        vocab = ['a', 'b', 'c', 'ab', 'abc', 'd']
+        matcher = WordsMatcher(['a', 'ab', 'abc', 'a b', 'bcd', 'b c d'])
+        for _ in range(200):
+            words = random.choices(vocab, k=random.randint(0, 12))
+            for group_sizes in [[2], [3], [2, 3], [1, 2, 2]]:
+                for join_char in ['', ' ']:
+                    aug_params = dict(use_words_aug=True,
+                                      words_aug_group_sizes=group_sizes,
+                                      words_aug_join_char=join_char)
+                    self.assertEqual(
+                        matcher.count(words, **aug_params),
+                        self._count_with_refinement(matcher, words,
+                                                    **aug_params))
+            self.assertEqual(matcher.count(words),
+                             self._count_with_refinement(matcher, words))
+
+    def test_get_words_matcher(self):
+        matcher = get_words_matcher(self.words_dir, 'flagged_words', 'zh')
+        self.assertEqual(matcher.words, frozenset(['打飞机', '三级片']))
+        self.assertIs(
+            get_words_matcher(self.words_dir, 'flagged_words', 'zh'), matcher)
+        all_matcher = get_words_matcher(self.words_dir, 'flagged_words',
+                                        'all')
+        self.assertEqual(len(all_matcher.words), 4)
+
+    def test_filters(self):
+        texts = [
+            'This is a very bad day of the week',
+            '除 掉 打 飞 机 、 三 级 片 等 敏 感 词',
+            '',
+        ]
+        aug_params = dict(use_words_aug=True,
+                          words_aug_group_sizes=[2, 3],
+                          words_aug_join_char='')
+        flagged_op = FlaggedWordFilter(lang='all',
+                                       flagged_words_dir=self.words_dir,
+                                       **aug_params)
+        stopwords_op = StopWordsFilter(lang='en',
+                                       stopwords_dir=self.words_dir)
+        stats = []
+        for text in texts:
+            sample = {'text': text, Fields.stats: {}}
+            sample = flagged_op.compute_stats_single(sample)
+            sample = stopwords_op.compute_stats_single(sample)
+            words = words_refinement(get_words_from_document(text),
+                                     lower_case=True,
+                                     strip_chars=SPECIAL_CHARACTERS)
+            num, total = self._count_with_refinement(
+                get_words_matcher(self.words_dir, 'flagged_words', 'all'),
+                words, **aug_params)
+            self.assertEqual(
+                sample[Fields.stats][StatsKeys.flagged_words_ratio],
+                num / total if total else 0.0)
+            num, total = self._count_with_refinement(
+                get_words_matcher(self.words_dir, 'stopwords', 'en'), words)
+            self.assertEqual(sample[Fields.stats][StatsKeys.stopwords_ratio],
+                             num / total if total else 0.0)
+            stats.append(sample[Fields.stats])
+        # the flagged words are matched in the augmented word groups
+        self.assertGreater(stats[1][StatsKeys.flagged_words_ratio], 0)
+        self.assertGreater(stats[0][StatsKeys.stopwords_ratio], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
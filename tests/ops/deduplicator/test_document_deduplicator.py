@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 
 from data_juicer.core.data import NestedDataset as Dataset
@@ -96,6 +97,48 @@ class DocumentDeduplicatorTest(DataJuicerTestCaseBase):
         op = DocumentDeduplicator(lowercase=False, ignore_non_character=False)
         self._run_doc_dedup(dataset, tgt_list, op)
 
+    def test_incremental_dedup(self):
+        first_ds_list = [
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+        ]
+        second_ds_list = [
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text':
+                'This paper proposed a novel method on LLM pretraining.'
+            },
+            {
+                'text':
+                'This paper proposed a novel method on LLM pretraining.'
+            },
+        ]
+        with tempfile.TemporaryDirectory() as index_dir:
+            # the index is unchanged if the run is not committed, e.g. when
+            # it crashes before exporting, so the run can be redone
+            self._run_doc_dedup(Dataset.from_list(first_ds_list),
+                                first_ds_list,
+                                DocumentDeduplicator(index_dir=index_dir))
+            op = DocumentDeduplicator(index_dir=index_dir)
+            self._run_doc_dedup(Dataset.from_list(first_ds_list),
+                                first_ds_list, op)
+            op.commit()
+            # samples seen in the first run are removed as well
+            self._run_doc_dedup(Dataset.from_list(second_ds_list),
+                                [second_ds_list[1]], op)
+            op.commit()
+            # all samples are seen in previous runs
+            self._run_doc_dedup(Dataset.from_list(first_ds_list), [], op)
+            # the index is refused with different hashing params
+            with self.assertRaises(ValueError):
+                DocumentDeduplicator(lowercase=True, index_dir=index_dir)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 
 from data_juicer.core.data import NestedDataset as Dataset
@@ -958,6 +959,159 @@ class DocumentMinhashDeduplicatorTest(DataJuicerTestCaseBase):
                                          ignore_pattern=r'\p{P}')
         self._run_minhash_dedup(dataset, tgt_list, op)
 
+    def test_batched_compute_hash(self):
+        ds_list = [
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+            {
+                'text': ''
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': 'Today is sunday and it\'s really a happy day!'
+            },
+        ]
+        dataset = Dataset.from_list(ds_list)
+        op = DocumentMinhashDeduplicator(ignore_pattern=r'\p{P}')
+        batched_res = dataset.map(op.compute_hash, batch_size=4).to_list()
+        single_res = dataset.map(op.compute_hash, batch_size=1).to_list()
+        self.assertEqual(batched_res, single_res)
+
+    def test_xxhash_deduplication(self):
+        text = ('Data-Juicer is a one-stop data processing system to make '
+                'data higher-quality, juicier, and more digestible for large '
+                'language models, which provides many operators to process '
+                'text, image, audio and video data.')
+        ds_list = [
+            {
+                'text': text
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text + ' Try it now!'
+            },
+        ]
+        tgt_list = ds_list[:2]
+        for hash_func in ['xxh32', 'xxh64']:
+            dataset = Dataset.from_list(ds_list)
+            op = DocumentMinhashDeduplicator(ignore_pattern=r'\p{P}',
+                                             hash_func=hash_func)
+            self._run_minhash_dedup(dataset, tgt_list, op)
+
+    def test_unknown_hash_func(self):
+        with self.assertRaises(ValueError):
+            DocumentMinhashDeduplicator(hash_func='md5')
+
+    def test_array_lsh_engine(self):
+        text = ('Data-Juicer is a one-stop data processing system to make '
+                'data higher-quality, juicier, and more digestible for large '
+                'language models, which provides many operators to process '
+                'text, image, audio and video data.')
+        ds_list = [
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text + ' Try it now!'
+            },
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+        ]
+        tgt_list = [ds_list[0], ds_list[1], ds_list[4]]
+        for lsh_engine in ['dict', 'array']:
+            dataset = Dataset.from_list(ds_list)
+            op = DocumentMinhashDeduplicator(ignore_pattern=r'\p{P}',
+                                             lsh_engine=lsh_engine)
+            self._run_minhash_dedup(dataset, tgt_list, op)
+
+    def test_unknown_lsh_engine(self):
+        with self.assertRaises(ValueError):
+            DocumentMinhashDeduplicator(lsh_engine='redis')
+
+    def test_spill_to_disk(self):
+        text = ('Data-Juicer is a one-stop data processing system to make '
+                'data higher-quality, juicier, and more digestible for large '
+                'language models, which provides many operators to process '
+                'text, image, audio and video data.')
+        ds_list = [
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text + ' Try it now!'
+            },
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+        ]
+        tgt_list = [ds_list[0], ds_list[1], ds_list[4]]
+        with tempfile.TemporaryDirectory() as spill_dir:
+            dataset = Dataset.from_list(ds_list)
+            op = DocumentMinhashDeduplicator(ignore_pattern=r'\p{P}',
+                                             spill_dir=spill_dir,
+                                             num_spill_buckets=4)
+            self._run_minhash_dedup(dataset, tgt_list, op)
+
+    def test_incremental_dedup(self):
+        text = ('Data-Juicer is a one-stop data processing system to make '
+                'data higher-quality, juicier, and more digestible for large '
+                'language models, which provides many operators to process '
+                'text, image, audio and video data.')
+        first_ds_list = [
+            {
+                'text': text
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+        ]
+        second_ds_list = [
+            {
+                'text': text + ' Try it now!'
+            },
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+        ]
+        with tempfile.TemporaryDirectory() as index_dir:
+            op = DocumentMinhashDeduplicator(ignore_pattern=r'\p{P}',
+                                             index_dir=index_dir)
+            self._run_minhash_dedup(Dataset.from_list(first_ds_list),
+                                    first_ds_list, op)
+            op.commit()
+            # near-duplicates of the first run are removed as well
+            self._run_minhash_dedup(Dataset.from_list(second_ds_list),
+                                    [second_ds_list[1]], op)
+            op.commit()
+            # all samples are seen in previous runs
+            self._run_minhash_dedup(Dataset.from_list(first_ds_list), [], op)
+            # the band keys mismatch with different minhash params
+            with self.assertRaises(ValueError):
+                DocumentMinhashDeduplicator(ignore_pattern=r'\p{P}',
+                                            num_permutations=128,
+                                            index_dir=index_dir)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 
 from data_juicer.core.data import NestedDataset as Dataset
@@ -958,6 +959,43 @@ class DocumentSimhashDeduplicatorTest(DataJuicerTestCaseBase):
                                          ignore_pattern=r'\p{P}')
         self._run_simhash_dedup(dataset, tgt_list, op)
 
+    def test_spill_to_disk(self):
+        text = ('Data-Juicer is a one-stop data processing system to make '
+                'data higher-quality, juicier, and more digestible for large '
+                'language models. It provides a systematic library of over 80 '
+                'core operators, 20 reusable config recipes, and 20 '
+                'feature-rich dedicated toolkits, which are designed to '
+                'function independently of specific multimodal LLM datasets '
+                'and processing pipelines. It supports data analysis, '
+                'cleaning, and synthesis in pre-training or post-tuning, in '
+                'English, Chinese and more scenarios. Users can easily build '
+                'their own recipes and process data at scale with the '
+                'distributed executors based on Ray.')
+        ds_list = [
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text + ' Try it now!'
+            },
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+        ]
+        tgt_list = [ds_list[0], ds_list[1], ds_list[4]]
+        with tempfile.TemporaryDirectory() as spill_dir:
+            dataset = Dataset.from_list(ds_list)
+            op = DocumentSimhashDeduplicator(ignore_pattern=r'\p{P}',
+                                             spill_dir=spill_dir,
+                                             num_spill_buckets=4)
+            self._run_simhash_dedup(dataset, tgt_list, op)
+
 
 if __name__ == '__main__':
     unittest.main()
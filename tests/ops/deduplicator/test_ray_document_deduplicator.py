@@ -0,0 +1,75 @@
+import unittest
+
+from data_juicer.ops.deduplicator.ray_document_deduplicator import \
+    RayDocumentDeduplicator
+from data_juicer.utils.unittest_utils import TEST_TAG, DataJuicerTestCaseBase
+
+
+class RayDocumentDeduplicatorTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.ds_list = [
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': 'Today is sunday and it\'s a happy day!'
+            },
+            {
+                'text':
+                'This paper proposed a novel method on LLM pretraining.'
+            },
+            {
+                'text':
+                'This paper proposed a novel method on LLM pretraining.'
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+        ]
+
+    @TEST_TAG('standalone', 'ray')
+    def test_ray_actor_backend(self):
+        tgt_list = [{
+            'text': 'Today is Sunday and it\'s a happy day!'
+        }, {
+            'text': 'Do you need a cup of coffee?'
+        }, {
+            'text': 'Today is sunday and it\'s a happy day!'
+        }, {
+            'text': 'This paper proposed a novel method on LLM pretraining.'
+        }]
+        dataset = self.generate_dataset(self.ds_list)
+        op = RayDocumentDeduplicator(backend='ray_actor',
+                                     num_shards=2,
+                                     batch_size=2)
+        result = self.run_single_op(dataset, op, ['text'])
+        self.assertDatasetEqual(result, tgt_list)
+
+    @TEST_TAG('standalone', 'ray')
+    def test_lowercase_ray_actor_backend(self):
+        tgt_list = [{
+            'text': 'Today is Sunday and it\'s a happy day!'
+        }, {
+            'text': 'Do you need a cup of coffee?'
+        }, {
+            'text': 'This paper proposed a novel method on LLM pretraining.'
+        }]
+        dataset = self.generate_dataset(self.ds_list)
+        op = RayDocumentDeduplicator(backend='ray_actor',
+                                     lowercase=True,
+                                     num_shards=2,
+                                     batch_size=4)
+        result = self.run_single_op(dataset, op, ['text'])
+        self.assertDatasetEqual(result, tgt_list)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            RayDocumentDeduplicator(backend='memcached')
+
+
+if __name__ == '__main__':
+    unittest.main()
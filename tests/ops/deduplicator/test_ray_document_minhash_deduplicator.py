@@ -0,0 +1,72 @@
+import unittest
+
+from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.ops.deduplicator.document_minhash_deduplicator import \
+    DocumentMinhashDeduplicator
+from data_juicer.ops.deduplicator.ray_document_minhash_deduplicator import \
+    RayDocumentMinhashDeduplicator
+from data_juicer.utils.unittest_utils import TEST_TAG, DataJuicerTestCaseBase
+
+
+class RayDocumentMinhashDeduplicatorTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        text = ('Data-Juicer is a one-stop data processing system to make '
+                'data higher-quality, juicier, and more digestible for '
+                'large language models.')
+        self.ds_list = [
+            {
+                'text': text
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': text.replace('juicier', 'juicy')
+            },
+            {
+                'text': 'Today is Sunday and it\'s a happy day!'
+            },
+            {
+                'text': text.replace('one-stop', 'one stop')
+            },
+            {
+                'text': 'Do you need a cup of coffee?'
+            },
+            {
+                'text': 'Today is Monday and it\'s a busy day.'
+            },
+        ]
+
+    def _run_minhash_dedup(self, op):
+        dataset = self.generate_dataset(self.ds_list)
+        return self.run_single_op(dataset, op, ['text'])
+
+    @TEST_TAG('standalone', 'ray')
+    def test_same_as_non_ray_op(self):
+        params = dict(ignore_pattern=r'\p{P}',
+                      window_size=2,
+                      jaccard_threshold=0.5,
+                      batch_size=2)
+        # the non-Ray op always runs on a standalone dataset
+        op = DocumentMinhashDeduplicator(**params)
+        dataset = Dataset.from_list(self.ds_list).map(op.compute_hash,
+                                                      batched=True)
+        tgt_list, _ = op.process(dataset)
+        tgt_list = tgt_list.select_columns(['text']).to_list()
+        self.assertEqual(len(tgt_list), 4)
+        # the first sample of each group of near-duplicates is kept
+        self.assertIn({'text': self.ds_list[0]['text']}, tgt_list)
+        result = self._run_minhash_dedup(
+            RayDocumentMinhashDeduplicator(**params))
+        self.assertDatasetEqual(result, tgt_list)
+
+    @TEST_TAG('standalone', 'ray')
+    def test_no_duplicates(self):
+        self.ds_list = self.ds_list[:2]
+        result = self._run_minhash_dedup(RayDocumentMinhashDeduplicator())
+        self.assertDatasetEqual(result, self.ds_list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 
+from data_juicer.core.data import NestedDataset as Dataset
 from data_juicer.ops.filter.alphanumeric_filter import AlphanumericFilter
+from data_juicer.utils.constant import Fields
 from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase, TEST_TAG
 
 
@@ -68,6 +70,32 @@ class AlphanumericFilterTest(DataJuicerTestCaseBase):
         result = self.run_single_op(dataset, op, ["text"])
         self.assertDatasetEqual(result, tgt_list)
 
+    def test_malformed_text(self):
+        ds_list = [{
+            'text': "Today is Sunday and it's a happy day!"
+        }, {
+            'text': None
+        }, {
+            'text': 'a v s e c s f e f g a a a a a a a a a'
+        }, {
+            'text': '，。、„”“«»１」「《》´∶：？！（）；–—．～’…━〈〉【】％►'
+        }]
+        op = AlphanumericFilter(min_ratio=0.2, max_ratio=0.9)
+
+        def run_op(ds_list, batch_size):
+            dataset = Dataset.from_list(ds_list)
+            dataset = dataset.add_column(name=Fields.stats,
+                                         column=[{}] * dataset.num_rows)
+            dataset = dataset.map(op.compute_stats, batch_size=batch_size)
+            dataset = dataset.filter(op.process, batch_size=batch_size)
+            return dataset.select_columns(['text', Fields.stats]).to_list()
+
+        # the malformed sample is skipped like in the row path, and the
+        # other samples in its batch are still processed
+        tgt_list = run_op(ds_list[:1] + ds_list[2:], 1)
+        self.assertEqual(run_op(ds_list, 1), tgt_list)
+        self.assertEqual(run_op(ds_list, 4), tgt_list)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -49,6 +49,32 @@ class CharacterRepetitionFilterTest(DataJuicerTestCaseBase):
             batch_size=2)
         self._run_character_repetition_filter(dataset, tgt_list, op)
 
+    def test_malformed_text(self):
+        ds_list = [{
+            'text': "Today is Sunday and it's a happy day!"
+        }, {
+            'text': None
+        }, {
+            'text': 'a v s e c s f e f g a a a a a a a a a'
+        }, {
+            'text': '，。、„”“«»１」「《》´∶：？！（）；–—．～’…━〈〉【】％►'
+        }]
+        op = CharacterRepetitionFilter(rep_len=5, min_ratio=0.0, max_ratio=0.4)
+
+        def run_op(ds_list, batch_size):
+            dataset = Dataset.from_list(ds_list)
+            dataset = dataset.add_column(name=Fields.stats,
+                                         column=[{}] * dataset.num_rows)
+            dataset = dataset.map(op.compute_stats, batch_size=batch_size)
+            dataset = dataset.filter(op.process, batch_size=batch_size)
+            return dataset.select_columns(['text', Fields.stats]).to_list()
+
+        # the malformed sample is skipped like in the row path, and the
+        # other samples in its batch are still processed
+        tgt_list = run_op(ds_list[:1] + ds_list[2:], 1)
+        self.assertEqual(run_op(ds_list, 1), tgt_list)
+        self.assertEqual(run_op(ds_list, 4), tgt_list)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,12 @@
 import unittest
 
 from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.ops import load_ops
 
-from data_juicer.ops.filter.perplexity_filter import PerplexityFilter
+from data_juicer.ops.filter.perplexity_filter import (LINE_SCORE_CACHES,
+                                                    PerplexityFilter)
 from data_juicer.utils.constant import Fields
+from data_juicer.utils.stats_cache import get_op_stats_key
 from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
 
 
@@ -71,6 +74,51 @@ class PerplexityFilterTest(DataJuicerTestCaseBase):
     def test_en_case_context(self):
         self._test_en_case(context=True)
 
+    def test_line_cache(self):
+        boilerplate = 'Accept all cookies to continue'
+        ds_list = [{
+            'text': f"Today is Sunday and it's a happy day!\n{boilerplate}"
+        }, {
+            'text': f'{boilerplate}\nDo you need a cup of coffee?'
+        }, {
+            'text': f'{boilerplate}\n{boilerplate}'
+        }]
+        for line_level in [False, True]:
+            stats_list = []
+            for line_cache_size in [0, 100]:
+                op = PerplexityFilter(lang='en',
+                                      line_level=line_level,
+                                      line_cache_size=line_cache_size,
+                                      batch_size=2)
+                dataset = Dataset.from_list(ds_list)
+                dataset = dataset.add_column(name=Fields.stats,
+                                             column=[{}] * dataset.num_rows)
+                dataset = dataset.map(op.compute_stats,
+                                      batch_size=op.batch_size)
+                stats_list.append(dataset[Fields.stats])
+            # the cached line scores are reused across batches without
+            # changing the results
+            self.assertEqual(stats_list[0], stats_list[1])
+        # the boilerplate line is scored only once
+        cache = LINE_SCORE_CACHES[(str(op.kl_model_key),
+                                   str(op.sp_model_key))]
+        self.assertEqual(len(cache), 3)
+
+    def test_line_cache_size(self):
+        # the line cache is only enabled by default for line_level
+        self.assertEqual(PerplexityFilter().line_cache_size, 0)
+        self.assertEqual(
+            PerplexityFilter(line_level=True).line_cache_size, 1000000)
+        # the line cache doesn't affect the cached stats
+        op1, op2 = load_ops([{
+            'perplexity_filter': {}
+        }, {
+            'perplexity_filter': {
+                'line_cache_size': 100
+            }
+        }])
+        self.assertEqual(get_op_stats_key(op1), get_op_stats_key(op2))
+
 
 if __name__ == '__main__':
     unittest.main()
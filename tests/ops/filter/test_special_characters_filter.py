@@ -4,7 +4,7 @@ from data_juicer.core.data import NestedDataset as Dataset
 
 from data_juicer.ops.filter.special_characters_filter import \
     SpecialCharactersFilter
-from data_juicer.utils.constant import Fields
+from data_juicer.utils.constant import Fields, StatsKeys
 from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
 
 
@@ -52,6 +52,54 @@ class SpecialCharactersFilterTest(DataJuicerTestCaseBase):
         op = SpecialCharactersFilter(min_ratio=0.0, max_ratio=0.25, batch_size=2)
         self._run_special_characters_filter(dataset, tgt_list, op)
 
+    def test_typed_stats(self):
+        ds_list = [{
+            'text': 'a, b, c!'
+        }, {
+            'text': 'abc'
+        }, {
+            'text': ''
+        }]
+        dataset = Dataset.from_list(ds_list)
+        op = SpecialCharactersFilter(min_ratio=0.0, max_ratio=0.25)
+        dataset = op.run(dataset)
+        # stats are stored as a typed field instead of python dicts
+        self.assertEqual(
+            dataset.features[Fields.stats][
+                StatsKeys.special_char_ratio].dtype, 'float64')
+        self.assertEqual(dataset[Fields.stats], [{
+            StatsKeys.special_char_ratio: 0.0
+        }, {
+            StatsKeys.special_char_ratio: 0.0
+        }])
+        self.assertEqual(dataset['text'], ['abc', ''])
+
+    def test_malformed_text(self):
+        ds_list = [{
+            'text': "Today is Sunday and it's a happy day!"
+        }, {
+            'text': None
+        }, {
+            'text': 'a v s e c s f e f g a a a a a a a a a'
+        }, {
+            'text': '，。、„”“«»１」「《》´∶：？！（）；–—．～’…━〈〉【】％►'
+        }]
+        op = SpecialCharactersFilter(min_ratio=0.0, max_ratio=0.25)
+
+        def run_op(ds_list, batch_size):
+            dataset = Dataset.from_list(ds_list)
+            dataset = dataset.add_column(name=Fields.stats,
+                                         column=[{}] * dataset.num_rows)
+            dataset = dataset.map(op.compute_stats, batch_size=batch_size)
+            dataset = dataset.filter(op.process, batch_size=batch_size)
+            return dataset.select_columns(['text', Fields.stats]).to_list()
+
+        # the malformed sample is skipped like in the row path, and the
+        # other samples in its batch are still processed
+        tgt_list = run_op(ds_list[:1] + ds_list[2:], 1)
+        self.assertEqual(run_op(ds_list, 1), tgt_list)
+        self.assertEqual(run_op(ds_list, 4), tgt_list)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -47,6 +47,61 @@ class TextLengthFilterTest(DataJuicerTestCaseBase):
         op = TextLengthFilter(min_len=10, max_len=50)
         self._run_text_length_filter(dataset, tgt_list, op)
 
+    def test_nested_text_key(self):
+        ds_list = [{
+            'meta': {
+                'content': 'short'
+            }
+        }, {
+            'meta': {
+                'content': 'a longer text'
+            }
+        }]
+        dataset = Dataset.from_list(ds_list)
+        op = TextLengthFilter(min_len=10, text_key='meta.content')
+        dataset = dataset.process(op)
+        self.assertEqual(dataset.select_columns(['meta']).to_list(),
+                         ds_list[1:])
+        self.assertEqual(dataset[Fields.stats], [{'text_len': 13}])
+
+    def test_run_batch(self):
+        # batches of python objects are converted for the columnar op
+        samples = {
+            'text': ['short', 'a longer text', 'precomputed'],
+            Fields.stats: [{}, {}, {
+                'text_len': 100
+            }],
+        }
+        op = TextLengthFilter(min_len=10, max_len=50)
+        self.assertTrue(op.is_columnar_op())
+        res = op.run_batch(samples)
+        self.assertEqual(res['text'], ['a longer text'])
+        self.assertEqual(res[Fields.stats], [{'text_len': 13}])
+
+    def test_fault_tolerance(self):
+
+        class FailingTextLengthFilter(TextLengthFilter):
+
+            def compute_stats_batched(self, samples):
+                if 'bad' in samples.column('text').to_pylist():
+                    raise ValueError('bad sample')
+                return super().compute_stats_batched(samples)
+
+        ds_list = [{
+            'text': 'a longer text'
+        }, {
+            'text': 'bad'
+        }, {
+            'text': 'short'
+        }, {
+            'text': 'another longer text'
+        }]
+        tgt_list = [{'text': 'a longer text'}, {'text': 'another longer text'}]
+        dataset = Dataset.from_list(ds_list)
+        op = FailingTextLengthFilter(min_len=10, max_len=50)
+        # only the failed sample is skipped instead of crashing the map
+        self._run_text_length_filter(dataset, tgt_list, op)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+
+from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.ops.mapper.clean_email_mapper import CleanEmailMapper
+from data_juicer.ops.mapper.clean_ip_mapper import CleanIpMapper
+from data_juicer.ops.mapper.clean_links_mapper import CleanLinksMapper
+from data_juicer.ops.mapper.text_cleaning_mapper import TextCleaningMapper
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class TextCleaningMapperTest(DataJuicerTestCaseBase):
+
+    def _run_text_cleaning(self, op, samples):
+        dataset = Dataset.from_list(samples)
+        dataset = dataset.map(op.process, batch_size=2)
+
+        for data in dataset:
+            self.assertEqual(data['text'], data['target'])
+
+    def test_default_rules(self):
+        texts = [
+            'happy day euqdh@cjqi.com, visit https://www.example.com/a?b=c',
+            'server 127.0.0.1 and fe80:0:0:0:202:b3ff:fe1e:8329 are down',
+            'ftp://examplema-nièrdash@hqbchd.ckdhnfes.cds',
+            '请问你是谁dasoidhao@1264fg.45om',
+        ]
+        # the same as applying these mappers in sequence for these texts
+        ops = [CleanEmailMapper(), CleanIpMapper(), CleanLinksMapper()]
+        samples = []
+        for text in texts:
+            target = text
+            for op in ops:
+                target = op.process({'text': [target]})['text'][0]
+            samples.append({'text': text, 'target': target})
+        op = TextCleaningMapper()
+        self.assertEqual(len(op.engine.steps), 1)
+        self._run_text_cleaning(op, samples)
+
+    def test_mixed_rules(self):
+        samples = [{
+            'text': 'Call 2024-05 now, mail me at abc@de.com\n'
+            '◆ Copyright 2024 ●',
+            'target': 'Call 05/2024 now, mail me at <EMAIL>\n Copyright 2024 '
+        }, {
+            'text': '/* Copyright Foo */\nint a = 1-2;',
+            'target': '\nint a = 2/1;'
+        }]
+        op = TextCleaningMapper(rules=[
+            'clean_copyright_mapper',
+            {
+                'clean_email_mapper': {
+                    'repl': '<EMAIL>'
+                }
+            },
+            {
+                'pattern': r'(\d+)-(\d+)',
+                'repl': r'\2/\1'
+            },
+            'remove_specific_chars_mapper',
+        ])
+        # the copyright mapper is applied on its own, and the others are
+        # applied in one pass
+        self.assertEqual(len(op.engine.steps), 2)
+        self._run_text_cleaning(op, samples)
+
+    def test_overlapped_rules(self):
+        samples = [{
+            'text': 'hello hello world world',
+            'target': 'hello WORLD WORLD'
+        }, {
+            'text': 'a world of worlds',
+            'target': 'a WORLD of WORLDs'
+        }]
+        # the leftmost match wins, and the replaced content is not scanned
+        # again by other rules
+        op = TextCleaningMapper(rules=[
+            {
+                'pattern': 'world',
+                'repl': 'WORLD'
+            },
+            {
+                'pattern': r'\b(\w+) \1\b',
+                'repl': r'\1'
+            },
+        ])
+        self.assertEqual(len(op.engine.steps), 1)
+        self._run_text_cleaning(op, samples)
+
+    def test_empty_matches(self):
+        samples = [{
+            'text': ' bxxbxxb',
+            'target': 'X XxXxXxXxX'
+        }, {
+            'text': 'aab',
+            'target': 'XX'
+        }]
+        # an empty match of the first rule doesn't hide the non-empty match
+        # of the second rule at the same position
+        op = TextCleaningMapper(rules=[
+            {
+                'pattern': 'a*',
+                'repl': 'X'
+            },
+            {
+                'pattern': 'b+',
+                'repl': ''
+            },
+        ])
+        self.assertEqual(len(op.engine.steps), 1)
+        self._run_text_cleaning(op, samples)
+
+    def test_invalid_rules(self):
+        with self.assertRaises(ValueError):
+            TextCleaningMapper(rules=['clean_html_mapper'])
+        with self.assertRaises(ValueError):
+            TextCleaningMapper(rules=[{'repl': ''}])
+
+
+if __name__ == '__main__':
+    unittest.main()
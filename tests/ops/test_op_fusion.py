@@ -1,6 +1,9 @@
 import unittest
 
+from data_juicer.core.data import NestedDataset as Dataset
 from data_juicer.ops.load import load_ops
+from data_juicer.ops.op_fusion import GeneralFusedOP
+from data_juicer.utils.constant import Fields
 from data_juicer.utils.unittest_utils import (SKIPPED_TESTS,
                                               DataJuicerTestCaseBase)
 
@@ -1017,5 +1020,93 @@ class OpFusionTest(DataJuicerTestCaseBase):
         self._run_op_fusion(original_process, target_process)
 
 
+class GeneralFusionTest(DataJuicerTestCaseBase):
+
+    process_list = [{
+        'clean_email_mapper': {
+            'text_key': 'text'
+        }
+    }, {
+        'text_length_filter': {
+            'min_len': 10,
+            'max_len': 1000,
+            'text_key': 'text'
+        }
+    }, {
+        'whitespace_normalization_mapper': {
+            'text_key': 'text'
+        }
+    }, {
+        'document_deduplicator': {
+            'text_key': 'text'
+        }
+    }, {
+        'alphanumeric_filter': {
+            'min_ratio': 0.5,
+            'text_key': 'text'
+        }
+    }]
+
+    def test_fused_definitions(self):
+        ops = load_ops(self.process_list, general_fusion=True)
+        self.assertEqual(len(ops), 3)
+        self.assertIsInstance(ops[0], GeneralFusedOP)
+        self.assertEqual(
+            ops[0]._op_cfg, {
+                'OpFusion:(clean_email_mapper,text_length_filter,'
+                'whitespace_normalization_mapper)': self.process_list[:3]
+            })
+        self.assertEqual(ops[1]._op_cfg, self.process_list[3])
+        self.assertEqual(ops[2]._op_cfg, self.process_list[4])
+
+    def test_filters_exporting_stats(self):
+        process_list = [{
+            'clean_email_mapper': {}
+        }, {
+            'text_length_filter': {
+                'min_len': 10,
+                'stats_export_path': 'stats.jsonl'
+            }
+        }, {
+            'whitespace_normalization_mapper': {}
+        }, {
+            'alphanumeric_filter': {
+                'min_ratio': 0.5
+            }
+        }]
+        # the filter exporting stats is run on its own, so that its stats
+        # are still exported
+        ops = load_ops(process_list, general_fusion=True)
+        self.assertEqual([op._op_cfg for op in ops], [
+            process_list[0], process_list[1], {
+                'OpFusion:(whitespace_normalization_mapper,'
+                'alphanumeric_filter)': process_list[2:]
+            }
+        ])
+
+    def test_same_results_as_unfused(self):
+        ds_list = [{
+            'text': 'contact me at  test@example.com please'
+        }, {
+            'text': 'short'
+        }, {
+            'text': 'a very   long text that will be kept after filtering'
+        }, {
+            'text': 'tiny'
+        }, {
+            'text': 'a very long text that will be kept after filtering'
+        }]
+        ops = load_ops(self.process_list)
+        fused_ops = load_ops(self.process_list, general_fusion=True)
+        for op in fused_ops:
+            op.batch_size = 2
+        res = Dataset.from_list(ds_list).process(ops).to_list()
+        fused_res = Dataset.from_list(ds_list).process(fused_ops).to_list()
+        self.assertEqual([s['text'] for s in fused_res],
+                         [s['text'] for s in res])
+        self.assertEqual([s[Fields.stats] for s in fused_res],
+                         [s[Fields.stats] for s in res])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.ops import load_ops
+from data_juicer.utils import ckpt_utils
+from data_juicer.utils.ckpt_utils import CheckpointManager
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class CheckpointManagerTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.ckpt_dir = os.path.join(self.tmp_dir.name, 'ckpt')
+        self.ds_list = [{
+            'text': 'a'
+        }, {
+            'text': 'abcdef'
+        }, {
+            'text': 'abc'
+        }, {
+            'text': 'abcdefgh'
+        }, {
+            'text': 'abcdefghij'
+        }]
+        self.process_list = [{
+            'text_length_filter': {
+                'min_len': 5
+            }
+        }, {
+            'whitespace_normalization_mapper': {}
+        }]
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmp_dir.cleanup()
+
+    def test_resume_from_finished_shards(self):
+        dataset = Dataset.from_list(self.ds_list)
+        manager = CheckpointManager(self.ckpt_dir,
+                                    self.process_list,
+                                    shard_size=2)
+        op = load_ops(self.process_list[:1])[0]
+        run = op.run
+        num_calls = [0]
+
+        def crash_on_second_shard(dataset, **kwargs):
+            num_calls[0] += 1
+            if num_calls[0] == 2:
+                raise RuntimeError('crash')
+            return run(dataset, **kwargs)
+
+        op.run = crash_on_second_shard
+        with self.assertRaises(RuntimeError):
+            manager.run_op_in_shards(op, dataset)
+
+        # only the unfinished shards are processed after restarting
+        manager = CheckpointManager(self.ckpt_dir,
+                                    self.process_list,
+                                    shard_size=2)
+        op = load_ops(self.process_list[:1])[0]
+        run = op.run
+        processed = []
+
+        def record_shard(dataset, **kwargs):
+            processed.append(dataset['text'])
+            return run(dataset, **kwargs)
+
+        op.run = record_shard
+        res = manager.run_op_in_shards(op, dataset)
+        self.assertEqual(processed, [['abc', 'abcdefgh'], ['abcdefghij']])
+        self.assertEqual(res['text'], ['abcdef', 'abcdefgh', 'abcdefghij'])
+
+    def test_progress_of_different_op(self):
+        dataset = Dataset.from_list(self.ds_list)
+        manager = CheckpointManager(self.ckpt_dir,
+                                    self.process_list,
+                                    shard_size=2)
+        op = load_ops(self.process_list[:1])[0]
+        manager.run_op_in_shards(op, dataset)
+
+        # the progress of another op is never reused
+        op = load_ops([{'text_length_filter': {'min_len': 8}}])[0]
+        res = manager.run_op_in_shards(op, dataset)
+        self.assertEqual(res['text'], ['abcdefgh', 'abcdefghij'])
+
+    def test_checkpoint_after_each_op(self):
+        dataset = Dataset.from_list(self.ds_list)
+        manager = CheckpointManager(self.ckpt_dir,
+                                    self.process_list,
+                                    shard_size=2)
+        ops = load_ops(self.process_list)
+        res = dataset.process(ops, checkpointer=manager)
+        self.assertEqual(res['text'], ['abcdef', 'abcdefgh', 'abcdefghij'])
+        self.assertFalse(os.path.exists(manager.ckpt_partial_dir))
+
+        # all ops are skipped when rerunning with the same config
+        manager = CheckpointManager(self.ckpt_dir,
+                                    self.process_list,
+                                    shard_size=2)
+        self.assertTrue(manager.ckpt_available)
+        self.assertEqual(manager.get_left_process_list(), [])
+        self.assertEqual(manager.load_ckpt()['text'], res['text'])
+
+    def test_shards_with_different_features(self):
+        dataset = Dataset.from_list(self.ds_list)
+        manager = CheckpointManager(self.ckpt_dir,
+                                    self.process_list,
+                                    shard_size=2)
+        op = load_ops(self.process_list[1:])[0]
+
+        def add_tags(dataset, **kwargs):
+            # the tags of the first shard are all empty lists
+            return dataset.map(lambda sample: {
+                'tags': ['long'] if len(sample['text']) > 7 else []
+            })
+
+        op.run = add_tags
+        res = manager.run_op_in_shards(op, dataset)
+        self.assertEqual(res['tags'], [[], [], [], ['long'], ['long']])
+
+    def test_crash_when_saving_ckpt(self):
+        dataset = Dataset.from_list(self.ds_list)
+        manager = CheckpointManager(self.ckpt_dir, self.process_list)
+        manager.record(self.process_list[0])
+        manager.save_ckpt(dataset.select(range(2)))
+        manager.record(self.process_list[1])
+
+        # crash before the new checkpoint is moved in
+        replace = os.replace
+
+        def crash_on_moving_in(src, dst):
+            if dst == manager.ckpt_ds_dir:
+                raise RuntimeError('crash')
+            return replace(src, dst)
+
+        with mock.patch('os.replace', crash_on_moving_in):
+            with self.assertRaises(RuntimeError):
+                manager.save_ckpt(dataset)
+        recovered = CheckpointManager(self.ckpt_dir, self.process_list)
+        self.assertTrue(recovered.ckpt_available)
+        self.assertEqual(recovered.get_left_process_list(),
+                         self.process_list[1:])
+        self.assertEqual(len(recovered.load_ckpt()), 2)
+
+        # crash before the op record is updated
+        dump_json = ckpt_utils.dump_json
+
+        def crash_on_op_record(obj, path):
+            if path == manager.ckpt_op_record:
+                raise RuntimeError('crash')
+            return dump_json(obj, path)
+
+        with mock.patch.object(ckpt_utils, 'dump_json', crash_on_op_record):
+            with self.assertRaises(RuntimeError):
+                manager.save_ckpt(dataset)
+        recovered = CheckpointManager(self.ckpt_dir, self.process_list)
+        self.assertTrue(recovered.ckpt_available)
+        self.assertEqual(recovered.get_left_process_list(), [])
+        self.assertEqual(len(recovered.load_ckpt()), len(self.ds_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from datasets import disable_caching, enable_caching, is_caching_enabled
+
+from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.utils import cache_utils
+from data_juicer.utils.compress import ArrowBatchCompressor
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class CacheCompressTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # compression only works with the cache management
+        self.caching_enabled = is_caching_enabled()
+        enable_caching()
+        ds_dir = os.path.join(self.tmp_dir.name, 'dataset')
+        Dataset.from_list([{
+            'text': 'a' * i
+        } for i in range(100)]).save_to_disk(ds_dir)
+        # caches of the following ops are stored beside the dataset
+        self.dataset = Dataset.load_from_disk(ds_dir)
+        self.original = (cache_utils.CACHE_COMPRESS,
+                         cache_utils.CACHE_COMPRESS_BATCHES)
+        cache_utils.CACHE_COMPRESS = 'zstd'
+        cache_utils.CACHE_COMPRESS_BATCHES = True
+
+    def tearDown(self):
+        super().tearDown()
+        cache_utils.CACHE_COMPRESS, cache_utils.CACHE_COMPRESS_BATCHES = \
+            self.original
+        if not self.caching_enabled:
+            disable_caching()
+        self.tmp_dir.cleanup()
+
+    def test_compress_batches(self):
+
+        def add_len(sample):
+            return {'len': len(sample['text'])}
+
+        def double_len(sample):
+            return {'len': sample['len'] * 2}
+
+        ds1 = self.dataset.map(add_len)
+        cache_file = ds1.cache_files[0]['filename']
+        self.assertFalse(ArrowBatchCompressor.is_compressed(cache_file))
+        size = os.path.getsize(cache_file)
+
+        # the cache of the previous op is compressed in place
+        ds2 = ds1.map(double_len)
+        self.assertTrue(ArrowBatchCompressor.is_compressed(cache_file))
+        self.assertLess(os.path.getsize(cache_file), size)
+        self.assertFalse(
+            ArrowBatchCompressor.is_compressed(ds2.cache_files[0]['filename']))
+
+        # the compressed cache is reused directly
+        res = self.dataset.map(add_len)
+        self.assertEqual(res.cache_files[0]['filename'], cache_file)
+        self.assertEqual(res['len'], list(range(100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.ops import load_ops
+from data_juicer.ops.common import words_matcher
+from data_juicer.utils.fingerprint_utils import generate_fingerprint
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class FingerprintUtilsTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.dataset = Dataset.from_list([{'text': 'a' * i} for i in range(5)])
+
+    def _fingerprint(self, process, method='compute_stats'):
+        op = load_ops([process])[0]
+        # ops might hold objects that can't be serialized, such as locks
+        op.lock = threading.Lock()
+        return generate_fingerprint(self.dataset, getattr(op, method))
+
+    def test_op_fingerprint(self):
+        process = {'text_length_filter': {'min_len': 5}}
+        fingerprint = self._fingerprint(process)
+        # stable across op instances
+        self.assertEqual(fingerprint, self._fingerprint(process))
+        self.assertNotEqual(fingerprint,
+                            self._fingerprint(process, method='process'))
+        self.assertNotEqual(
+            fingerprint,
+            self._fingerprint({'text_length_filter': {
+                'min_len': 6
+            }}))
+
+    def test_fingerprint_state(self):
+        process = {'text_length_filter': {'min_len': 5}}
+        op = load_ops([process])[0]
+        fingerprint = generate_fingerprint(self.dataset, op.compute_stats)
+        op.fingerprint_state = lambda: 'another state'
+        self.assertNotEqual(
+            fingerprint, generate_fingerprint(self.dataset, op.compute_stats))
+
+    def test_words_assets_state(self):
+        for op_name, words_type in [('flagged_words_filter', 'flagged_words'),
+                                    ('stopwords_filter', 'stopwords')]:
+            with tempfile.TemporaryDirectory() as words_dir:
+                asset_path = os.path.join(words_dir, f'{words_type}.json')
+                process = {op_name: {f'{words_type}_dir': words_dir}}
+                fingerprints = []
+                for words in [['a', 'b'], ['a', 'b'], ['a', 'c']]:
+                    with open(asset_path, 'w') as fout:
+                        json.dump({'en': words}, fout)
+                    # the assets are loaded again in a new run
+                    words_matcher.WORDS_ASSETS.clear()
+                    words_matcher.WORDS_MATCHERS.clear()
+                    fingerprints.append(self._fingerprint(process))
+                # the fingerprint changes with the content of the assets in
+                # the same directory
+                self.assertEqual(fingerprints[0], fingerprints[1])
+                self.assertNotEqual(fingerprints[0], fingerprints[2])
+            words_matcher.WORDS_ASSETS.clear()
+            words_matcher.WORDS_MATCHERS.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
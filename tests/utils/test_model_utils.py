@@ -0,0 +1,76 @@
+import os
+import pickle
+import unittest
+
+import multiprocess as mp
+
+from data_juicer.utils import model_utils
+from data_juicer.utils.model_utils import (get_model, get_shared_models_mem,
+                                           prepare_model)
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+LOADED_PIDS = []
+
+
+def prepare_dummy_model(size):
+    LOADED_PIDS.append(os.getpid())
+    return {'pid': os.getpid(), 'weights': b'\x01' * size}
+
+
+def get_model_pid(model_key):
+    return get_model(model_key)['pid']
+
+
+class ShareModelsTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        model_utils.MODEL_FUNCTION_MAPPING['dummy'] = prepare_dummy_model
+        model_utils.SHAREABLE_MODEL_TYPES.add('dummy')
+        model_utils.SHARE_MODELS = True
+        LOADED_PIDS.clear()
+
+    def tearDown(self):
+        model_utils.MODEL_FUNCTION_MAPPING.pop('dummy')
+        model_utils.SHAREABLE_MODEL_TYPES.discard('dummy')
+        model_utils.SHARE_MODELS = False
+        super().tearDown()
+
+    def test_load_once(self):
+        model_key = prepare_model('dummy', size=1024)
+        another_key = prepare_model('dummy', size=1024)
+        self.assertEqual(LOADED_PIDS, [os.getpid()])
+        # keys of the same model share it, even if they are unpickled
+        model = get_model(model_key)
+        self.assertIs(get_model(another_key), model)
+        self.assertIs(get_model(pickle.loads(pickle.dumps(model_key))), model)
+        self.assertEqual(LOADED_PIDS, [os.getpid()])
+        # a model of different args is loaded on its own
+        get_model(prepare_model('dummy', size=2048))
+        self.assertEqual(len(LOADED_PIDS), 2)
+
+    def test_share_with_forked_workers(self):
+        model_key = prepare_model('dummy', size=1024)
+        with mp.get_context('fork').Pool(2) as pool:
+            pids = pool.map(get_model_pid, [model_key] * 4)
+        # the workers use the model loaded in the main process
+        self.assertEqual(pids, [os.getpid()] * 4)
+
+    def test_not_shared(self):
+        model_utils.SHARE_MODELS = False
+        model_key = prepare_model('dummy', size=1024)
+        get_model(model_key)
+        # loaded once for possible caching and once by get_model
+        self.assertEqual(len(LOADED_PIDS), 2)
+        self.assertEqual(get_shared_models_mem([model_key]), 0)
+
+    def test_shared_models_mem(self):
+        model_key = prepare_model('dummy', size=256 * 1024**2)
+        # the memory is counted once for the keys of the same model
+        mem = get_shared_models_mem(
+            [model_key, prepare_model('dummy', size=256 * 1024**2), None])
+        self.assertGreater(mem, 128 * 1024**2)
+        self.assertLess(mem, 512 * 1024**2)
+
+
+if __name__ == '__main__':
+    unittest.main()
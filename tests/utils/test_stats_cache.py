@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from data_juicer.core.data import NestedDataset as Dataset
+from data_juicer.ops import load_ops
+from data_juicer.utils.constant import Fields
+from data_juicer.utils.stats_cache import StatsCache, get_op_stats_key
+from data_juicer.utils.unittest_utils import DataJuicerTestCaseBase
+
+
+class StatsCacheTest(DataJuicerTestCaseBase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, 'stats.db')
+        self.ds_list = [{
+            'text': 'short'
+        }, {
+            'text': 'a longer text'
+        }, {
+            'text': 'a much longer text than the others'
+        }]
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmp_dir.cleanup()
+
+    def _load_filter(self, **args):
+        args.update(stats_cache_path=self.cache_path, batch_size=2)
+        return load_ops([{'text_length_filter': args}])[0]
+
+    def test_op_stats_key(self):
+        op1 = self._load_filter(min_len=10)
+        op2 = self._load_filter(max_len=20)
+        op3 = load_ops([{'words_num_filter': {}}])[0]
+        self.assertEqual(get_op_stats_key(op1), get_op_stats_key(op2))
+        self.assertNotEqual(get_op_stats_key(op1), get_op_stats_key(op3))
+        # the fields read by this op are unknown, so it's not cached
+        op4 = load_ops([{
+            'specified_numeric_field_filter': {
+                'field_key': 'meta.num'
+            }
+        }])[0]
+        self.assertIsNone(get_op_stats_key(op4))
+
+    def test_op_stats_key_keeps_non_threshold_params(self):
+        # max_size changes how frames are resized, so it changes the motion
+        # scores even though it looks like a threshold
+        op1, op2, op3 = load_ops([{
+            'video_motion_score_filter': {
+                'size': 64,
+                'max_size': 100,
+                'min_score': 1.0
+            }
+        }, {
+            'video_motion_score_filter': {
+                'size': 64,
+                'max_size': 200,
+                'min_score': 1.0
+            }
+        }, {
+            'video_motion_score_filter': {
+                'size': 64,
+                'max_size': 100,
+                'min_score': 2.0,
+                'max_score': 10.0
+            }
+        }])
+        self.assertNotEqual(get_op_stats_key(op1), get_op_stats_key(op2))
+        self.assertEqual(get_op_stats_key(op1), get_op_stats_key(op3))
+
+    def test_get_and_put(self):
+        cache = StatsCache(self.cache_path)
+        cache.put_many({'a': {'text_len': 1}, 'b': {'text_len': 2}})
+        self.assertEqual(cache.get_many(['a', 'c']), {'a': {'text_len': 1}})
+        cache.close()
+        # stats are persisted across instances
+        self.assertEqual(
+            StatsCache(self.cache_path).get_many(['b']),
+            {'b': {
+                'text_len': 2
+            }})
+
+    def test_reuse_stats_across_runs(self):
+        dataset = Dataset.from_list(self.ds_list)
+        res = dataset.process(self._load_filter(min_len=10)).to_list()
+        self.assertEqual([s['text'] for s in res],
+                         [s['text'] for s in self.ds_list[1:]])
+
+        # the stats are read from the cache, so the op is never called
+        def _fail(*args, **kwargs):
+            raise RuntimeError('stats should be read from the cache')
+
+        op = self._load_filter(min_len=1, max_len=20)
+        op.compute_stats = _fail
+        dataset = Dataset.from_list(self.ds_list)
+        res = dataset.process(op).to_list()
+        self.assertEqual([s['text'] for s in res],
+                         [s['text'] for s in self.ds_list[:2]])
+        self.assertEqual([s[Fields.stats]['text_len'] for s in res], [5, 13])
+
+    def test_media_changed_in_place(self):
+        data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                '..', 'ops', 'data')
+        img_path = os.path.join(self.tmp_dir.name, 'img.jpg')
+        ds_list = [{'text': 'an image', 'images': [img_path]}]
+        process = [{
+            'image_shape_filter': {
+                'stats_cache_path': self.cache_path
+            }
+        }]
+
+        widths = []
+        for img in ['img1.png', 'img2.jpg']:
+            # replace the image at the same path
+            shutil.copyfile(os.path.join(data_dir, img), img_path)
+            res = Dataset.from_list(ds_list).process(load_ops(process))
+            widths.append(res[0][Fields.stats]['image_width'])
+        self.assertEqual(widths, [[336], [640]])
+
+
+if __name__ == '__main__':
+    unittest.main()